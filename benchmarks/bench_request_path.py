@@ -0,0 +1,138 @@
+"""
+Request path benchmark: CPU time and memory allocated per /a2a request.
+
+Requests go straight into the ASGI app (no HTTP client or server) with Gemini
+and the Bible API replaced by constant fakes, so the numbers cover parsing,
+validation, the verse pipelines, rendering and serialization only. The render
+section times building and serializing one response on its own, where the
+internal records replace Pydantic models.
+
+    python benchmarks/bench_request_path.py --requests 2000
+    python benchmarks/bench_request_path.py --requests 2000 --compact
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+def request_body(i: int, compact: bool) -> bytes:
+    body = {
+        "jsonrpc": "2.0",
+        "id": str(i),
+        "method": "message/send",
+        "params": {"message": {"role": "user", "parts": [{"kind": "text", "text": "A verse on love please"}]}},
+    }
+    if compact:
+        body["params"]["configuration"] = {"acceptedOutputModes": ["application/vnd.a2a.compact+json"]}
+    return json.dumps(body).encode()
+
+async def call(body: bytes) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": "/a2a", "raw_path": b"/a2a", "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    received = False
+    status = 0
+
+    async def receive():
+        nonlocal received
+        if received:
+            return {"type": "http.disconnect"}
+        received = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await main.app(scope, receive, send)
+    return status
+
+def render_once(compact: bool) -> bytes:
+    from core.models import A2AMessage, MessagePart, VerseResult
+    from core.verse_pipeline import render_task_result
+    verse = VerseResult(topic="love", verse_reference="1 John 4:8", verse_text="God is love.",
+                        reflection="God's love is the source of ours.", translation="NET")
+    task = render_task_result({
+        "verses": [verse], "chat": None, "task_id": "task", "context_id": "ctx", "compact": compact,
+        "messages": [A2AMessage(role="user", parts=[MessagePart(kind="text", text="A verse on love please")])],
+    })
+    response = {"jsonrpc": "2.0", "id": "1", "result": task.to_dict(exclude_none=compact)}
+    return main.JSONResponse(content=response).body
+
+def bench_render(iterations: int, compact: bool) -> dict:
+    for _ in range(100):
+        render_once(compact)
+    cpu_start = time.process_time()
+    for _ in range(iterations):
+        render_once(compact)
+    cpu = time.process_time() - cpu_start
+
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(200):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        render_once(compact)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return {"cpu_us": cpu / iterations * 1e6, "peak_alloc_kib": allocated / 200 / 1024}
+
+async def fake_fetch_translations(reference, translations):
+    return {code: (reference, "Whoever does not love does not know God, because God is love.") for code in translations}
+
+async def run(requests: int, compact: bool) -> dict:
+    bodies = [request_body(i, compact) for i in range(requests)]
+    for body in bodies[:50]:  # Warm up caches and lazy imports
+        assert await call(body) == 200
+
+    cpu_start = time.process_time()
+    for body in bodies:
+        await call(body)
+    cpu = time.process_time() - cpu_start
+
+    tracemalloc.start()
+    sample = bodies[:200]
+    allocated = 0
+    for body in sample:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        await call(body)
+        allocated += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    return {"cpu_us_per_request": cpu / requests * 1e6, "peak_alloc_kib_per_request": allocated / len(sample) / 1024}
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--compact", action="store_true", help="Request the compact response profile")
+    args = parser.parse_args()
+
+    with patch.object(main, "rate_limiter", None), patch.object(main, "capture", None), \
+            patch("core.ai_service.extract_topic", return_value="love"), \
+            patch("core.ai_service.generate_verse_reference", return_value="1 John 4:8"), \
+            patch("core.ai_service.generate_reflection", return_value="God's love is the source of ours."), \
+            patch("core.bible_api.fetch_translations", fake_fetch_translations):
+        result = asyncio.run(run(args.requests, args.compact))
+
+    render = bench_render(args.requests * 5, args.compact)
+
+    print(f"{'request cpu':>14}: {result['cpu_us_per_request']:8.1f} us")
+    print(f"{'request alloc':>14}: {result['peak_alloc_kib_per_request']:8.1f} KiB peak traced")
+    print(f"{'render cpu':>14}: {render['cpu_us']:8.1f} us")
+    print(f"{'render alloc':>14}: {render['peak_alloc_kib']:8.1f} KiB peak traced")
+
+if __name__ == "__main__":
+    cli()
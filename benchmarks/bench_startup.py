@@ -0,0 +1,62 @@
+"""
+Startup benchmark: import time and time-to-first-response for a cold process.
+
+Each sample runs in a fresh interpreter so module caches don't hide the cost.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r'''
+import asyncio, json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+from httpx import AsyncClient, ASGITransport
+
+async def first_response():
+    async with AsyncClient(transport=ASGITransport(app=main.app), base_url="http://bench") as client:
+        response = await client.get("/health")
+        assert response.status_code == 200
+
+asyncio.run(first_response())
+responded = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "first_response_s": responded - start,
+    "heavy_sdk_loaded": "google.generativeai" in sys.modules,
+}))
+'''
+
+def run_once() -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    for key in ("import_s", "first_response_s"):
+        values = [s[key] for s in samples]
+        print(f"{key:>18}: median {statistics.median(values) * 1000:7.1f} ms  "
+              f"min {min(values) * 1000:7.1f} ms  max {max(values) * 1000:7.1f} ms")
+    print(f"{'heavy_sdk_loaded':>18}: {any(s['heavy_sdk_loaded'] for s in samples)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+A/B evaluation of per-stage LLM settings: latency, cost and accuracy per stage.
+
+Each labelled case in eval_cases.json is sent with the production prompt of its
+stage to one provider under two variants of stage settings, alternating which
+variant goes first so drift in provider latency hits both equally. A variant is
+"baseline" (provider defaults: one model, no caps), "default" (the configured
+LLM_STAGE_SETTINGS over the built-in defaults) or a JSON object / file of stage
+settings, e.g. '{"intent": {"model": "gemini-2.5-flash-lite", "max_output_tokens": 8}}'.
+
+Accuracy is exact topics for intent, a well-formed "Book C:V" for reference,
+and a complete (not truncated) single reply for reflection and chat.
+
+    python benchmarks/eval_stages.py --provider gemini --repeats 3
+    python benchmarks/eval_stages.py --a baseline --b '{"intent": {"max_output_tokens": 4}}' --stages intent
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import ai_service  # noqa: E402
+from core.llm import STAGE_SETTINGS, StageSettings, build_provider, load_stage_settings  # noqa: E402
+from core.metrics import RollingLatency  # noqa: E402
+
+CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_cases.json")
+
+# USD per million (input, output) tokens at the time of writing; override with --prices.
+# Thinking tokens are billed as output.
+PRICES = {
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.5-flash-lite": (0.10, 0.40),
+    "gpt-4o-mini": (0.15, 0.60),
+}
+
+REFERENCE_PATTERN = re.compile(r"^(?:[1-3] ?)?[A-Z][A-Za-z]+(?: (?:of )?[A-Z][A-Za-z]+)* \d{1,3}:\d{1,3}(?:-\d{1,3})?$")
+
+def prompt_for(stage: str, case_input) -> str:
+    if stage == "intent":
+        return ai_service.intent_prompt(case_input)
+    if stage == "reference":
+        return ai_service.reference_prompt(case_input)
+    if stage == "reflection":
+        return ai_service.reflection_prompt(case_input["verse_text"], case_input["topic"])
+    return ai_service.chat_prompt(case_input)
+
+def _complete(text: str) -> bool:
+    return bool(text) and "\n\n" not in text and text[-1] in ".!?\"')"
+
+SCORERS: Dict[str, Callable[[str, dict], bool]] = {
+    "intent": lambda text, case: (
+        {t.lower() for t in ai_service.split_topics(text)} == {t.lower() for t in case["expected"]}
+    ),
+    "reference": lambda text, case: bool(REFERENCE_PATTERN.match(text)),
+    "reflection": lambda text, case: _complete(text),
+    "chat": lambda text, case: _complete(text) and "verse" in text.lower(),
+}
+
+def load_variant(spec: str) -> Dict[str, StageSettings]:
+    if spec == "baseline":
+        return {}
+    if spec == "default":
+        return STAGE_SETTINGS
+    if os.path.isfile(spec):
+        with open(spec) as f:
+            spec = f.read()
+    return load_stage_settings(json.loads(spec), defaults={})
+
+def cost(usage: Dict[str, int], model: str, prices: Dict[str, tuple]) -> float:
+    price_in, price_out = prices.get(model, (0.0, 0.0))
+    output = usage["total"] - usage["prompt"]  # Includes thinking tokens
+    return (usage["prompt"] * price_in + output * price_out) / 1e6
+
+def evaluate(provider, cases: Dict[str, List[dict]], variants: Dict[str, Dict[str, StageSettings]],
+             stages: List[str], repeats: int = 1, prices: Dict[str, tuple] = PRICES) -> Dict[str, Dict[str, dict]]:
+    """
+    Run every case of every stage under each variant and summarize per stage and variant.
+    """
+    names = list(variants)
+    report: Dict[str, Dict[str, dict]] = {}
+    for stage in stages:
+        totals = {
+            name: {"latency": RollingLatency(window=len(cases[stage]) * repeats), "calls": 0, "errors": 0,
+                   "correct": 0, "prompt": 0, "output": 0, "cost": 0.0, "models": set()}
+            for name in names
+        }
+        for rep in range(repeats):
+            for i, case in enumerate(cases[stage]):
+                prompt = prompt_for(stage, case["input"])
+                for name in (names if (rep + i) % 2 == 0 else names[::-1]):
+                    settings = variants[name].get(stage, StageSettings())
+                    bucket = totals[name]
+                    bucket["calls"] += 1
+                    start = time.perf_counter()
+                    try:
+                        response = provider.generate(stage, prompt, settings)
+                    except Exception:
+                        bucket["errors"] += 1
+                        continue
+                    bucket["latency"].observe(time.perf_counter() - start)
+                    bucket["correct"] += SCORERS[stage](response.text.strip(), case)
+                    bucket["prompt"] += response.usage["prompt"]
+                    bucket["output"] += response.usage["total"] - response.usage["prompt"]
+                    bucket["cost"] += cost(response.usage, response.model, prices)
+                    bucket["models"].add(response.model)
+        report[stage] = {
+            name: {
+                "models": sorted(bucket["models"]),
+                "calls": bucket["calls"],
+                "errors": bucket["errors"],
+                "accuracy": bucket["correct"] / bucket["calls"] if bucket["calls"] else 0.0,
+                "p50_ms": bucket["latency"].percentile(50) * 1000,
+                "p95_ms": bucket["latency"].percentile(95) * 1000,
+                "output_tokens": bucket["output"] / max(1, bucket["calls"] - bucket["errors"]),
+                "prompt_tokens": bucket["prompt"] / max(1, bucket["calls"] - bucket["errors"]),
+                "usd_per_1k_calls": bucket["cost"] / max(1, bucket["calls"]) * 1000,
+            }
+            for name, bucket in totals.items()
+        }
+    return report
+
+def cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", default="gemini", help="gemini, openai, local or stub")
+    parser.add_argument("--a", default="baseline", help="Variant A: baseline, default, JSON or a JSON file")
+    parser.add_argument("--b", default="default", help="Variant B: baseline, default, JSON or a JSON file")
+    parser.add_argument("--stages", default="intent,reference,reflection,chat")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--cases", default=CASES)
+    parser.add_argument("--prices", help='JSON map of model to [input, output] USD per million tokens')
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    with open(args.cases) as f:
+        cases = json.load(f)
+    prices = {**PRICES, **{model: tuple(p) for model, p in json.loads(args.prices or "{}").items()}}
+    variants = {"A": load_variant(args.a), "B": load_variant(args.b)}
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    report = evaluate(build_provider(args.provider), cases, variants, stages, args.repeats, prices)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'stage':<11}{'var':<4}{'model':<24}{'calls':>6}{'err':>5}{'acc':>7}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'in tok':>8}{'out tok':>8}{'$/1k':>9}")
+    for stage, variants_report in report.items():
+        for name, row in variants_report.items():
+            print(f"{stage:<11}{name:<4}{','.join(row['models']) or '-':<24}{row['calls']:>6}{row['errors']:>5}"
+                  f"{row['accuracy']:>7.0%}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}"
+                  f"{row['prompt_tokens']:>8.1f}{row['output_tokens']:>8.1f}{row['usd_per_1k_calls']:>9.4f}")
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,92 @@
+import asyncio
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+
+from .config import ADMISSION_MAX_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_DEADLINE
+from .metrics import RollingLatency, counter, gauge
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_ACTIVE = gauge("admission_active", "Requests currently being processed")
+ADMISSION_QUEUED = gauge("admission_queued", "Requests waiting for a processing slot")
+ADMISSION_REJECTED = counter("admission_rejected_total", "Requests shed by admission control", ["reason"])
+
+class ServerBusy(Exception):
+    """
+    Raised when a request is shed; `retry_after` is a hint in whole seconds.
+    """
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server busy ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Bounds concurrent processing and the queue in front of it.
+
+    Requests past `max_concurrency` wait in a queue of at most `max_queue`. A request is
+    rejected up front when the queue is full or when its estimated wait (queue position
+    times the recent mean service time) would blow the `deadline`, so admitted requests
+    keep a bounded latency instead of everyone slowing down.
+    """
+
+    def __init__(self, max_concurrency: int = ADMISSION_MAX_CONCURRENCY, max_queue: int = ADMISSION_MAX_QUEUE,
+                 deadline: float = ADMISSION_DEADLINE):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.deadline = deadline
+        self.active = 0
+        self.queued = 0
+        self.service_time = RollingLatency()
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    def estimate_wait(self) -> float:
+        """
+        Expected seconds before a newly arriving request would start processing.
+        """
+        if self.active < self.max_concurrency and self.queued == 0:
+            return 0.0
+        # Each slot frees up roughly once per mean service time
+        return (self.queued + 1) / self.max_concurrency * self.service_time.mean(default=1.0)
+
+    def _reject(self, reason: str, wait: float):
+        ADMISSION_REJECTED.inc(reason=reason)
+        raise ServerBusy(reason, max(1, math.ceil(wait)))
+
+    @asynccontextmanager
+    async def admit(self):
+        """
+        Hold a processing slot for the duration of the block, or raise ServerBusy.
+        """
+        if self._slots.locked() or self.queued:
+            wait = self.estimate_wait()
+            if self.queued >= self.max_queue:
+                self._reject("queue_full", wait)
+            if wait > self.deadline:
+                self._reject("deadline", wait)
+
+            self.queued += 1
+            ADMISSION_QUEUED.set(self.queued)
+            try:
+                await asyncio.wait_for(self._slots.acquire(), timeout=self.deadline)
+            except asyncio.TimeoutError:
+                self._reject("timeout", self.estimate_wait())
+            finally:
+                self.queued -= 1
+                ADMISSION_QUEUED.set(self.queued)
+        else:
+            await self._slots.acquire()  # A slot is free; returns without suspending
+
+        self.active += 1
+        ADMISSION_ACTIVE.set(self.active)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.service_time.observe(time.perf_counter() - start)
+            self.active -= 1
+            ADMISSION_ACTIVE.set(self.active)
+            self._slots.release()
@@ -1,20 +1,32 @@
 import os
-import google.generativeai as genai
-from .config import GEMINI_API_KEY
-from .models import VerseResult, A2AMessage, TaskResult, TaskStatus, Artifact, MessagePart
+from . import llm
+from .token_accounting import ledger, degraded
+from .topics import canonical_topic
+from .logging_setup import Redacted
+from .models import VerseResult, A2AMessage, TaskRecord
 import logging
-from uuid import uuid4
 
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-2.5-flash")
 logger = logging.getLogger(__name__)
 
-def extract_topic(query: str) -> str:
+CASUAL_CHAT_FALLBACK = (
+    "Hello! Would you like me to share a Bible verse? "
+    "You can say something like: I need a verse on Love."
+)
+
+def generate(stage: str, prompt: str) -> str:
     """
-    Use AI to detect if user wants a Bible verse or is just chatting.
-    If no verse is needed, return a special marker: '__NO_VERSE__'
+    Send a prompt, with its stage's model and generation settings, to the fastest
+    healthy LLM provider (failing over to the others) and record its token usage
+    against the stage, the current caller and contextId.
     """
-    prompt = f"""
+    response = llm.router.generate(stage, prompt)
+    ledger.record(stage, response.usage)
+    return response.text.strip()
+
+# Prompts per stage, also used by the stage evaluation harness (benchmarks/eval_stages.py)
+
+def intent_prompt(query: str) -> str:
+    return f"""
     Decide the user's intent from this message: '{query}'.
 
     If they are just greeting, chatting or not asking for a Bible verse:
@@ -26,15 +38,31 @@ def extract_topic(query: str) -> str:
     - No extra words, no explanations.
     """
 
-    response = model.generate_content(prompt).text.strip()
+def reference_prompt(topic: str) -> str:
+    return f"Give only a valid Bible verse reference about {topic}. Format: Book Chapter:Verse."
+
+def reflection_prompt(verse_text: str, topic: str) -> str:
+    return f"Encourage the user and Provide a one-sentence reflection on this Bible verse related to {topic}: '{verse_text}'"
+
+def chat_prompt(query: str) -> str:
+    return f"You are a friendly assistant. Reply briefly and naturally to this message: '{query}'. \
+                        If they didn't ask for a Bible verse, respond casually and at the end politely ask: \
+                        'Would you like me to share a Bible verse? You can say something like: I need a verse on Love.' \
+                        Keep your tone warm, concise, and human-like."
+
+def extract_topic(query: str) -> str:
+    """
+    Use AI to detect if user wants a Bible verse or is just chatting.
+    If no verse is needed, return a special marker: '__NO_VERSE__'
+    """
+    response = generate("intent", intent_prompt(query))
     return response
 
 def generate_verse_reference(topic: str) -> str:
     """
     Generate a valid Bible verse reference related to the topic.
     """
-    prompt = f"Give only a valid Bible verse reference about {topic}. Format: Book Chapter:Verse."
-    response = model.generate_content(prompt).text.strip()
+    response = generate("reference", reference_prompt(topic))
     return response
 
 
@@ -43,26 +71,55 @@ def generate_reflection(verse_text: str, topic: str) -> str:
     Generate a one-sentence reflection on the verse.
     """
     try:
-        prompt = f"Encourage the user and Provide a one-sentence reflection on this Bible verse related to {topic}: '{verse_text}'"
-        response = model.generate_content(prompt)
-        reflection = response.text.strip()
+        if degraded("reflection"):
+            return f"This verse speaks to the importance of {topic} in our spiritual journey."
+        reflection = generate("reflection", reflection_prompt(verse_text, topic))
         return reflection
     except Exception as e:
-        logger.error(f"Failed to generate reflection: {str(e)}")
+        logger.error("Failed to generate reflection: %s", e)
         return f"This verse speaks to the importance of {topic} in our spiritual journey."
 
-def process_verse_request(query: str):
-    from .bible_api import get_verse_by_topic  # Import here to avoid circular import
+def generate_chat_reply(query: str) -> str:
+    """
+    Reply casually to a message that is not asking for a verse.
+    Callers over their token budget get a fixed reply instead.
+    """
+    if degraded("chat"):
+        return CASUAL_CHAT_FALLBACK
+    return generate("chat", chat_prompt(query))
 
-    topic = extract_topic(query)
+def split_topics(topic: str) -> list[str]:
+    """
+    Split the comma-separated topics returned by extract_topic.
+    Blank entries and duplicates by canonical key ("Love", "God's love") are
+    dropped; the first wording of each is kept, in order.
+    """
+    topics = []
+    seen = set()
+    for part in topic.split(","):
+        cleaned = part.strip()
+        if cleaned and canonical_topic(cleaned) not in seen:
+            seen.add(canonical_topic(cleaned))
+            topics.append(cleaned)
+    return topics
+
+async def run_topic_pipeline(topic: str) -> VerseResult:
+    """
+    Run the reference -> fetch -> reflection stages for one topic.
+    """
+    from .verse_pipeline import run_topic  # Import here to avoid circular import
 
-    if topic == "__NO_VERSE__":
-        return None  # Signal that it's just chat.
+    return await run_topic(topic)
 
-    verse = get_verse_by_topic(topic)
-    reflection = generate_reflection(verse.verse_text, topic)
-    verse.reflection = reflection
-    return verse
+async def process_verse_requests(query: str) -> list[VerseResult]:
+    """
+    Extract every topic from the query and run the per-topic pipelines concurrently.
+    Returns an empty list when the user is just chatting.
+    """
+    from .verse_pipeline import QUERY_PIPELINE
+
+    run = await QUERY_PIPELINE.run({"query": query})
+    return run.results["verses"]
 
 
 def extract_latest_user_text(message_parts) -> str:
@@ -90,13 +147,16 @@ async def process_messages(
     messages: list[A2AMessage],
     context_id: str,
     task_id: str,
-    config: dict = {}
-) -> TaskResult:
+    config: dict = {},
+    compact: bool = False
+) -> TaskRecord:
     """
-    Process A2A messages and return TaskResult for verse requests.
+    Process A2A messages and return the task (a TaskRecord) for verse requests.
     This is the main entry point for A2A protocol processing.
+    With `compact`, the verse text is only carried by status.message: artifacts keep
+    just their data part and the inbound history is not echoed back.
     """
-    logger.info(f"Processing messages for context {context_id}, task {task_id}")
+    logger.info("Processing messages for context %s, task %s", context_id, task_id)
 
     # Extract last user message
     user_message = messages[-1] if messages else None
@@ -112,92 +172,16 @@ async def process_messages(
         # Handle as casual chat instead of error
         query = "__CASUAL_CHAT__"
 
-    logger.info(f"Processing verse request: {query}")
-
-    # Process the verse request (using existing logic)
-    verse_result = process_verse_request(query)
-
-    # Build response message
-    if verse_result:
-        response_text = f"Here's what i found:\n{verse_result.verse_reference}\n{verse_result.verse_text}"
-        if verse_result.reflection:
-            response_text += f"\n\nReflection: {verse_result.reflection}"
-
-        response_message = A2AMessage(
-            role="agent",
-            parts=[MessagePart(kind="text", text=response_text)],
-            taskId=task_id
-        )
-    else:
-        # Just casual chat reply
-        #generate model response based of user query
-            response = model.generate_content(
-                            f"You are a friendly assistant. Reply briefly and naturally to this message: '{query}'. \
-                        If they didn't ask for a Bible verse, respond casually and at the end politely ask: \
-                        'Would you like me to share a Bible verse? You can say something like: I need a verse on Love.' \
-                        Keep your tone warm, concise, and human-like."
-                        )
-            response_message = A2AMessage(
-            role="agent",
-            parts=[MessagePart(kind="text", text=response.text.strip())],
-            taskId=task_id
-        )
-
-
-    # Build artifacts
-    if verse_result:
-        artifacts = [
-            Artifact(
-                name="verse",
-                parts=[
-                    MessagePart(
-                        kind="text",
-                        text=(
-                            f"📖 *Here's what i found:*\n\n"
-                            f"{verse_result.verse_reference}\n"
-                            f"{verse_result.verse_text}\n\n"
-                            f"🕊️ Reflection: {verse_result.reflection}"
-                        )
-                    ),
-                    MessagePart(
-                        kind="data",
-                        data={
-                            "reference": verse_result.verse_reference,
-                            "topic": verse_result.topic,
-                            "reflection": verse_result.reflection,
-                            "timestamp": verse_result.timestamp
-                        }
-                    )
-
-                ]
-            )
-        ]
-    elif not verse_result:
-        artifacts = [
-            Artifact(
-                name="chat_response",
-                parts=[
-                    MessagePart(
-                        kind="text",
-                        text=response_message.parts[0].text
-                    )
-                ]
-            )
-        ]
-
-    # Build history
-    history = messages + [response_message]
-
-    # Determine state (completed since it's a single-turn task)
-    state = "completed"
-
-    return TaskResult(
-        id=task_id,
-        contextId=context_id,
-        status=TaskStatus(
-            state=state,
-            message=response_message
-        ),
-        artifacts=artifacts,
-        history=history
-    )
+    logger.info("Processing verse request: %s", Redacted(query))
+
+    from .verse_pipeline import RESPONSE_PIPELINE
+
+    run = await RESPONSE_PIPELINE.run({
+        "query": query,
+        "messages": messages,
+        "context_id": context_id,
+        "task_id": task_id,
+        "compact": compact,
+    })
+    logger.debug("Stage timings for task %s: %s", task_id, run.timings)
+    return run.results["render"]
@@ -0,0 +1,10 @@
+import hmac
+from typing import Optional
+
+from .config import ADMIN_TOKEN
+
+def is_privileged(token: Optional[str]) -> bool:
+    """
+    True when the caller presented the admin token. Always False if ADMIN_TOKEN is unset.
+    """
+    return bool(ADMIN_TOKEN and token and hmac.compare_digest(str(token), ADMIN_TOKEN))
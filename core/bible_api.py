@@ -1,56 +1,213 @@
-import requests
-from .config import BIBLE_API_BASE_URL, DEFAULT_TRANSLATION
+from .clients import get_http_session
+from .config import (
+    BIBLE_API_BASE_URL, BIBLE_API_TIMEOUT, DEFAULT_TRANSLATION, BIBLE_API_POOL_SIZE, BIBLE_API_HEDGE_ENABLED,
+    BIBLE_API_HEDGE_PERCENTILE, BIBLE_API_HEDGE_MIN_DELAY, BIBLE_API_HEDGE_INITIAL_DELAY,
+    BIBLE_API_COM_URL, PRELOAD_TRANSLATIONS, PRELOAD_REFERENCES
+)
 from .models import VerseResult
-from .ai_service import generate_verse_reference
+from .metrics import RollingLatency, counter
+from .translations import get_translation, local_stores, passage_cache, PASSAGE_LOOKUPS
+from .reading_plan import get_plan
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, Optional
+from urllib.parse import quote
+import asyncio
+import contextvars
 import random
+import time
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_verse_by_topic(topic: str) -> VerseResult:
-    """
-    Query the Bible API for a verse related to the topic.
-    First, generate a specific verse reference using AI, then fetch it.
-    Fallback to random if the reference fails.
-    """
-    try:
-        # Generate a specific verse reference
-        reference = generate_verse_reference(topic)
-        logger.info(f"Generated reference for topic '{topic}': {reference}")
-
-        # Clean the reference (remove extra text if any)
-        # Assume format like "John 3:16"
-        url = f"{BIBLE_API_BASE_URL}/?passage={reference}&type=json"
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            if data and isinstance(data, list) and len(data) > 0:
-                verse_data = data[0]
-                verse_reference = f"{verse_data['bookname']} {verse_data['chapter']}:{verse_data['verse']}"
-                verse_text = verse_data['text']
-                return VerseResult(
-                    topic=topic,
-                    verse_reference=verse_reference,
-                    verse_text=verse_text,
-                    reflection=None  # Will be added by AI
-                )
-            else:
-                logger.warning(f"No verse found for reference: {reference}")
+# Upstream calls that may be hedged or started speculatively run on this pool
+_executor = ThreadPoolExecutor(max_workers=BIBLE_API_POOL_SIZE, thread_name_prefix="bible-api")
+
+# Minimum samples before the hedge delay follows the observed percentile
+HEDGE_MIN_SAMPLES = 20
+
+BIBLE_API_LATENCY = RollingLatency(window=500)  # labs.bible.org
+BIBLE_API_COM_LATENCY = RollingLatency(window=500)  # bible-api.com
+HEDGE_OUTCOMES = counter("bible_api_hedge_total", "Hedged Bible API fetches by which request won", ["outcome"])
+WASTED_CALLS = counter("upstream_wasted_calls_total", "Upstream calls whose result was discarded", ["kind"])
+SPECULATIVE_OUTCOMES = counter("speculative_fallback_total", "Speculative random-verse fetches by outcome", ["outcome"])
+
+class UpstreamError(Exception):
+    """A Bible API answered with a server error or rate limit; the passage may still exist"""
+
+def check_status(response, reference: str, api: str):
+    """
+    Raise on 5xx and 429, so a hedged fetch waits for its other request instead
+    of taking the failure as an answer. Other errors mean there is no such passage.
+    """
+    if response.status_code >= 500 or response.status_code == 429:
+        raise UpstreamError(f"{api} returned {response.status_code} for {reference}")
+
+def parse_passage(data: list) -> tuple[str, str]:
+    """
+    Build a reference and the joined text from the rows of a Bible API result.
+    A single row gives "John 3:16"; ranges give "John 3:16-18" or "John 3:36-4:2".
+    """
+    first, last = data[0], data[-1]
+    verse_reference = f"{first['bookname']} {first['chapter']}:{first['verse']}"
+    if len(data) > 1:
+        if last['bookname'] != first['bookname']:
+            verse_reference += f" - {last['bookname']} {last['chapter']}:{last['verse']}"
+        elif str(last['chapter']) != str(first['chapter']):
+            verse_reference += f"-{last['chapter']}:{last['verse']}"
         else:
-            logger.warning(f"API error for reference {reference}: {response.status_code}")
-    except Exception as e:
-        logger.error(f"Failed to generate or fetch verse for topic '{topic}': {str(e)}")
+            verse_reference += f"-{last['verse']}"
+    verse_text = " ".join(row['text'].strip() for row in data)
+    return verse_reference, verse_text
 
-    # Fallback to random verse
-    logger.info(f"Falling back to random verse for topic '{topic}'")
-    return get_random_verse(topic)
+def fetch_passage(reference: str, translation: Optional[str] = None) -> Optional[tuple[str, str]]:
+    """
+    Fetch a passage from the Bible API serving the translation (default: DEFAULT_TRANSLATION).
+    Returns (reference, text), or None when the API has no such passage.
+    Raises UpstreamError when the API failed (5xx or 429).
+    """
+    provider = get_translation(translation or DEFAULT_TRANSLATION)
+    if provider is None or provider.provider == "local":
+        return None  # Only the local store has it
+    if provider.provider == "bible-api":
+        return fetch_bible_api_com(reference, provider.upstream_id)
+
+    url = f"{BIBLE_API_BASE_URL}/?passage={reference}&type=json"
+    start = time.perf_counter()
+    response = get_http_session().get(url, timeout=BIBLE_API_TIMEOUT)
+    BIBLE_API_LATENCY.observe(time.perf_counter() - start)
+    check_status(response, reference, "labs.bible.org")
+    if response.status_code != 200:
+        logger.warning("API error for reference %s: %s", reference, response.status_code)
+        return None
+    data = response.json()
+    if data and isinstance(data, list) and len(data) > 0:
+        return parse_passage(data)
+    logger.warning("No verse found for reference: %s", reference)
+    return None
+
+def fetch_bible_api_com(reference: str, upstream_id: str) -> Optional[tuple[str, str]]:
+    """
+    Fetch a passage from bible-api.com, which serves the public-domain translations.
+    """
+    url = f"{BIBLE_API_COM_URL}/{quote(reference)}?translation={upstream_id}"
+    start = time.perf_counter()
+    response = get_http_session().get(url, timeout=BIBLE_API_TIMEOUT)
+    BIBLE_API_COM_LATENCY.observe(time.perf_counter() - start)
+    check_status(response, reference, "bible-api.com")
+    if response.status_code != 200:
+        logger.warning("bible-api.com error for reference %s (%s): %s", reference, upstream_id, response.status_code)
+        return None
+    data = response.json()
+    verses = data.get("verses") or []
+    if not verses:
+        logger.warning("No verse found for reference: %s (%s)", reference, upstream_id)
+        return None
+    return data.get("reference", reference), " ".join(verse["text"].strip() for verse in verses)
+
+def hedge_delay(translation: Optional[str] = None) -> float:
+    """
+    Seconds to wait on the first request before sending a duplicate.
+    Follows the provider's observed latency percentile once enough samples exist.
+    """
+    provider = get_translation(translation or DEFAULT_TRANSLATION)
+    latency = BIBLE_API_COM_LATENCY if provider and provider.provider == "bible-api" else BIBLE_API_LATENCY
+    if len(latency) < HEDGE_MIN_SAMPLES:
+        return BIBLE_API_HEDGE_INITIAL_DELAY
+    return max(BIBLE_API_HEDGE_MIN_DELAY, latency.percentile(BIBLE_API_HEDGE_PERCENTILE))
+
+def hedged_fetch_passage(reference: str, translation: Optional[str] = None) -> Optional[tuple[str, str]]:
+    """
+    Fetch a passage, sending one duplicate request if the first is slower than the
+    hedge delay or fails before it.
+    The first definitive answer (a passage, or None for no such passage) wins;
+    transport errors, 5xx and 429 wait for the other request.
+    """
+    if not BIBLE_API_HEDGE_ENABLED:
+        return fetch_passage(reference, translation)
+
+    # Each request runs in a copy of the caller's context, so logs and profiles attribute it
+    futures = [_executor.submit(contextvars.copy_context().run, fetch_passage, reference, translation)]
+    done, _ = wait(futures, timeout=hedge_delay(translation))
+    if not done or futures[0].exception() is not None:  # Slow, or failed fast: try once more
+        futures.append(_executor.submit(contextvars.copy_context().run, fetch_passage, reference, translation))
+
+    error = None
+    for future in as_completed(futures):
+        try:
+            result = future.result()
+        except Exception as e:
+            error = e
+            continue
+        if len(futures) > 1:
+            HEDGE_OUTCOMES.inc(outcome="primary_win" if future is futures[0] else "hedge_win")
+            for other in futures:
+                if other is future or (other.done() and other.exception() is not None):
+                    continue  # A request that already failed wasn't a discarded result
+                other.cancel()  # Best effort; a request already in flight just finishes unused
+                WASTED_CALLS.inc(kind="hedge")
+        return result
+    raise error
+
+def get_passage(reference: str, translation: str = DEFAULT_TRANSLATION) -> Optional[tuple[str, str]]:
+    """
+    A passage in one translation: from the translation's cache partition, then its
+    local store, then upstream (hedged). Found passages are cached.
+    """
+    passage = passage_cache.get(translation, reference)
+    if passage is not None:
+        PASSAGE_LOOKUPS.inc(translation=translation, source="cache")
+        return passage
+
+    text = local_stores.lookup(translation, reference)
+    if text is not None:
+        passage = (reference.strip(), text)
+        source = "local"
+    else:
+        passage = hedged_fetch_passage(reference, translation)
+        source = "upstream" if passage else "missing"
+    PASSAGE_LOOKUPS.inc(translation=translation, source=source)
+    if passage:
+        passage_cache.set(translation, reference, passage)
+    return passage
+
+async def fetch_translations(reference: str, translations: Iterable[str]) -> Dict[str, tuple[str, str]]:
+    """
+    Fetch a passage in several translations concurrently, so side-by-side answers
+    cost about one round-trip. Translations that fail or lack the passage are left out;
+    the result keeps the requested order.
+    """
+    translations = list(translations)
+    results = await asyncio.gather(
+        *(asyncio.to_thread(get_passage, reference, code) for code in translations),
+        return_exceptions=True
+    )
+    passages = {}
+    for code, result in zip(translations, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to fetch %s in %s: %s", reference, code, result)
+        elif result:
+            passages[code] = result
+    return passages
+
+async def preload_translations(translations: Iterable[str] = PRELOAD_TRANSLATIONS,
+                               references: Iterable[str] = PRELOAD_REFERENCES) -> int:
+    """
+    Load the local stores of popular translations and cache their most requested
+    passages, so the first requests after a deploy skip the upstream round-trip.
+    Returns the number of passages cached.
+    """
+    translations = [code for code in translations if get_translation(code)]
+    await asyncio.gather(*(asyncio.to_thread(local_stores.load, code) for code in translations))
+    results = await asyncio.gather(*(fetch_translations(ref, translations) for ref in references))
+    return sum(len(passages) for passages in results)
 
 def get_random_verse(topic: str) -> VerseResult:
     """
     Fetch a random verse as fallback.
     """
     url = f"{BIBLE_API_BASE_URL}/?passage=random&type=json"
-    response = requests.get(url)
+    response = get_http_session().get(url, timeout=BIBLE_API_TIMEOUT)
     if response.status_code == 200:
         data = response.json()[0]  # Assuming list
         # Ensure proper formatting: Book Chapter:Verse
@@ -68,9 +225,28 @@ def get_random_verse(topic: str) -> VerseResult:
     else:
         raise Exception("Failed to fetch random verse from Bible API")
 
-def get_daily_verse() -> VerseResult:
+def get_daily_verse(day: Optional[date] = None) -> VerseResult:
     """
-    Fetch a daily verse, rotating between OT and NT if possible.
-    For simplicity, random.
+    The reading plan's verse for a day (today, UTC, by default). The plan alternates
+    testaments and never repeats within its window; prefetched plans carry the text,
+    otherwise it is looked up through the passage cache. A random verse is only
+    used if the planned reference can't be fetched.
     """
-    return get_random_verse("daily")
+    day = day or datetime.now(timezone.utc).date()
+    plan = get_plan(day.year)
+    entry = plan.day(day)
+    if entry.text is not None and plan.translation == DEFAULT_TRANSLATION:
+        PASSAGE_LOOKUPS.inc(translation=DEFAULT_TRANSLATION, source="plan")
+        passage = (entry.reference, entry.text)
+    else:
+        try:
+            passage = get_passage(entry.reference, DEFAULT_TRANSLATION)
+        except Exception as e:
+            logger.error("Failed to fetch planned verse %s: %s", entry.reference, e)
+            passage = None
+    if passage is None:
+        logger.error("Planned verse %s for %s unavailable, using a random verse", entry.reference, day)
+        return get_random_verse(entry.topic)
+    verse_reference, verse_text = passage
+    return VerseResult(topic=entry.topic, verse_reference=verse_reference, verse_text=verse_text,
+                       translation=DEFAULT_TRANSLATION)
@@ -0,0 +1,101 @@
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+SENSITIVE_KEYS = {"token", "authentication", "authorization", "apikey", "api_key", "password", "secret", "profile"}
+REDACTED = "[REDACTED]"
+
+def sanitize(value: Any) -> Any:
+    """
+    Return a copy of a request body with credentials replaced by a marker.
+    """
+    if isinstance(value, dict):
+        return {
+            key: REDACTED if key.lower() in SENSITIVE_KEYS and item is not None else sanitize(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [sanitize(item) for item in value]
+    return value
+
+class TrafficCapture:
+    """
+    Writes captured A2A requests to rotating JSONL files.
+    `record` only enqueues; sanitizing, serializing and file I/O happen on a writer
+    thread so the event loop never touches the disk.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, backup_count: int, queue_size: int = 10000,
+                 flush_interval: float = 1.0):
+        self.directory = directory
+        self.path = os.path.join(directory, "a2a_capture.jsonl")
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._file = None
+
+    def record(self, body: Any, arrived_at: float, status: int, latency_ms: float):
+        """
+        Queue one request for capture; drops it (and counts the drop) if the writer is behind.
+        """
+        try:
+            self._queue.put_nowait({"ts": arrived_at, "status": status, "latency_ms": latency_ms, "body": body})
+        except queue.Full:
+            self.dropped += 1
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="traffic-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Flush everything queued so far and stop the writer thread.
+        """
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        if self.dropped:
+            logger.warning("Traffic capture dropped %s requests", self.dropped)
+
+    def _rotate(self):
+        self._file.close()
+        for index in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backup_count > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _run(self):
+        self._file = open(self.path, "a", encoding="utf-8")
+        try:
+            while True:
+                try:
+                    item = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    self._file.flush()
+                    continue
+                if item is None:
+                    break
+                item["body"] = sanitize(item["body"])
+                self._file.write(json.dumps(item, ensure_ascii=False, default=str) + "\n")
+                if self._file.tell() >= self.max_bytes:
+                    self._rotate()
+        except Exception as e:
+            logger.error("Traffic capture writer failed: %s", e)
+        finally:
+            self._file.close()
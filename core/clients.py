@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import threading
+from typing import Optional
+
+from .config import GEMINI_API_KEY, GEMINI_MODEL, BIBLE_API_BASE_URL, HTTP_POOL_SIZE, WARMUP_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+# Clients are built on first use so importing the app (and answering /health)
+# never pays for the google/grpc stack or opening connections.
+_models = {}
+_http_session = None
+_lock = threading.Lock()
+
+def get_model(name: Optional[str] = None):
+    """
+    Return the shared Gemini model `name` (GEMINI_MODEL by default), configuring
+    the SDK on first use.
+    """
+    name = name or GEMINI_MODEL
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                import google.generativeai as genai  # Heavy import, deferred until needed
+
+                if not _models:
+                    genai.configure(api_key=GEMINI_API_KEY)
+                model = _models[name] = genai.GenerativeModel(name)
+    return model
+
+def get_http_session():
+    """
+    Return the shared requests session so upstream calls reuse pooled connections.
+    """
+    global _http_session
+    if _http_session is None:
+        with _lock:
+            if _http_session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _http_session = session
+    return _http_session
+
+def _prime_http():
+    """
+    Open a connection to the Bible API so the first request skips DNS and TLS setup.
+    """
+    get_http_session().head(BIBLE_API_BASE_URL, timeout=WARMUP_TIMEOUT)
+
+async def warm_up():
+    """
+    Build the clients of the configured LLM providers, pre-open connections and
+    preload popular translations before the app reports ready.
+    Failures are logged and never block startup.
+    """
+    from .bible_api import preload_translations  # Import here; bible_api and llm depend on this module
+    from .llm import router
+
+    steps = {provider.name: asyncio.to_thread(provider.warm_up) for provider in router.providers}
+    steps["http"] = asyncio.to_thread(_prime_http)
+    steps["translations"] = preload_translations()
+    results = await asyncio.gather(*steps.values(), return_exceptions=True)
+    for name, result in zip(steps, results):
+        if isinstance(result, Exception):
+            logger.warning("Warm-up step '%s' failed: %s", name, result)
+        else:
+            logger.info("Warm-up step '%s' done", name)
+
+def reset_clients():
+    """
+    Drop the cached clients (used on shutdown and in tests).
+    """
+    global _http_session
+    with _lock:
+        if _http_session is not None:
+            _http_session.close()
+        _models.clear()
+        _http_session = None
@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -6,15 +7,192 @@ load_dotenv()
 # Gemini API Key
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Gemini model used for every prompt
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+# LLM providers, in preference order until latencies are known. Calls go to the fastest
+# healthy one and fail over to the others. Names: gemini, openai, local (any
+# OpenAI-compatible server, e.g. llama.cpp or Ollama) and stub (offline canned replies).
+LLM_PROVIDERS = [name.strip().lower() for name in os.getenv("LLM_PROVIDERS", "gemini").split(",") if name.strip()]
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # Unset: api.openai.com
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "http://localhost:8080/v1")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "local")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))  # Seconds per OpenAI-compatible call
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "50"))  # Recent calls per provider used for routing
+LLM_MAX_ERROR_RATE = float(os.getenv("LLM_MAX_ERROR_RATE", "0.5"))  # Above this recent error rate a provider is skipped
+LLM_EXPLORE_EVERY = int(os.getenv("LLM_EXPLORE_EVERY", "20"))  # Every Nth call re-tries the least recently used provider
+LLM_PROBE_INTERVAL = float(os.getenv("LLM_PROBE_INTERVAL", "30"))  # Seconds before an unhealthy provider gets a probe call
+
+# Per-stage model and generation parameters, merged per stage over the defaults in core/llm.py.
+# "model" is a model name or a map of provider name to model; null keeps the provider's own. e.g.
+# {"intent": {"model": {"gemini": "gemini-2.5-flash-lite"}, "max_output_tokens": 8, "temperature": 0, "stop": ["\n"]}}
+LLM_STAGE_SETTINGS = json.loads(os.getenv("LLM_STAGE_SETTINGS", "{}"))
+
+# Topic canonicalization: topics not in the curated synonym map join the most similar
+# curated topic with as many words (character trigrams, cosine) when similarity reaches the threshold
+TOPIC_CLUSTERING = os.getenv("TOPIC_CLUSTERING", "true").lower() == "true"
+TOPIC_CLUSTER_THRESHOLD = float(os.getenv("TOPIC_CLUSTER_THRESHOLD", "0.7"))
+TOPIC_CACHE_SIZE = int(os.getenv("TOPIC_CACHE_SIZE", "4096"))  # Canonicalized topics memoized
+
 # Bible API settings
 BIBLE_API_BASE_URL = "https://labs.bible.org/api"
 BIBLE_API_KEY = os.getenv("BIBLE_API_KEY")  # If required, but labs.bible.org might not need one
 
-# Default translation
-DEFAULT_TRANSLATION = "NIV"  # Can be configurable
+BIBLE_API_TIMEOUT = float(os.getenv("BIBLE_API_TIMEOUT", "10"))  # Seconds per Bible API request
+BIBLE_API_POOL_SIZE = int(os.getenv("BIBLE_API_POOL_SIZE", "16"))  # Threads for hedged/speculative fetches
+
+# Hedged Bible API requests: send a duplicate when the first is slower than the
+# observed latency percentile (initial delay until enough samples are seen)
+BIBLE_API_HEDGE_ENABLED = os.getenv("BIBLE_API_HEDGE_ENABLED", "true").lower() == "true"
+BIBLE_API_HEDGE_PERCENTILE = float(os.getenv("BIBLE_API_HEDGE_PERCENTILE", "95"))
+BIBLE_API_HEDGE_MIN_DELAY = float(os.getenv("BIBLE_API_HEDGE_MIN_DELAY", "0.2"))
+BIBLE_API_HEDGE_INITIAL_DELAY = float(os.getenv("BIBLE_API_HEDGE_INITIAL_DELAY", "1.0"))
+
+# Fetch the random-verse fallback in parallel with reference generation
+SPECULATIVE_RANDOM_FALLBACK = os.getenv("SPECULATIVE_RANDOM_FALLBACK", "false").lower() == "true"
+
+# HTTP client settings
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))  # Pooled connections per upstream host
+
+# Startup warm-up: build clients and pre-open connections before reporting ready
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "false").lower() == "true"
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "5"))
+
+# Readiness probing (background; /ready only reads cached results)
+PROBE_TIMEOUT = float(os.getenv("PROBE_TIMEOUT", "5"))
+PROBE_INTERVAL_GEMINI = float(os.getenv("PROBE_INTERVAL_GEMINI", "60"))  # Only probed when gemini is in LLM_PROVIDERS
+PROBE_INTERVAL_LLM = float(os.getenv("PROBE_INTERVAL_LLM", "10"))  # Reads the LLM router's provider health
+PROBE_INTERVAL_BIBLE_API = float(os.getenv("PROBE_INTERVAL_BIBLE_API", "30"))
+PROBE_INTERVAL_SCHEDULER = float(os.getenv("PROBE_INTERVAL_SCHEDULER", "10"))
+READY_CRITICAL_DEPENDENCIES = [
+    name.strip() for name in os.getenv("READY_CRITICAL_DEPENDENCIES", "llm,bible_api,scheduler").split(",") if name.strip()
+]
+
+# Logging: written off the event loop by a queue listener thread. LOG_SAMPLE_RATES keeps
+# that fraction of sub-WARNING records per logger name prefix, e.g. {"main.access": 0.1}
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # "json" or "text"
+LOG_SAMPLE_RATES = {name: float(rate) for name, rate in json.loads(os.getenv("LOG_SAMPLE_RATES", "{}")).items()}
+LOG_REDACT_BODIES = os.getenv("LOG_REDACT_BODIES", "true").lower() == "true"  # Hide user text in logged bodies/queries
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # Records buffered before new ones are dropped
+
+# Opt-in traffic capture of /a2a requests for replay (rotating JSONL files)
+CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "false").lower() == "true"
+CAPTURE_DIR = os.getenv("CAPTURE_DIR", "captures")
+CAPTURE_MAX_BYTES = int(os.getenv("CAPTURE_MAX_BYTES", str(50 * 1024 * 1024)))
+CAPTURE_BACKUP_COUNT = int(os.getenv("CAPTURE_BACKUP_COUNT", "10"))
+
+# Token for privileged/admin operations (on-demand profiling, admin endpoints)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+# Sampling profiler: on demand via the X-Profile-Token header or {"profile": <token>}
+# message metadata, or continuously for a PROFILE_SAMPLE_RATE fraction of requests
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))  # Seconds between stack samples
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MAX_CONCURRENT = int(os.getenv("PROFILE_MAX_CONCURRENT", "1"))
+PROFILE_SCHEDULER = os.getenv("PROFILE_SCHEDULER", "false").lower() == "true"  # Always profile the daily post
+
+# Event loop lag monitor and blocking-call detector
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.1"))  # Seconds between lag measurements
+LOOP_BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD", "0.1"))  # Seconds before a callback counts as blocking
+
+# Request ingestion limits for /a2a
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_BYTES", str(1024 * 1024)))  # Larger bodies get a 413 JSON-RPC error
+MAX_HISTORY_MESSAGES = int(os.getenv("MAX_HISTORY_MESSAGES", "50"))  # Earlier execute messages kept (unvalidated) for the echo
+
+# Idempotent /a2a handling: retries with the same caller, JSON-RPC id and messageId
+# replay the stored response (or wait for the original) instead of re-running the pipeline
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "true").lower() == "true"
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "600"))  # Seconds a successful response is kept
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+
+# Admission control for /a2a: concurrency limit, queue limit and max queue wait (seconds)
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "32"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "64"))
+ADMISSION_DEADLINE = float(os.getenv("ADMISSION_DEADLINE", "20"))
+
+# WebSocket transport (/a2a/ws): each connection runs at most WS_MAX_IN_FLIGHT requests at once and
+# stops reading at the limit; replies wait in a queue of WS_SEND_QUEUE frames, and a client that
+# doesn't take a frame within WS_SEND_TIMEOUT seconds is disconnected
+WS_MAX_IN_FLIGHT = int(os.getenv("WS_MAX_IN_FLIGHT", "16"))
+WS_SEND_QUEUE = int(os.getenv("WS_SEND_QUEUE", "64"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+
+# Per-caller rate limiting (token buckets). Callers are keyed by the first of
+# X-API-Key (only keys listed in RATE_LIMIT_API_KEYS) / contextId (under the
+# client IP) / client IP available, in RATE_LIMIT_KEY_ORDER order. Opt-in: callers
+# without a listed key (Telex webhook egress, replay.py) share their IP's bucket.
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "false").lower() == "true"
+RATE_LIMIT_TIERS = os.getenv("RATE_LIMIT_TIERS", '{"default": {"rate": 2, "burst": 30}}')  # JSON: tier -> rate/burst
+RATE_LIMIT_API_KEYS = os.getenv("RATE_LIMIT_API_KEYS", "{}")  # JSON: API key -> tier name
+RATE_LIMIT_KEY_ORDER = [
+    kind.strip() for kind in os.getenv("RATE_LIMIT_KEY_ORDER", "api_key,ip").split(",") if kind.strip()
+]
+RATE_LIMIT_MAX_CALLERS = int(os.getenv("RATE_LIMIT_MAX_CALLERS", "100000"))  # Tracked callers before LRU eviction
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" or "redis" (shared across instances)
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+
+# Response size: compact profile and HTTP compression
+COMPACT_OUTPUT_MODE = "application/vnd.a2a.compact+json"  # acceptedOutputModes value selecting the compact profile
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # Bytes; smaller responses are sent as-is
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "5"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+# LLM token accounting and per-caller budgets (0 = unlimited); over-budget callers
+# get template reflections and chat replies instead of extra Gemini calls
+TOKEN_BUDGET_PER_CALLER = int(os.getenv("TOKEN_BUDGET_PER_CALLER", "0"))
+TOKEN_BUDGET_OVERRIDES = os.getenv("TOKEN_BUDGET_OVERRIDES", "{}")  # JSON: caller key -> token budget
+TOKEN_BUDGET_WINDOW = float(os.getenv("TOKEN_BUDGET_WINDOW", "86400"))  # Seconds
+TOKEN_LEDGER_MAX_KEYS = int(os.getenv("TOKEN_LEDGER_MAX_KEYS", "10000"))  # Callers/contexts kept before LRU eviction
+
+# Verse pipeline stage timeouts (seconds) and cache lifetimes (seconds, 0 disables)
+STAGE_TIMEOUT_INTENT = float(os.getenv("STAGE_TIMEOUT_INTENT", "15"))
+STAGE_TIMEOUT_REFERENCE = float(os.getenv("STAGE_TIMEOUT_REFERENCE", "15"))
+STAGE_TIMEOUT_FETCH = float(os.getenv("STAGE_TIMEOUT_FETCH", "20"))
+STAGE_TIMEOUT_REFLECTION = float(os.getenv("STAGE_TIMEOUT_REFLECTION", "15"))
+STAGE_TIMEOUT_CHAT = float(os.getenv("STAGE_TIMEOUT_CHAT", "15"))
+STAGE_CACHE_TTL_INTENT = float(os.getenv("STAGE_CACHE_TTL_INTENT", "300"))
+STAGE_CACHE_TTL_REFERENCE = float(os.getenv("STAGE_CACHE_TTL_REFERENCE", "0"))  # Off: a topic should not map to one verse
+
+# Translations. labs.bible.org only serves NET; public-domain translations (KJV, WEB, ...)
+# come from bible-api.com and any other translation needs a local store file.
+DEFAULT_TRANSLATION = os.getenv("DEFAULT_TRANSLATION", "NET").upper()
+BIBLE_API_COM_URL = os.getenv("BIBLE_API_COM_URL", "https://bible-api.com")
+CHANNEL_TRANSLATIONS = {
+    context_id: code.upper() for context_id, code in json.loads(os.getenv("CHANNEL_TRANSLATIONS", "{}")).items()
+}  # JSON: contextId -> translation code
+MAX_SIDE_BY_SIDE = int(os.getenv("MAX_SIDE_BY_SIDE", "3"))  # Translations fetched for one answer
+LOCAL_BIBLE_DIR = os.getenv("LOCAL_BIBLE_DIR")  # Optional {CODE}.json verse stores, checked before the network
+PRELOAD_TRANSLATIONS = [
+    code.strip().upper() for code in os.getenv("PRELOAD_TRANSLATIONS", "NET").split(",") if code.strip()
+]
+PRELOAD_REFERENCES = [
+    ref.strip() for ref in os.getenv("PRELOAD_REFERENCES", "John 3:16,Psalm 23:1,Jeremiah 29:11,Philippians 4:13").split(",")
+    if ref.strip()
+]  # Popular passages fetched into the cache for each preloaded translation at warm-up
+PASSAGE_CACHE_TTL = float(os.getenv("PASSAGE_CACHE_TTL", "86400"))  # Seconds, 0 disables; scripture text doesn't change
+PASSAGE_CACHE_SIZE = int(os.getenv("PASSAGE_CACHE_SIZE", "2048"))  # Passages kept per translation
+
+# Daily reading plan: precomputed per year, no verse repeats within the window (days)
+READING_PLAN_DIR = os.getenv("READING_PLAN_DIR", "plans")
+READING_PLAN_WINDOW = int(os.getenv("READING_PLAN_WINDOW", "120"))
+READING_PLAN_SEED = os.getenv("READING_PLAN_SEED", "bible-verse-agent")  # Changing it reshuffles future plans
 
 # Scheduler settings
-DAILY_POST_TIME = os.getenv("DAILY_POST_TIME") # UTC time for daily verse, e.g., 08:00
+DAILY_POST_TIME = os.getenv("DAILY_POST_TIME", "08:00") # UTC time for daily verse, e.g., 08:00
+SCHEDULER_DB_PATH = os.getenv("SCHEDULER_DB_PATH", "data/scheduler.sqlite")  # Job store and run history
+DAILY_MISFIRE_GRACE = int(os.getenv("DAILY_MISFIRE_GRACE", str(6 * 3600)))  # Seconds a missed post may still run late
+JOB_RUNS_RETENTION = int(os.getenv("JOB_RUNS_RETENTION", "500"))  # Runs kept per job
+
+# Graceful shutdown: on SIGTERM/SIGINT (python main.py) or POST /admin/drain, /ready fails at once,
+# new /a2a requests are still served for DRAIN_READY_DELAY seconds (time for load balancers to stop
+# routing here) and rejected with 503 after that, and work in flight gets DRAIN_GRACE_PERIOD seconds
+DRAIN_GRACE_PERIOD = float(os.getenv("DRAIN_GRACE_PERIOD", "30"))
+DRAIN_READY_DELAY = float(os.getenv("DRAIN_READY_DELAY", "0"))
 
 # Telex A2A settings
 TELEX_BASE_URL = os.getenv("TELEX_BASE_URL", "https://api.telex.im")
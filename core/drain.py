@@ -0,0 +1,98 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional
+
+from .config import DRAIN_GRACE_PERIOD, DRAIN_READY_DELAY
+from .metrics import gauge
+
+logger = logging.getLogger(__name__)
+
+DRAINING = gauge("draining", "1 while the instance is draining for shutdown")
+IN_FLIGHT = gauge("in_flight", "Requests and jobs in progress", ["kind"])
+
+class DrainController:
+    """
+    Drain mode for graceful shutdown. Once `begin` is called /ready fails; new
+    work is still taken for `ready_delay` seconds (so load balancers can take the
+    instance out of rotation first) and rejected after that. `wait` gives work in
+    flight up to `grace_period` seconds to finish.
+    """
+
+    def __init__(self, grace_period: float = DRAIN_GRACE_PERIOD, ready_delay: float = DRAIN_READY_DELAY):
+        self.grace_period = grace_period
+        self.ready_delay = ready_delay
+        self.started_at: Optional[float] = None
+        self.in_flight: Counter = Counter()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def draining(self) -> bool:
+        return self.started_at is not None
+
+    def accepting(self) -> bool:
+        """
+        Whether new requests and manual job runs are still taken.
+        """
+        return self.started_at is None or time.monotonic() - self.started_at < self.ready_delay
+
+    def begin(self):
+        if self.started_at is None:
+            self.started_at = time.monotonic()
+            DRAINING.set(1)
+            logger.info("Draining: %s in flight, grace period %ss", dict(self.in_flight), self.grace_period)
+
+    @asynccontextmanager
+    async def track(self, kind: str):
+        """
+        Count the block as work in flight ("request" or "job") until it exits.
+        """
+        self.in_flight[kind] += 1
+        IN_FLIGHT.set(self.in_flight[kind], kind=kind)
+        self._idle.clear()
+        try:
+            yield
+        finally:
+            self.in_flight[kind] -= 1
+            IN_FLIGHT.set(self.in_flight[kind], kind=kind)
+            if not any(self.in_flight.values()):
+                self._idle.set()
+
+    async def wait(self) -> bool:
+        """
+        Sit out the ready delay, then wait up to the grace period for work in
+        flight. Returns False if some was still running when time ran out.
+        """
+        self.begin()
+        remaining = self.ready_delay - (time.monotonic() - self.started_at)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        if self._idle.is_set():
+            return True
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout=self.grace_period)
+        except asyncio.TimeoutError:
+            logger.warning("Drain grace period over with %s still in flight", dict(+self.in_flight))
+            return False
+        logger.info("Drained in %.1fs", time.monotonic() - self.started_at)
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "draining": self.draining,
+            "accepting": self.accepting(),
+            "in_flight": dict(+self.in_flight),
+            "elapsed_s": round(time.monotonic() - self.started_at, 1) if self.started_at is not None else None,
+        }
+
+    def reset(self):
+        """
+        Leave drain mode (a new app lifespan, or tests).
+        """
+        self.started_at = None
+        DRAINING.set(0)
+
+drain = DrainController()
@@ -0,0 +1,183 @@
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .clients import get_model, get_http_session
+from .config import BIBLE_API_BASE_URL, GEMINI_MODEL, PROBE_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+    Opens after `failure_threshold` failures in a row and lets a trial call
+    through (half-open) once `reset_timeout` seconds have passed.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        return self.state != "open"
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """
+    Return the shared circuit breaker for an upstream dependency.
+    """
+    if name not in _breakers:
+        _breakers[name] = CircuitBreaker()
+    return _breakers[name]
+
+@dataclass
+class DependencyStatus:
+    name: str
+    interval: float
+    critical: bool = True
+    healthy: Optional[bool] = None  # None until the first probe finishes
+    latency_ms: Optional[float] = None
+    checked_at: Optional[str] = None
+    error: Optional[str] = None
+    details: Dict[str, Any] = field(default_factory=dict)
+
+class DependencyProber:
+    """
+    Probes each dependency in the background on its own interval and caches the result,
+    so readiness checks only read memory.
+    """
+
+    def __init__(self):
+        self._checks: Dict[str, Callable[[], Any]] = {}
+        self._status: Dict[str, DependencyStatus] = {}
+        self._tasks: list[asyncio.Task] = []
+
+    def register(self, name: str, check: Callable[[], Any], interval: float, critical: bool = True):
+        """
+        Register a check. It may be sync (run in a thread) or async, should raise on
+        failure and may return a dict of details to report.
+        """
+        self._checks[name] = check
+        self._status[name] = DependencyStatus(name=name, interval=interval, critical=critical)
+
+    async def probe(self, name: str):
+        status = self._status[name]
+        check = self._checks[name]
+        breaker = get_breaker(name)
+        start = time.perf_counter()
+        try:
+            if inspect.iscoroutinefunction(check):
+                details = await asyncio.wait_for(check(), timeout=PROBE_TIMEOUT)
+            else:
+                details = await asyncio.wait_for(asyncio.to_thread(check), timeout=PROBE_TIMEOUT)
+            status.healthy = True
+            status.error = None
+            status.details = details or {}
+            breaker.record_success()
+        except Exception as e:
+            status.healthy = False
+            status.error = str(e) or type(e).__name__
+            breaker.record_failure()
+            logger.warning("Dependency '%s' probe failed: %s", name, status.error)
+        status.latency_ms = round((time.perf_counter() - start) * 1000, 2)
+        status.checked_at = datetime.now(timezone.utc).isoformat()
+
+    async def _run(self, name: str):
+        while True:
+            await self.probe(name)
+            await asyncio.sleep(self._status[name].interval)
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._run(name), name=f"probe:{name}") for name in self._checks]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Build the readiness report from cached results; never performs I/O.
+        """
+        dependencies = {}
+        ready = True
+        for name, status in self._status.items():
+            dependencies[name] = {
+                "healthy": status.healthy,
+                "critical": status.critical,
+                "latency_ms": status.latency_ms,
+                "checked_at": status.checked_at,
+                "error": status.error,
+                "circuit": get_breaker(name).state,
+                **status.details
+            }
+            if status.critical and not status.healthy:
+                ready = False
+        return {"ready": ready, "dependencies": dependencies}
+
+def check_gemini() -> Dict[str, Any]:
+    """
+    Fetch the model's metadata; cheap and spends no tokens.
+    """
+    import google.generativeai as genai
+
+    get_model()  # Ensures the SDK is configured
+    info = genai.get_model(f"models/{GEMINI_MODEL}")
+    return {"model": info.name}
+
+def check_bible_api() -> Dict[str, Any]:
+    response = get_http_session().get(f"{BIBLE_API_BASE_URL}/?passage=John 3:16&type=json", timeout=PROBE_TIMEOUT)
+    if response.status_code != 200:
+        raise Exception(f"HTTP {response.status_code}")
+    return {}
+
+def make_llm_check(router) -> Callable[[], Awaitable[Dict[str, Any]]]:
+    """
+    Build a check that passes while the LLM router has at least one healthy provider.
+    Reads the router's own call outcomes, so it spends no tokens.
+    """
+    async def check_llm() -> Dict[str, Any]:
+        providers = {name: info["healthy"] for name, info in router.report().items()}
+        if not router.healthy():
+            raise Exception("No healthy LLM provider")
+        return {"providers": providers}
+
+    return check_llm
+
+def make_scheduler_check(scheduler) -> Callable[[], Awaitable[Dict[str, Any]]]:
+    """
+    Build a check reporting whether the scheduler is running and when it fires next.
+    """
+    async def check_scheduler() -> Dict[str, Any]:
+        if not scheduler.running:
+            raise Exception("Scheduler is not running")
+        job = scheduler.get_job("daily_verse")
+        next_run = job.next_run_time.isoformat() if job and job.next_run_time else None
+        return {"next_run_time": next_run}
+
+    return check_scheduler
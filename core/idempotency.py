@@ -0,0 +1,73 @@
+import asyncio
+from typing import Awaitable, Callable, Optional, Tuple
+
+from cachetools import TTLCache
+from starlette.responses import Response
+
+from .config import IDEMPOTENCY_TTL, IDEMPOTENCY_MAX_ENTRIES
+from .metrics import counter
+
+IDEMPOTENCY_OUTCOMES = counter("idempotency_total", "Idempotency lookups for /a2a by outcome", ["outcome"])
+
+REPLAY_HEADER = "X-Idempotent-Replay"
+
+class IdempotencyStore:
+    """
+    Results of recent /a2a requests keyed by (caller, JSON-RPC id, messageId).
+    A retry of a finished request replays its stored response; a retry of one
+    still running waits for the original instead of starting another pipeline
+    run. Only successful responses are kept, for `ttl` seconds, at most
+    `maxsize` of them. Used from the event loop only, so no locking.
+    """
+
+    def __init__(self, ttl: float = IDEMPOTENCY_TTL, maxsize: int = IDEMPOTENCY_MAX_ENTRIES):
+        self._entries: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    @staticmethod
+    def key_for(caller: str, body: Optional[dict]) -> Optional[Tuple[str, str, str]]:
+        """
+        The idempotency key of a raw request body, or None when it has no id or
+        its last message has no messageId (nothing identifies a retry then).
+        """
+        if not isinstance(body, dict):
+            return None
+        params = body.get("params") if isinstance(body.get("params"), dict) else {}
+        messages = params.get("messages")
+        message = params.get("message") or (messages[-1] if isinstance(messages, list) and messages else None)
+        message_id = message.get("messageId") if isinstance(message, dict) else None
+        rpc_id = body.get("id")
+        if not isinstance(message_id, str) or not isinstance(rpc_id, (str, int)):
+            return None
+        return caller, str(rpc_id), message_id
+
+    async def run(self, key: Tuple[str, str, str], compute: Callable[[], Awaitable[Response]]) -> Response:
+        """
+        Replay or join the request with this key, or compute it and remember the response.
+        """
+        existing: Optional[asyncio.Future] = self._entries.get(key)
+        if existing is not None:
+            IDEMPOTENCY_OUTCOMES.inc(outcome="replayed" if existing.done() else "joined")
+            status_code, body = await asyncio.shield(existing)
+            return Response(content=body, status_code=status_code, media_type="application/json",
+                            headers={REPLAY_HEADER: "true"})
+
+        IDEMPOTENCY_OUTCOMES.inc(outcome="computed")
+        future = asyncio.get_running_loop().create_future()
+        self._entries[key] = future
+        try:
+            response = await compute()
+        except BaseException as e:
+            self._entries.pop(key, None)
+            future.set_exception(e)
+            future.exception()  # Retrieved: only joined retries care
+            raise
+        future.set_result((response.status_code, response.body))
+        if response.status_code != 200:
+            self._entries.pop(key, None)  # Errors are shared with joined retries but not kept
+        return response
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        self._entries.clear()
@@ -0,0 +1,125 @@
+"""
+Bounded ingestion of /a2a requests.
+
+The body is read with a size limit, and only the message being answered (the
+last one) is validated into a model. Earlier `execute` history stays as the raw
+JSON it arrived as: it is validated lazily, one message at a time, only if it
+is echoed back in a non-compact response, and anything beyond
+MAX_HISTORY_MESSAGES is dropped.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field, ValidationError
+from starlette.requests import Request
+
+from .config import MAX_REQUEST_BYTES, MAX_HISTORY_MESSAGES
+from .metrics import counter
+from .models import A2AMessage, MessageConfiguration
+
+logger = logging.getLogger(__name__)
+
+REJECTED_REQUESTS = counter("a2a_rejected_requests_total", "A2A requests rejected before processing", ["reason"])
+
+class PayloadTooLarge(Exception):
+    def __init__(self, limit: int):
+        super().__init__(f"Request body exceeds {limit} bytes")
+        self.limit = limit
+
+async def read_body(request: Request, limit: Optional[int] = None) -> bytes:
+    """
+    Read the request body, giving up as soon as it exceeds `limit` bytes
+    (MAX_REQUEST_BYTES by default) by Content-Length when sent, else while
+    streaming. The body is cached on the request, so request.json() afterwards
+    doesn't read it again.
+    """
+    limit = limit or MAX_REQUEST_BYTES
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit:
+        REJECTED_REQUESTS.inc(reason="too_large")
+        raise PayloadTooLarge(limit)
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            REJECTED_REQUESTS.inc(reason="too_large")
+            raise PayloadTooLarge(limit)
+        chunks.append(chunk)
+    request._body = b"".join(chunks)
+    return request._body
+
+class RawMessage:
+    """
+    A history message kept as received; validated only when serialized.
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data: Any):
+        self.data = data
+
+    @property
+    def metadata(self) -> Optional[dict]:
+        metadata = self.data.get("metadata") if isinstance(self.data, dict) else None
+        return metadata if isinstance(metadata, dict) else None
+
+    def to_dict(self, exclude_none: bool = False) -> Optional[dict]:
+        try:
+            return A2AMessage.model_validate(self.data).model_dump(exclude_none=exclude_none)
+        except ValidationError:
+            logger.debug("Dropping invalid history message from the response")
+            return None
+
+# Envelopes: everything but the messages themselves is validated up front
+
+class _Envelope(BaseModel):
+    jsonrpc: Literal["2.0"] = "2.0"
+    id: str
+    method: Literal["message/send", "execute"]
+    params: Dict[str, Any]
+
+class _SendParams(BaseModel):
+    message: Any
+    configuration: MessageConfiguration = Field(default_factory=MessageConfiguration)
+
+class _ExecuteParams(BaseModel):
+    contextId: Optional[str] = None
+    taskId: Optional[str] = None
+    messages: List[Any] = Field(min_length=1)
+
+@dataclass(slots=True)
+class ParsedRequest:
+    id: str
+    method: str
+    message: A2AMessage  # The message being answered
+    history: List[RawMessage] = field(default_factory=list)  # Earlier messages, oldest first
+    context_id: Optional[str] = None
+    task_id: Optional[str] = None
+    config: dict = field(default_factory=dict)
+
+    @property
+    def messages(self) -> list:
+        return [*self.history, self.message]
+
+def parse_rpc_request(body: dict, max_history: int = MAX_HISTORY_MESSAGES) -> ParsedRequest:
+    """
+    Validate a message/send or execute request, fully validating only its last
+    message. Raises pydantic.ValidationError (a ValueError) on invalid input.
+    """
+    envelope = _Envelope.model_validate(body)
+    params = envelope.params
+    if "message" in params:
+        send = _SendParams.model_validate(params)
+        return ParsedRequest(
+            id=envelope.id, method=envelope.method, message=A2AMessage.model_validate(send.message),
+            config=send.configuration.model_dump()
+        )
+    if "messages" in params:
+        execute = _ExecuteParams.model_validate(params)
+        *history, last = execute.messages
+        return ParsedRequest(
+            id=envelope.id, method=envelope.method, message=A2AMessage.model_validate(last),
+            history=[RawMessage(m) for m in history[-max_history:]] if max_history > 0 else [],
+            context_id=execute.contextId, task_id=execute.taskId
+        )
+    raise ValueError("Invalid params: expected 'message' (message/send) or 'messages' (execute)")
@@ -0,0 +1,244 @@
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+from .config import SCHEDULER_DB_PATH, JOB_RUNS_RETENTION
+
+logger = logging.getLogger(__name__)
+
+def _connect(path: str) -> sqlite3.Connection:
+    if path != ":memory:" and os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Shared between the event loop and worker threads; every use holds a lock
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    return conn
+
+class SQLiteJobStore(BaseJobStore):
+    """
+    APScheduler job store persisted in SQLite with the standard library driver,
+    so scheduled jobs and their next run times survive restarts.
+    """
+
+    def __init__(self, path: str = SCHEDULER_DB_PATH, pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.path = path
+        self.pickle_protocol = pickle_protocol
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = _connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS apscheduler_jobs "
+                "(id TEXT PRIMARY KEY, next_run_time REAL, job_state BLOB NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_next_run_time ON apscheduler_jobs (next_run_time)")
+        return self._conn
+
+    def stored_state(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        The raw saved state of a job (trigger, next_run_time, ...), readable before the scheduler starts.
+        """
+        with self._lock:
+            row = self._db().execute("SELECT job_state FROM apscheduler_jobs WHERE id = ?", (job_id,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def lookup_job(self, job_id):
+        jobs = self._get_jobs("WHERE id = ?", (job_id,))
+        return jobs[0] if jobs else None
+
+    def get_due_jobs(self, now):
+        return self._get_jobs("WHERE next_run_time <= ?", (datetime_to_utc_timestamp(now),))
+
+    def get_next_run_time(self):
+        with self._lock:
+            row = self._db().execute(
+                "SELECT MIN(next_run_time) FROM apscheduler_jobs WHERE next_run_time IS NOT NULL"
+            ).fetchone()
+        return utc_timestamp_to_datetime(row[0]) if row and row[0] is not None else None
+
+    def get_all_jobs(self):
+        jobs = self._get_jobs()
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job):
+        try:
+            with self._lock:
+                self._db().execute(
+                    "INSERT INTO apscheduler_jobs (id, next_run_time, job_state) VALUES (?, ?, ?)",
+                    (job.id, datetime_to_utc_timestamp(job.next_run_time),
+                     pickle.dumps(job.__getstate__(), self.pickle_protocol))
+                )
+        except sqlite3.IntegrityError:
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job):
+        with self._lock:
+            cursor = self._db().execute(
+                "UPDATE apscheduler_jobs SET next_run_time = ?, job_state = ? WHERE id = ?",
+                (datetime_to_utc_timestamp(job.next_run_time),
+                 pickle.dumps(job.__getstate__(), self.pickle_protocol), job.id)
+            )
+        if cursor.rowcount == 0:
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        with self._lock:
+            cursor = self._db().execute("DELETE FROM apscheduler_jobs WHERE id = ?", (job_id,))
+        if cursor.rowcount == 0:
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        with self._lock:
+            self._db().execute("DELETE FROM apscheduler_jobs")
+
+    def shutdown(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _reconstitute_job(self, job_state: bytes) -> Job:
+        state = pickle.loads(job_state)
+        state["jobstore"] = self
+        job = Job.__new__(Job)
+        job.__setstate__(state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _get_jobs(self, where: str = "", params: tuple = ()) -> List[Job]:
+        with self._lock:
+            rows = self._db().execute(
+                f"SELECT id, job_state FROM apscheduler_jobs {where} ORDER BY next_run_time", params
+            ).fetchall()
+        jobs, failed = [], []
+        for job_id, job_state in rows:
+            try:
+                jobs.append(self._reconstitute_job(job_state))
+            except Exception:
+                logger.exception("Unable to restore job '%s' -- removing it", job_id)
+                failed.append(job_id)
+        if failed:
+            with self._lock:
+                self._db().executemany("DELETE FROM apscheduler_jobs WHERE id = ?", [(job_id,) for job_id in failed])
+        return jobs
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} (path={self.path})>"
+
+class JobRunLog:
+    """
+    History of job runs (trigger, status, duration) in the scheduler database,
+    trimmed to the latest `retention` runs per job.
+    """
+
+    def __init__(self, path: str = SCHEDULER_DB_PATH, retention: int = JOB_RUNS_RETENTION):
+        self.path = path
+        self.retention = retention
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self._conn = _connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_runs (id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT NOT NULL, "
+                "trigger TEXT NOT NULL, slot TEXT, started_at REAL NOT NULL, finished_at REAL, "
+                "duration_ms REAL, status TEXT NOT NULL, detail TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_job_runs_job ON job_runs (job_id, id)")
+        return self._conn
+
+    def start(self, job_id: str, trigger: str, slot: Optional[str] = None) -> int:
+        """
+        Record a run as started; `slot` names the scheduled occurrence it covers (e.g. "2025-01-01T08:00").
+        """
+        with self._lock:
+            cursor = self._db().execute(
+                "INSERT INTO job_runs (job_id, trigger, slot, started_at, status) VALUES (?, ?, ?, ?, 'running')",
+                (job_id, trigger, slot, time.time())
+            )
+            return cursor.lastrowid
+
+    def finish(self, run_id: int, status: str, duration_ms: float, detail: Optional[str] = None):
+        with self._lock:
+            db = self._db()
+            db.execute(
+                "UPDATE job_runs SET finished_at = ?, duration_ms = ?, status = ?, detail = ? WHERE id = ?",
+                (time.time(), round(duration_ms, 1), status, detail, run_id)
+            )
+            db.execute(
+                "DELETE FROM job_runs WHERE job_id = (SELECT job_id FROM job_runs WHERE id = ?) AND id NOT IN "
+                "(SELECT id FROM job_runs WHERE job_id = (SELECT job_id FROM job_runs WHERE id = ?) "
+                "ORDER BY id DESC LIMIT ?)",
+                (run_id, run_id, self.retention)
+            )
+
+    def slot_completed(self, job_id: str, slot: str) -> bool:
+        """
+        Whether a run for this scheduled occurrence already succeeded (e.g. before a restart).
+        """
+        with self._lock:
+            row = self._db().execute(
+                "SELECT 1 FROM job_runs WHERE job_id = ? AND slot = ? AND status = 'succeeded' LIMIT 1",
+                (job_id, slot)
+            ).fetchone()
+        return row is not None
+
+    def interrupt_running(self, detail: str = "shutdown") -> int:
+        """
+        Mark runs still in progress as interrupted, so the next instance can redo their slot.
+        """
+        with self._lock:
+            cursor = self._db().execute(
+                "UPDATE job_runs SET finished_at = ?, status = 'interrupted', detail = ? WHERE status = 'running'",
+                (time.time(), detail)
+            )
+            return cursor.rowcount
+
+    def unfinished_slots(self, job_id: str) -> List[str]:
+        """
+        Slots whose runs were interrupted (or never finished, after a crash) and never succeeded.
+        """
+        with self._lock:
+            rows = self._db().execute(
+                "SELECT DISTINCT slot FROM job_runs WHERE job_id = ? AND slot IS NOT NULL "
+                "AND status IN ('running', 'interrupted') AND slot NOT IN "
+                "(SELECT slot FROM job_runs WHERE job_id = ? AND status = 'succeeded' AND slot IS NOT NULL) "
+                "ORDER BY slot",
+                (job_id, job_id)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def runs(self, job_id: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Most recent runs first.
+        """
+        query = "SELECT id, job_id, trigger, slot, started_at, finished_at, duration_ms, status, detail FROM job_runs"
+        params: tuple = ()
+        if job_id is not None:
+            query += " WHERE job_id = ?"
+            params = (job_id,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self._lock:
+            rows = self._db().execute(query, params + (limit,)).fetchall()
+        keys = ("id", "job_id", "trigger", "slot", "started_at", "finished_at", "duration_ms", "status", "detail")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
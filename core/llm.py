@@ -0,0 +1,370 @@
+"""
+LLM providers and the router that picks one per call.
+
+Providers: Gemini, any OpenAI-compatible endpoint (OpenAI itself, or a local
+server such as llama.cpp or Ollama), a deterministic offline stub, and a fake
+with scripted latency and failures for tests. The router keeps rolling latency
+and error rate per provider, sends each call to the fastest healthy one and
+fails over to the next when a call raises. Unhealthy providers get a probe call
+now and then, so one that recovers is used again.
+
+Each stage (intent, reference, reflection, chat) has its own StageSettings:
+model, output token cap, temperature and stop sequences. The classification
+stages only ever answer with a word or a reference, so they get tiny caps.
+"""
+import itertools
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .clients import get_model
+from .config import (
+    LLM_PROVIDERS, OPENAI_API_KEY, OPENAI_BASE_URL, OPENAI_MODEL, LOCAL_LLM_BASE_URL, LOCAL_LLM_MODEL,
+    LLM_TIMEOUT, LLM_LATENCY_WINDOW, LLM_MAX_ERROR_RATE, LLM_EXPLORE_EVERY, LLM_PROBE_INTERVAL, LLM_STAGE_SETTINGS,
+    GEMINI_MODEL
+)
+from .health import CircuitBreaker
+from .metrics import RollingLatency, counter, histogram
+from .token_accounting import extract_usage
+
+logger = logging.getLogger(__name__)
+
+PROVIDER_CALLS = counter("llm_provider_calls_total", "LLM calls per provider by outcome", ["provider", "outcome"])
+PROVIDER_LATENCY = histogram("llm_provider_latency_seconds", "Latency of successful LLM calls per provider", ["provider"])
+FAILOVERS = counter("llm_failovers_total", "LLM calls retried on another provider", ["from_provider"])
+
+@dataclass(slots=True, frozen=True)
+class StageSettings:
+    """
+    Generation parameters for one stage; None leaves the provider's default.
+    `model` is a model name for every provider or a map of provider name to model.
+    """
+    model: Union[str, Dict[str, str], None] = None
+    max_output_tokens: Optional[int] = None
+    temperature: Optional[float] = None
+    stop: Tuple[str, ...] = ()
+
+    def model_for(self, provider: str) -> Optional[str]:
+        if isinstance(self.model, dict):
+            return self.model.get(provider)
+        return self.model
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StageSettings":
+        unknown = set(data) - {"model", "max_output_tokens", "temperature", "stop"}
+        if unknown:
+            raise ValueError(f"Unknown stage settings: {sorted(unknown)}")
+        stop = data.get("stop") or ()
+        return cls(
+            model=data.get("model"),
+            max_output_tokens=data.get("max_output_tokens"),
+            temperature=data.get("temperature"),
+            stop=(stop,) if isinstance(stop, str) else tuple(stop),
+        )
+
+NO_SETTINGS = StageSettings()
+
+# Intent and reference answer with a word or "Book C:V" on one line. Gemini 2.5
+# Flash spends thinking tokens out of max_output_tokens, so tiny caps there need
+# a model that doesn't think by default.
+DEFAULT_STAGE_SETTINGS: Dict[str, Dict[str, Any]] = {
+    "intent": {"model": {"gemini": "gemini-2.5-flash-lite"}, "max_output_tokens": 16, "temperature": 0.0, "stop": ["\n"]},
+    "reference": {"model": {"gemini": "gemini-2.5-flash-lite"}, "max_output_tokens": 24, "temperature": 0.0, "stop": ["\n"]},
+    "reflection": {},
+    "chat": {},
+}
+
+def load_stage_settings(overrides: Dict[str, Dict[str, Any]],
+                        defaults: Dict[str, Dict[str, Any]] = DEFAULT_STAGE_SETTINGS) -> Dict[str, StageSettings]:
+    """
+    Merge per-stage overrides (e.g. LLM_STAGE_SETTINGS) key by key over the defaults.
+    """
+    return {
+        stage: StageSettings.from_dict({**defaults.get(stage, {}), **overrides.get(stage, {})})
+        for stage in {**defaults, **overrides}
+    }
+
+STAGE_SETTINGS = load_stage_settings(LLM_STAGE_SETTINGS)
+
+@dataclass(slots=True)
+class LLMResponse:
+    text: str
+    usage: Dict[str, int] = field(default_factory=lambda: {"prompt": 0, "output": 0, "total": 0})
+    provider: str = ""
+    model: str = ""
+
+class LLMProvider:
+    """
+    One backend. `generate` is blocking and raises on any failure.
+    """
+    name = "provider"
+    model = ""
+
+    def generate(self, stage: str, prompt: str, settings: StageSettings = NO_SETTINGS) -> LLMResponse:
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Build the client ahead of the first call (blocking); nothing to do by default"""
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model: str = GEMINI_MODEL):
+        self.model = model
+
+    def warm_up(self):
+        get_model(self.model)
+
+    def generate(self, stage: str, prompt: str, settings: StageSettings = NO_SETTINGS) -> LLMResponse:
+        model = settings.model_for(self.name) or self.model
+        config = {
+            key: value for key, value in (
+                ("max_output_tokens", settings.max_output_tokens),
+                ("temperature", settings.temperature),
+                ("stop_sequences", list(settings.stop) or None),
+            ) if value is not None
+        }
+        response = get_model(model).generate_content(prompt, generation_config=config or None)
+        return LLMResponse(response.text, extract_usage(response), self.name, model)
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    Chat completions against api.openai.com or any server speaking the same API.
+    """
+
+    def __init__(self, name: str, model: str, base_url: Optional[str] = None, api_key: Optional[str] = None,
+                 timeout: float = LLM_TIMEOUT):
+        self.name = name
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    import httpx
+                    from openai import OpenAI  # Deferred like the Gemini SDK
+
+                    # Local servers usually ignore the key, but the SDK requires one. The SDK's own
+                    # httpx client passes `proxies`, which the pinned httpx no longer accepts.
+                    self._client = OpenAI(
+                        api_key=self.api_key or "unused", base_url=self.base_url, timeout=self.timeout,
+                        http_client=httpx.Client(timeout=self.timeout)
+                    )
+        return self._client
+
+    def warm_up(self):
+        self.client()
+
+    def generate(self, stage: str, prompt: str, settings: StageSettings = NO_SETTINGS) -> LLMResponse:
+        model = settings.model_for(self.name) or self.model
+        params = {
+            key: value for key, value in (
+                ("max_tokens", settings.max_output_tokens),
+                ("temperature", settings.temperature),
+                ("stop", list(settings.stop) or None),
+            ) if value is not None
+        }
+        response = self.client().chat.completions.create(
+            model=model, messages=[{"role": "user", "content": prompt}], **params
+        )
+        usage = response.usage
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        output_tokens = getattr(usage, "completion_tokens", 0) or 0
+        return LLMResponse(
+            response.choices[0].message.content or "",
+            {"prompt": prompt_tokens, "output": output_tokens,
+             "total": getattr(usage, "total_tokens", 0) or prompt_tokens + output_tokens},
+            self.name, model
+        )
+
+class StubProvider(LLMProvider):
+    """
+    Offline canned replies per stage, for local runs without credentials.
+    """
+    name = "stub"
+    model = "stub"
+
+    REPLIES = {
+        "intent": "hope",
+        "reference": "Jeremiah 29:11",
+        "reflection": "God's plans for you are good; hold on to hope today.",
+        "chat": "Hello! Would you like me to share a Bible verse? You can say something like: I need a verse on Love.",
+    }
+
+    def generate(self, stage: str, prompt: str, settings: StageSettings = NO_SETTINGS) -> LLMResponse:
+        text = self.REPLIES.get(stage, "")
+        return LLMResponse(text, {"prompt": 0, "output": 0, "total": 0}, self.name, self.model)
+
+class FakeProvider(LLMProvider):
+    """
+    Scripted provider for tests: fixed latency, replies by stage (or a function of
+    stage and prompt), and failures on demand. Replies are cut to max_output_tokens
+    words and at the first stop sequence. Records every call with its settings.
+    """
+
+    def __init__(self, name: str = "fake", reply: Union[str, Dict[str, str], Callable[[str, str], str]] = "ok",
+                 latency: float = 0.0, fail: bool = False):
+        self.name = name
+        self.model = name
+        self.reply = reply
+        self.latency = latency
+        self.fail = fail
+        self.calls: List[tuple] = []
+
+    def generate(self, stage: str, prompt: str, settings: StageSettings = NO_SETTINGS) -> LLMResponse:
+        self.calls.append((stage, prompt, settings))
+        if self.latency:
+            time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError(f"{self.name} failed")
+        if callable(self.reply):
+            text = self.reply(stage, prompt)
+        elif isinstance(self.reply, dict):
+            text = self.reply.get(stage, "")
+        else:
+            text = self.reply
+        for stop in settings.stop:
+            text = text.split(stop, 1)[0]
+        if settings.max_output_tokens is not None:
+            text = " ".join(text.split()[:settings.max_output_tokens])
+        return LLMResponse(text, {"prompt": len(prompt.split()), "output": len(text.split()),
+                                  "total": len(prompt.split()) + len(text.split())},
+                           self.name, settings.model_for(self.name) or self.model)
+
+class ProviderStats:
+    """
+    Rolling latency of successful calls, rolling error rate and a circuit breaker for one provider.
+    """
+
+    def __init__(self, window: int = LLM_LATENCY_WINDOW):
+        self.latency = RollingLatency(window=window)
+        self.outcomes: deque = deque(maxlen=window)  # True for errors
+        self.breaker = CircuitBreaker()
+        self.last_used = 0.0
+
+    @property
+    def error_rate(self) -> float:
+        outcomes = list(self.outcomes)
+        return sum(outcomes) / len(outcomes) if outcomes else 0.0
+
+    def healthy(self, max_error_rate: float) -> bool:
+        return self.breaker.allow_request() and self.error_rate <= max_error_rate
+
+    def recovered(self):
+        """Forget the failures of a provider whose probe call succeeded"""
+        self.outcomes.clear()
+        self.breaker.record_success()
+
+class ProviderRouter:
+    """
+    Orders providers by mean latency among the healthy ones (untried providers
+    first), tries them in turn until one succeeds, and re-raises the last error
+    if none does. Unhealthy providers are kept as a last resort. Every
+    `explore_every` calls the least recently used healthy provider goes first,
+    so a provider that got faster is noticed. An unhealthy provider left unused
+    for `probe_interval` seconds goes first once, as a probe; if the probe
+    succeeds its failures are forgotten. Each call uses its stage's settings.
+    """
+
+    def __init__(self, providers: List[LLMProvider], max_error_rate: float = LLM_MAX_ERROR_RATE,
+                 explore_every: int = LLM_EXPLORE_EVERY, window: int = LLM_LATENCY_WINDOW,
+                 settings: Optional[Dict[str, StageSettings]] = None, probe_interval: float = LLM_PROBE_INTERVAL):
+        if not providers:
+            raise ValueError("At least one LLM provider is required")
+        self.providers = providers
+        self.max_error_rate = max_error_rate
+        self.explore_every = explore_every
+        self.probe_interval = probe_interval
+        self.settings = STAGE_SETTINGS if settings is None else settings
+        self.stats: Dict[str, ProviderStats] = {p.name: ProviderStats(window) for p in providers}
+        self._calls = itertools.count(1)
+
+    def order(self) -> List[LLMProvider]:
+        healthy = [p for p in self.providers if self.stats[p.name].healthy(self.max_error_rate)]
+        unhealthy = [p for p in self.providers if p not in healthy]
+        # Stable sort keeps configuration order among equals; untried providers score 0
+        healthy.sort(key=lambda p: self.stats[p.name].latency.mean(default=0.0))
+        if self.explore_every and len(healthy) > 1 and next(self._calls) % self.explore_every == 0:
+            stale = min(healthy, key=lambda p: self.stats[p.name].last_used)
+            healthy.remove(stale)
+            healthy.insert(0, stale)
+        now = time.monotonic()
+        due = [p for p in unhealthy if now - self.stats[p.name].last_used >= self.probe_interval]
+        if due:
+            probe = min(due, key=lambda p: self.stats[p.name].last_used)
+            self.stats[probe.name].last_used = now  # Concurrent calls don't probe it too
+            unhealthy.remove(probe)
+            return [probe] + healthy + unhealthy
+        return healthy + unhealthy
+
+    def healthy(self) -> bool:
+        """True when at least one provider is healthy"""
+        return any(stats.healthy(self.max_error_rate) for stats in self.stats.values())
+
+    def generate(self, stage: str, prompt: str, settings: Optional[StageSettings] = None) -> LLMResponse:
+        if settings is None:
+            settings = self.settings.get(stage, NO_SETTINGS)
+        error: Optional[Exception] = None
+        previous = None
+        for provider in self.order():
+            stats = self.stats[provider.name]
+            was_healthy = stats.healthy(self.max_error_rate)
+            if error is not None:
+                FAILOVERS.inc(from_provider=previous)
+            previous = provider.name
+            stats.last_used = time.monotonic()
+            start = time.perf_counter()
+            try:
+                response = provider.generate(stage, prompt, settings)
+            except Exception as e:
+                stats.outcomes.append(True)
+                stats.breaker.record_failure()
+                PROVIDER_CALLS.inc(provider=provider.name, outcome="error")
+                logger.warning("LLM provider %s failed for stage %s: %s", provider.name, stage, e)
+                error = e
+                continue
+            elapsed = time.perf_counter() - start
+            stats.latency.observe(elapsed)
+            if was_healthy:
+                stats.outcomes.append(False)
+                stats.breaker.record_success()
+            else:
+                stats.recovered()
+                logger.info("LLM provider %s recovered", provider.name)
+            PROVIDER_CALLS.inc(provider=provider.name, outcome="ok")
+            PROVIDER_LATENCY.observe(elapsed, provider=provider.name)
+            return response
+        raise error
+
+    def report(self) -> Dict[str, dict]:
+        return {
+            p.name: {
+                "model": p.model,
+                "mean_latency_s": round(self.stats[p.name].latency.mean(), 4),
+                "error_rate": round(self.stats[p.name].error_rate, 3),
+                "breaker": self.stats[p.name].breaker.state,
+                "healthy": self.stats[p.name].healthy(self.max_error_rate),
+            }
+            for p in self.providers
+        }
+
+def build_provider(name: str) -> LLMProvider:
+    if name == "gemini":
+        return GeminiProvider()
+    if name == "openai":
+        return OpenAICompatibleProvider("openai", OPENAI_MODEL, OPENAI_BASE_URL, OPENAI_API_KEY)
+    if name == "local":
+        return OpenAICompatibleProvider("local", LOCAL_LLM_MODEL, LOCAL_LLM_BASE_URL)
+    if name == "stub":
+        return StubProvider()
+    raise ValueError(f"Unknown LLM provider: {name!r}")
+
+router = ProviderRouter([build_provider(name) for name in LLM_PROVIDERS])
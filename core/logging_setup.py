@@ -0,0 +1,189 @@
+"""
+Non-blocking structured logging.
+
+Records are put on a bounded queue by the thread that logs them; a QueueListener
+thread formats them (JSON by default) and writes them out, so the event loop
+never formats a message or touches a stream. Each record carries the caller,
+contextId and taskId of the request that logged it. High-volume loggers can be
+sampled, and message bodies are redacted unless LOG_REDACT_BODIES is off.
+"""
+import atexit
+import itertools
+import json
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from .capture import sanitize
+from .config import LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATES, LOG_REDACT_BODIES, LOG_QUEUE_SIZE
+from .metrics import counter
+from .request_context import caller_var, context_id_var, task_id_var
+
+LOG_RECORDS_DROPPED = counter("log_records_dropped_total", "Log records not written, by reason", ["reason"])
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskId", "contextId", "caller"}
+
+class Redacted:
+    """
+    Log argument that hides user text when rendered: strings become their length and
+    "text" fields of bodies are replaced, credentials are always masked. Rendering
+    only happens if the record is actually written (on the listener thread).
+    """
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __str__(self) -> str:
+        if not LOG_REDACT_BODIES:
+            return str(sanitize(self.value))
+        if isinstance(self.value, str):
+            return f"<{len(self.value)} chars>"
+        return str(_redact(sanitize(self.value)))
+
+def _redact(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: f"<{len(item)} chars>" if key == "text" and isinstance(item, str) else _redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, list):
+        return [_redact(item) for item in value]
+    return value
+
+class ContextFilter(logging.Filter):
+    """
+    Stamp records with the current request's caller, contextId and taskId.
+    Attached to the queue handler, so it runs on the calling thread, where the
+    request's context variables are visible, before the record is handed to the
+    listener thread.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.caller = caller_var.get()
+        record.contextId = context_id_var.get()
+        record.taskId = task_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep one in round(1 / rate) records below WARNING for loggers with a sample
+    rate (the longest matching logger-name prefix wins). Deterministic, so a
+    rate of 0.1 keeps exactly every tenth line.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._counters: Dict[str, itertools.count] = {}
+        self._periods: Dict[str, Optional[int]] = {}
+
+    def _period(self, name: str) -> Optional[int]:
+        if name not in self._periods:
+            prefix = max((p for p in self.rates if name == p or name.startswith(p + ".")), key=len, default=None)
+            rate = self.rates[prefix] if prefix is not None else 1.0
+            self._periods[name] = None if rate >= 1 else (0 if rate <= 0 else max(1, round(1 / rate)))
+        return self._periods[name]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        period = self._period(record.name)
+        if period is None:
+            return True
+        if period and next(self._counters.setdefault(record.name, itertools.count())) % period == 0:
+            return True
+        LOG_RECORDS_DROPPED.inc(reason="sampled")
+        return False
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Enqueue records as they are: the message is formatted by the listener, not the
+    caller. Records are dropped (and counted) instead of blocking when the queue is full.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record  # Same process: no pickling, so args and exc_info can travel unformatted
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc(reason="queue_full")
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: time, level, logger, message, request context and any `extra=` fields.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("taskId", "contextId", "caller"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(contextId)s %(taskId)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        for key in ("taskId", "contextId"):
+            if getattr(record, key, None) is None:
+                setattr(record, key, "-")
+        return super().format(record)
+
+_listener: Optional[QueueListener] = None
+
+def configure_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, sample_rates: Dict[str, float] = LOG_SAMPLE_RATES,
+                      stream=None, queue_size: int = LOG_QUEUE_SIZE) -> QueueListener:
+    """
+    Route the root logger through a queue to a listener thread writing `stream`
+    (stderr by default). Replaces previously configured handlers; safe to call again.
+    """
+    global _listener
+    stop_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    handler.addFilter(SamplingFilter(sample_rates))
+    handler.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging():
+    """
+    Write out queued records and stop the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
@@ -0,0 +1,99 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, Optional
+
+from .config import LOOP_LAG_INTERVAL, LOOP_BLOCK_THRESHOLD
+from .metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LOOP_LAG = histogram(
+    "event_loop_lag_seconds", "Delay between when a loop timer was due and when it ran",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+)
+LOOP_BLOCKED = counter("event_loop_blocked_total", "Times the event loop was blocked past the threshold", ["site"])
+
+def _is_project_frame(filename: str) -> bool:
+    return filename.startswith(PROJECT_ROOT) and "site-packages" not in filename and "/tests/" not in filename
+
+def blocking_call_site(frame) -> str:
+    """
+    Name the innermost project frame of a blocked stack ("core/ai_service.py:27 in extract_topic"),
+    falling back to the innermost frame when no project code is on the stack.
+    """
+    innermost = frame
+    while frame is not None:
+        if _is_project_frame(frame.f_code.co_filename):
+            innermost = frame
+            break
+        frame = frame.f_back
+    filename = os.path.relpath(innermost.f_code.co_filename, PROJECT_ROOT) if _is_project_frame(innermost.f_code.co_filename) else innermost.f_code.co_filename
+    return f"{filename}:{innermost.f_lineno} in {innermost.f_code.co_name}"
+
+class LoopMonitor:
+    """
+    Measures event loop lag continuously and catches callbacks that block the loop.
+
+    A coroutine wakes every `interval` seconds, records how late it woke up and
+    updates a heartbeat. A watchdog thread notices when the heartbeat stops for more
+    than `threshold` seconds, grabs the loop thread's stack while it is still
+    blocked, logs it and counts the offending call site.
+    """
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL, threshold: float = LOOP_BLOCK_THRESHOLD):
+        self.interval = interval
+        self.threshold = threshold
+        self.sites: Dict[str, int] = {}
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    async def _measure_lag(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            scheduled = loop.time()
+            await asyncio.sleep(self.interval)
+            LOOP_LAG.observe(max(0.0, loop.time() - scheduled - self.interval))
+            self._heartbeat = time.monotonic()
+
+    def _watch(self):
+        reported = None
+        while not self._stop.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            stalled = time.monotonic() - heartbeat - self.interval
+            if stalled < self.threshold or heartbeat == reported:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            reported = heartbeat  # One report per stall
+            site = blocking_call_site(frame)
+            self.sites[site] = self.sites.get(site, 0) + 1
+            LOOP_BLOCKED.inc(site=site)
+            stack = "".join(traceback.format_stack(frame))
+            logger.warning("Event loop blocked for %.0f ms at %s\n%s", stalled * 1000, site, stack)
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.create_task(self._measure_lag(), name="loop-lag-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._watchdog:
+            self._watchdog.join()
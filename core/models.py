@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field
+from dataclasses import dataclass, field
 from typing import Literal, Optional, List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 from uuid import uuid4
 import time
 
@@ -28,6 +29,7 @@ class MessageConfiguration(BaseModel):
     blocking: bool = True
     acceptedOutputModes: List[str] = ["text/plain"]
     pushNotificationConfig: Optional[PushNotificationConfig] = None
+    translation: Optional[str | List[str]] = None  # e.g. "KJV" or ["NET", "KJV"] for side-by-side
 
 class MessageParams(BaseModel):
     message: A2AMessage
@@ -72,12 +74,94 @@ class JSONRPCResponse(BaseModel):
 class VerseRequestParams(BaseModel):
     query: str
 
-class VerseResult(BaseModel):
+@dataclass(slots=True)
+class VerseResult:
     topic: str
     verse_reference: str
     verse_text: str
     reflection: Optional[str] = None
-    timestamp: float = time.time()
+    timestamp: float = field(default_factory=time.time)
+    translation: Optional[str] = None  # Translation of verse_text
+    alternates: Optional[Dict[str, str]] = None  # Side-by-side texts by translation code
+
+# Internal response records. The pipelines build these slotted dataclasses instead of
+# the Pydantic models above; to_dict() produces the same JSON as the models'
+# model_dump(), so Pydantic is only used to validate requests.
+
+def _utc_now_iso() -> str:
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
+
+def _drop_none(data: dict, exclude_none: bool) -> dict:
+    return {key: value for key, value in data.items() if value is not None} if exclude_none else data
+
+@dataclass(slots=True)
+class PartRecord:
+    kind: str
+    text: Optional[str] = None
+    data: Optional[Any] = None
+    file_url: Optional[str] = None
+
+    def to_dict(self, exclude_none: bool = False) -> dict:
+        return _drop_none({"kind": self.kind, "text": self.text, "data": self.data, "file_url": self.file_url},
+                          exclude_none)
+
+@dataclass(slots=True)
+class MessageRecord:
+    role: str
+    parts: List[PartRecord]
+    taskId: Optional[str] = None
+    messageId: str = field(default_factory=lambda: str(uuid4()))
+    metadata: Optional[Dict[str, Any]] = None
+
+    def to_dict(self, exclude_none: bool = False) -> dict:
+        return _drop_none({
+            "kind": "message",
+            "role": self.role,
+            "parts": [part.to_dict(exclude_none) for part in self.parts],
+            "messageId": self.messageId,
+            "taskId": self.taskId,
+            "metadata": self.metadata,
+        }, exclude_none)
+
+@dataclass(slots=True)
+class ArtifactRecord:
+    name: str
+    parts: List[PartRecord]
+    artifactId: str = field(default_factory=lambda: str(uuid4()))
+
+    def to_dict(self, exclude_none: bool = False) -> dict:
+        return {"artifactId": self.artifactId, "name": self.name, "parts": [part.to_dict(exclude_none) for part in self.parts]}
+
+@dataclass(slots=True)
+class TaskRecord:
+    """
+    A completed A2A task (serializes like TaskResult). `history` holds the inbound
+    messages (A2AMessage models or raw history, see core.ingest) followed by response records.
+    """
+    id: str
+    contextId: str
+    state: str
+    message: Optional[MessageRecord] = None
+    artifacts: List[ArtifactRecord] = field(default_factory=list)
+    history: List[Any] = field(default_factory=list)
+    timestamp: str = field(default_factory=_utc_now_iso)
+
+    def to_dict(self, exclude_none: bool = False) -> dict:
+        status = {"state": self.state, "timestamp": self.timestamp,
+                  "message": self.message.to_dict(exclude_none) if self.message else None}
+        return {
+            "id": self.id,
+            "contextId": self.contextId,
+            "status": _drop_none(status, exclude_none),
+            "artifacts": [artifact.to_dict(exclude_none) for artifact in self.artifacts],
+            "history": [
+                dumped for dumped in (
+                    message.model_dump(exclude_none=exclude_none) if isinstance(message, BaseModel) else message.to_dict(exclude_none)
+                    for message in self.history
+                ) if dumped is not None  # Invalid raw history messages are dropped
+            ],
+            "kind": "task",
+        }
 
 class ErrorResponse(BaseModel):
     code: int
@@ -0,0 +1,218 @@
+import asyncio
+import inspect
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, Iterable, Optional
+
+from cachetools import TTLCache
+
+from .metrics import counter, histogram
+
+logger = logging.getLogger(__name__)
+
+STAGE_DURATION = histogram(
+    "pipeline_stage_duration_seconds", "Time spent in each pipeline stage", ["pipeline", "stage"],
+    buckets=(0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+STAGE_OUTCOMES = counter(
+    "pipeline_stage_total", "Pipeline stage runs by outcome (ok, cache_hit, fallback, error, cancelled)",
+    ["pipeline", "stage", "outcome"]
+)
+
+EXECUTORS = ("async", "thread", "inline")
+
+class StageCache:
+    """
+    TTL cache for a stage's results. `key` maps the run context to a cache key;
+    returning None skips the cache for that run.
+    """
+
+    def __init__(self, key: Callable[[dict], Optional[Hashable]], ttl: float, maxsize: int = 1024):
+        self.key = key
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        with self._lock:
+            if key in self._cache:
+                return True, self._cache[key]
+        return False, None
+
+    def set(self, key: Hashable, value: Any):
+        with self._lock:
+            self._cache[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+@dataclass
+class Stage:
+    """
+    One step of a pipeline.
+
+    `func` receives the run context: the pipeline inputs plus the result of every
+    stage in `deps`. `executor` is "async" for coroutine functions, "thread" for
+    blocking calls (run via asyncio.to_thread) or "inline" for cheap CPU work on
+    the loop. When the stage raises or times out, `fallback(ctx, error)` supplies
+    the result instead; stages in `fallback_deps` are only awaited at that point,
+    so they run alongside the stage rather than before it.
+    """
+    name: str
+    func: Callable[[dict], Any]
+    deps: tuple[str, ...] = ()
+    executor: str = "thread"
+    timeout: Optional[float] = None
+    cache: Optional[StageCache] = None
+    fallback: Optional[Callable[[dict, Exception], Any]] = None
+    fallback_deps: tuple[str, ...] = ()
+
+    def __post_init__(self):
+        if self.executor not in EXECUTORS:
+            raise ValueError(f"Stage '{self.name}' has unknown executor '{self.executor}'")
+
+@dataclass
+class PipelineRun:
+    results: Dict[str, Any] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)  # Stage name -> seconds
+    fallbacks: Dict[str, str] = field(default_factory=dict)  # Stage name -> error that triggered the fallback
+
+class Pipeline:
+    """
+    A graph of stages run as concurrently as their dependencies allow.
+
+    Every stage becomes a task as soon as the run starts and waits only on its own
+    dependencies, so independent stages overlap automatically. Stages nobody ended
+    up waiting for (e.g. an unused fallback prefetch) are cancelled once the
+    targets are done.
+    """
+
+    def __init__(self, name: str, stages: Iterable[Stage]):
+        self.name = name
+        self.stages: Dict[str, Stage] = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise ValueError(f"Duplicate stage '{stage.name}' in pipeline '{name}'")
+            self.stages[stage.name] = stage
+        for stage in self.stages.values():
+            for dep in stage.deps + stage.fallback_deps:
+                if dep not in self.stages:
+                    raise ValueError(f"Stage '{stage.name}' depends on unknown stage '{dep}'")
+        self.order = self._toposort()
+
+    def _toposort(self) -> list[str]:
+        order, visiting, done = [], set(), set()
+
+        def visit(name: str):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Dependency cycle through stage '{name}' in pipeline '{self.name}'")
+            visiting.add(name)
+            stage = self.stages[name]
+            for dep in stage.deps + stage.fallback_deps:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _required(self, targets: Iterable[str]) -> set[str]:
+        required, pending = set(), list(targets)
+        while pending:
+            name = pending.pop()
+            if name not in self.stages:
+                raise KeyError(f"Unknown stage '{name}' in pipeline '{self.name}'")
+            if name not in required:
+                required.add(name)
+                pending.extend(self.stages[name].deps + self.stages[name].fallback_deps)
+        return required
+
+    async def _call(self, stage: Stage, fn: Callable, *args) -> Any:
+        if stage.executor == "thread":
+            call = asyncio.to_thread(fn, *args)
+        elif stage.executor == "async":
+            call = fn(*args)
+        else:
+            return fn(*args)
+        if stage.timeout is not None:
+            return await asyncio.wait_for(call, timeout=stage.timeout)
+        return await call
+
+    async def _run_stage(self, stage: Stage, ctx: dict, tasks: Dict[str, asyncio.Task], run: PipelineRun) -> Any:
+        start = None
+        outcome = "ok"
+        try:
+            try:
+                for dep in stage.deps:
+                    ctx[dep] = await tasks[dep]
+                start = time.perf_counter()  # Time spent waiting on dependencies isn't this stage's
+                cache_key = stage.cache.key(ctx) if stage.cache else None
+                if cache_key is not None:
+                    hit, value = stage.cache.get(cache_key)
+                    if hit:
+                        outcome = "cache_hit"
+                        return value
+                result = await self._call(stage, stage.func, ctx)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A failed dependency counts as a failure of this stage too
+                if stage.fallback is None:
+                    outcome = "error"
+                    raise
+                start = start if start is not None else time.perf_counter()
+                error = str(e) or type(e).__name__
+                logger.warning("Stage '%s.%s' failed, using fallback: %s", self.name, stage.name, error)
+                for dep in stage.fallback_deps:
+                    ctx[dep] = await tasks[dep]
+                outcome = "fallback"
+                run.fallbacks[stage.name] = error
+                # Fallbacks run on the stage's executor but are not bound by its timeout
+                if stage.executor == "thread":
+                    return await asyncio.to_thread(stage.fallback, ctx, e)
+                result = stage.fallback(ctx, e)
+                return await result if inspect.isawaitable(result) else result
+            if cache_key is not None:
+                stage.cache.set(cache_key, result)
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start if start is not None else 0.0
+            run.timings[stage.name] = elapsed
+            STAGE_DURATION.observe(elapsed, pipeline=self.name, stage=stage.name)
+            STAGE_OUTCOMES.inc(pipeline=self.name, stage=stage.name, outcome=outcome)
+
+    async def run(self, inputs: dict, targets: Optional[Iterable[str]] = None) -> PipelineRun:
+        """
+        Run the stages needed for `targets` (default: every stage) and return their results.
+        The first stage error without a fallback is raised after the other stages are cancelled.
+        """
+        required = self._required(targets) if targets is not None else set(self.stages)
+        targets = list(targets) if targets is not None else self.order
+        ctx = dict(inputs)
+        run = PipelineRun()
+        tasks: Dict[str, asyncio.Task] = {}
+        for name in self.order:
+            if name in required:
+                tasks[name] = asyncio.ensure_future(self._run_stage(self.stages[name], ctx, tasks, run))
+
+        try:
+            await asyncio.gather(*(tasks[name] for name in targets))
+        finally:
+            for task in tasks.values():
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        for name, task in tasks.items():
+            if not task.cancelled() and task.exception() is None:
+                run.results[name] = task.result()
+        return run
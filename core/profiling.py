@@ -0,0 +1,199 @@
+import asyncio
+import concurrent.futures.thread
+import contextvars
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional
+
+from .auth import is_privileged
+from .config import PROFILE_DIR, PROFILE_INTERVAL, PROFILE_SAMPLE_RATE, PROFILE_MAX_CONCURRENT
+from .request_context import profiler_var
+
+logger = logging.getLogger(__name__)
+
+_HANDLE_RUN = asyncio.events.Handle._run.__code__
+_WORK_ITEM_RUN = concurrent.futures.thread._WorkItem.run.__code__
+
+def _work_context(frame) -> Optional[contextvars.Context]:
+    """
+    The context of the work a thread is running: the event loop callback's (task
+    steps run in their task's context) or the executor work item's (asyncio.to_thread
+    and copy_context().run submissions). None when the thread runs neither.
+    """
+    while frame is not None:
+        if frame.f_code is _HANDLE_RUN:
+            return frame.f_locals["self"]._context
+        if frame.f_code is _WORK_ITEM_RUN:
+            fn = frame.f_locals["self"].fn
+            context = getattr(getattr(fn, "func", fn), "__self__", None)  # partial(ctx.run, ...) or ctx.run
+            return context if isinstance(context, contextvars.Context) else None
+        frame = frame.f_back
+    return None
+
+class SamplingProfiler:
+    """
+    Wall-clock sampling profiler built on sys._current_frames().
+    A background thread records the stacks of the profiled work each `interval`
+    seconds, on the event loop and on the worker threads running blocking SDK
+    calls alike. Work belongs to the profile when its context carries this
+    profiler in `profiler_var` (loop callbacks and executor work items), or when
+    it runs on the starting thread outside either (a synchronous block, the idle
+    loop). Other requests, probes and the log listener are left out and counted
+    in `skipped`.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL):
+        self.interval = interval
+        self.frames: list[tuple[str, str, int]] = []
+        self._frame_index: dict[tuple[str, str, int], int] = {}
+        self.samples: dict[str, list[list[int]]] = {}  # thread name -> stacks (root first)
+        self.started_at = 0.0
+        self.duration = 0.0
+        self.skipped = 0  # Samples of other work
+        self.owner: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _frame_id(self, frame) -> int:
+        code = frame.f_code
+        key = (code.co_name, code.co_filename, frame.f_lineno)
+        index = self._frame_index.get(key)
+        if index is None:
+            index = self._frame_index[key] = len(self.frames)
+            self.frames.append(key)
+        return index
+
+    def _sample(self):
+        me = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            context = _work_context(frame)
+            owned = context.get(profiler_var) is self if context is not None else ident == self.owner
+            if not owned:
+                self.skipped += 1
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.setdefault(names.get(ident, str(ident)), []).append(stack)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self):
+        self.owner = threading.get_ident()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def to_speedscope(self, name: str) -> dict:
+        """
+        Export as a speedscope file (https://www.speedscope.app), one profile per thread.
+        """
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "bible-verse-agent",
+            "shared": {
+                "frames": [{"name": func, "file": file, "line": line} for func, file, line in self.frames]
+            },
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": thread_name,
+                    "unit": "seconds",
+                    "startValue": 0,
+                    "endValue": self.duration,
+                    "samples": stacks,
+                    "weights": [self.interval] * len(stacks),
+                }
+                for thread_name, stacks in self.samples.items()
+            ],
+        }
+
+    def to_collapsed(self) -> str:
+        """
+        Export in the collapsed-stack format read by flamegraph.pl and friends.
+        """
+        counts: dict[str, int] = {}
+        for thread_name, stacks in self.samples.items():
+            for stack in stacks:
+                line = ";".join([thread_name] + [f"{self.frames[i][0]} ({os.path.basename(self.frames[i][1])}:{self.frames[i][2]})" for i in stack])
+                counts[line] = counts.get(line, 0) + 1
+        return "\n".join(f"{line} {count}" for line, count in counts.items())
+
+_active = 0
+_active_lock = threading.Lock()
+
+def should_profile(token: Optional[str] = None) -> bool:
+    """
+    Profile when explicitly requested with the admin token, or for a random
+    PROFILE_SAMPLE_RATE fraction of calls.
+    """
+    return is_privileged(token) or (PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE)
+
+def start_profile() -> Optional[SamplingProfiler]:
+    """
+    Start a profiler for the current context (the calling task and anything it
+    starts afterwards), or return None if PROFILE_MAX_CONCURRENT are already running.
+    """
+    global _active
+    with _active_lock:
+        if _active >= PROFILE_MAX_CONCURRENT:
+            return None
+        _active += 1
+    profiler = SamplingProfiler()
+    profiler_var.set(profiler)
+    profiler.start()
+    return profiler
+
+def finish_profile(profiler: SamplingProfiler, name: str) -> str:
+    """
+    Stop the profiler and write its speedscope file; returns the file path.
+    Blocking, so async callers should run it in a thread.
+    """
+    global _active
+    try:
+        profiler.stop()
+        safe_name = re.sub(r"[^A-Za-z0-9_.-]", "_", name)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{safe_name}-{stamp}.speedscope.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(profiler.to_speedscope(name), f)
+        logger.info("Saved profile for '%s' (%.1f ms) to %s", name, profiler.duration * 1000, path)
+        return path
+    finally:
+        with _active_lock:
+            _active -= 1
+
+@contextmanager
+def profiled(name: str, force: bool = False):
+    """
+    Profile a synchronous block when forced or sampled.
+    """
+    profiler = start_profile() if force or should_profile() else None
+    try:
+        yield profiler
+    finally:
+        if profiler:
+            finish_profile(profiler, name)
+            profiler_var.set(None)
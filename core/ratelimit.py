@@ -0,0 +1,196 @@
+import hashlib
+import inspect
+import json
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from .config import (
+    RATE_LIMIT_TIERS, RATE_LIMIT_API_KEYS, RATE_LIMIT_KEY_ORDER, RATE_LIMIT_MAX_CALLERS,
+    RATE_LIMIT_BACKEND, RATE_LIMIT_REDIS_URL
+)
+from .metrics import counter
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = counter("rate_limited_total", "Requests rejected by per-caller rate limits", ["tier"])
+
+@dataclass(frozen=True)
+class Tier:
+    name: str
+    rate: float  # Tokens refilled per second
+    burst: int   # Bucket capacity
+
+@dataclass(frozen=True)
+class RateDecision:
+    allowed: bool
+    remaining: int
+    retry_after: int  # Whole seconds until a token is available (0 when allowed)
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+class InMemoryBackend:
+    """
+    Token buckets in a bounded LRU map; idle callers are evicted first.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_CALLERS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, rate: float, burst: int, cost: int = 1) -> RateDecision:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(burst, now)
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated) * rate)
+                bucket.updated = now
+
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+                return RateDecision(True, int(bucket.tokens), 0)
+            return RateDecision(False, 0, max(1, math.ceil((cost - bucket.tokens) / rate)))
+
+class RedisBackend:
+    """
+    Token buckets shared between instances through Redis (requires the `redis` package).
+    Uses the asyncio client so a slow Redis never blocks the event loop.
+    """
+
+    SCRIPT = """
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local rate, burst, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+    local tokens = tonumber(bucket[1]) or burst
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(burst, tokens + (now - updated) * rate)
+    local allowed = 0
+    if tokens >= cost then
+        tokens = tokens - cost
+        allowed = 1
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+    return {allowed, tostring(tokens)}
+    """
+
+    def __init__(self, url: str):
+        from redis import asyncio as redis  # Optional dependency, only needed for the shared backend
+
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(self.SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int, cost: int = 1) -> RateDecision:
+        allowed, tokens = await self._script(keys=[f"ratelimit:{key}"], args=[rate, burst, cost, time.time()])
+        tokens = float(tokens)
+        if allowed:
+            return RateDecision(True, int(tokens), 0)
+        return RateDecision(False, 0, max(1, math.ceil((cost - tokens) / rate)))
+
+def load_tiers(raw: str) -> Dict[str, Tier]:
+    """
+    Parse RATE_LIMIT_TIERS, e.g. {"default": {"rate": 2, "burst": 30}, "partner": {"rate": 10, "burst": 100}}.
+    """
+    tiers = {name: Tier(name, float(spec["rate"]), int(spec["burst"])) for name, spec in json.loads(raw).items()}
+    if "default" not in tiers:
+        raise ValueError("RATE_LIMIT_TIERS must define a 'default' tier")
+    return tiers
+
+def hash_key(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()[:16]
+
+def identity(caller: str) -> str:
+    """
+    The API key or IP part of a caller key, without any contextId ("ip:1.2.3.4/ctx:abc" -> "ip:1.2.3.4").
+    """
+    return caller.split("/ctx:", 1)[0]
+
+class RateLimiter:
+    """
+    Per-caller rate limits with per-tier budgets and queryable usage counters.
+    """
+
+    def __init__(self, tiers: Optional[Dict[str, Tier]] = None, api_key_tiers: Optional[Dict[str, str]] = None,
+                 backend=None, max_callers: int = RATE_LIMIT_MAX_CALLERS, key_order: Optional[List[str]] = None):
+        self.tiers = tiers or load_tiers(RATE_LIMIT_TIERS)
+        # Keyed by hashed API key so raw keys are never stored or reported
+        self.api_key_tiers = {hash_key(key): tier for key, tier in (api_key_tiers or json.loads(RATE_LIMIT_API_KEYS)).items()}
+        self.backend = backend or InMemoryBackend(max_callers)
+        self.max_callers = max_callers
+        self.key_order = key_order or RATE_LIMIT_KEY_ORDER
+        self._usage: "OrderedDict[str, Dict[str, object]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def identify(self, api_key: Optional[str], context_id: Optional[str], client_ip: Optional[str]) -> tuple[str, str]:
+        """
+        Pick the caller key (first available per key_order) and its tier.
+
+        Only API keys listed in RATE_LIMIT_API_KEYS identify a caller; any other key
+        is ignored, so making up keys can't buy fresh buckets. Contexts are keyed
+        under the client IP for the same reason.
+        """
+        key_hash = hash_key(api_key) if api_key else None
+        known_key = key_hash in self.api_key_tiers
+        ip = f"ip:{client_ip}" if client_ip else "anonymous"
+        candidates = {
+            "api_key": f"key:{key_hash}" if known_key else None,
+            "context": f"{ip}/ctx:{context_id}" if context_id else None,
+            "ip": ip if client_ip else None,
+        }
+        caller = next((candidates[kind] for kind in self.key_order if candidates.get(kind)), "anonymous")
+        tier = self.api_key_tiers[key_hash] if known_key else "default"
+        return caller, tier if tier in self.tiers else "default"
+
+    async def check(self, caller: str, tier_name: str = "default", cost: int = 1) -> RateDecision:
+        tier = self.tiers.get(tier_name, self.tiers["default"])
+        try:
+            decision = self.backend.take(caller, tier.rate, tier.burst, cost)
+            if inspect.isawaitable(decision):
+                decision = await decision
+        except Exception as e:
+            # Fail open: a broken shared backend must not take the service down
+            logger.error("Rate limit backend failed: %s", e)
+            decision = RateDecision(True, tier.burst, 0)
+        self._count(caller, tier.name, decision.allowed)
+        if not decision.allowed:
+            RATE_LIMITED.inc(tier=tier.name)
+        return decision
+
+    def _count(self, caller: str, tier: str, allowed: bool):
+        with self._lock:
+            usage = self._usage.get(caller)
+            if usage is None:
+                usage = self._usage[caller] = {"tier": tier, "allowed": 0, "limited": 0, "last_seen": 0.0}
+                if len(self._usage) > self.max_callers:
+                    self._usage.popitem(last=False)
+            else:
+                self._usage.move_to_end(caller)
+            usage["allowed" if allowed else "limited"] += 1
+            usage["last_seen"] = time.time()
+
+    def usage(self, caller: Optional[str] = None) -> Dict[str, Dict[str, object]]:
+        """
+        Usage counters for one caller, or for every tracked caller.
+        """
+        with self._lock:
+            if caller is not None:
+                return {caller: dict(self._usage[caller])} if caller in self._usage else {}
+            return {key: dict(value) for key, value in self._usage.items()}
+
+def create_rate_limiter() -> RateLimiter:
+    backend = RedisBackend(RATE_LIMIT_REDIS_URL) if RATE_LIMIT_BACKEND == "redis" else None
+    return RateLimiter(backend=backend)
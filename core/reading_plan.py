@@ -0,0 +1,553 @@
+"""
+Deterministic daily reading plan.
+
+A year's plan is precomputed from a curated pool of verses: testaments are kept
+balanced, themed seasons (New Year, Lent, Easter, Advent, Christmas) prefer
+matching verses, and no verse repeats within READING_PLAN_WINDOW days. Plans
+are stored as compact indexed JSON files, so picking the daily verse is a list
+lookup by day of year; prefetched plans carry the verse texts too and need no
+network at all.
+
+    python -m core.reading_plan build --year 2026 --prefetch
+    python -m core.reading_plan validate --year 2026 --fetch
+    python -m core.reading_plan show --date 2026-12-25
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from .config import READING_PLAN_DIR, READING_PLAN_WINDOW, READING_PLAN_SEED, DEFAULT_TRANSLATION
+
+logger = logging.getLogger(__name__)
+
+PLAN_VERSION = 1
+
+@dataclass(frozen=True)
+class PlanVerse:
+    reference: str
+    testament: str  # "OT" or "NT"
+    themes: Tuple[str, ...] = ()
+
+def _verses(testament: str, rows: str) -> List[PlanVerse]:
+    verses = []
+    for row in rows.strip().splitlines():
+        reference, _, themes = row.partition("|")
+        verses.append(PlanVerse(reference.strip(), testament, tuple(t.strip() for t in themes.split(",") if t.strip())))
+    return verses
+
+# Curated pool: well-known single verses and short passages, tagged with themes
+CURATED_VERSES: Tuple[PlanVerse, ...] = tuple(_verses("OT", """
+Genesis 1:1|creation
+Genesis 1:27|creation
+Genesis 28:15|comfort,guidance
+Genesis 50:20|hope
+Exodus 14:14|strength,peace
+Exodus 15:2|strength,joy
+Exodus 33:14|peace
+Numbers 6:24-26|peace
+Deuteronomy 6:5|love
+Deuteronomy 31:6|courage,strength
+Deuteronomy 31:8|courage,comfort
+Joshua 1:9|courage,strength
+Joshua 24:15|faith
+Ruth 1:16|love
+1 Samuel 16:7|wisdom
+2 Samuel 22:31|faith
+1 Chronicles 16:11|prayer,strength
+1 Chronicles 16:34|gratitude
+2 Chronicles 7:14|prayer,forgiveness,lent
+Nehemiah 8:10|joy,strength
+Job 19:25|hope,easter
+Psalm 1:1-2|wisdom
+Psalm 4:8|peace
+Psalm 9:10|faith
+Psalm 16:11|joy
+Psalm 18:2|strength
+Psalm 19:1|creation
+Psalm 19:14|prayer
+Psalm 23:1|comfort,provision
+Psalm 23:4|comfort,courage
+Psalm 27:1|courage
+Psalm 27:14|patience,hope
+Psalm 28:7|strength,gratitude
+Psalm 30:5|joy,hope
+Psalm 31:24|courage,hope
+Psalm 32:8|guidance
+Psalm 34:8|gratitude
+Psalm 34:18|comfort
+Psalm 37:4|joy
+Psalm 37:5|guidance,faith
+Psalm 40:1|patience
+Psalm 42:11|hope
+Psalm 46:1|strength,comfort
+Psalm 46:10|peace
+Psalm 51:10|renewal,lent,forgiveness
+Psalm 55:22|comfort
+Psalm 56:3|courage,faith
+Psalm 62:1|peace
+Psalm 73:26|strength
+Psalm 90:12|wisdom,renewal
+Psalm 91:1-2|faith
+Psalm 91:11|comfort
+Psalm 95:1|joy
+Psalm 100:4-5|gratitude
+Psalm 103:2-3|gratitude,forgiveness
+Psalm 103:12|forgiveness,lent
+Psalm 107:1|gratitude
+Psalm 118:24|joy,easter
+Psalm 119:105|guidance
+Psalm 121:1-2|strength
+Psalm 127:1|provision
+Psalm 130:5|hope,advent
+Psalm 136:1|gratitude
+Psalm 139:14|creation
+Psalm 143:8|guidance,prayer
+Psalm 145:18|prayer
+Psalm 147:3|comfort
+Psalm 150:6|joy
+Proverbs 3:5-6|guidance,faith
+Proverbs 4:23|wisdom
+Proverbs 16:3|guidance
+Proverbs 16:9|guidance
+Proverbs 17:17|love
+Proverbs 18:10|strength
+Proverbs 22:6|wisdom
+Proverbs 27:17|wisdom
+Ecclesiastes 3:1|patience
+Ecclesiastes 3:11|hope
+Isaiah 7:14|advent,christmas
+Isaiah 9:6|christmas,advent,peace
+Isaiah 26:3|peace
+Isaiah 40:8|faith
+Isaiah 40:29|strength
+Isaiah 40:31|strength,hope
+Isaiah 41:10|courage,comfort
+Isaiah 43:2|comfort
+Isaiah 43:19|renewal
+Isaiah 53:5|easter,lent,salvation
+Isaiah 55:8-9|wisdom
+Isaiah 58:11|guidance,provision
+Isaiah 60:1|advent,joy
+Jeremiah 17:7|faith
+Jeremiah 29:11|hope
+Jeremiah 31:3|love
+Jeremiah 33:3|prayer
+Lamentations 3:22-23|renewal,hope
+Ezekiel 36:26|renewal
+Joel 2:13|lent,forgiveness
+Micah 5:2|christmas,advent
+Micah 6:8|wisdom,love
+Habakkuk 3:17-18|joy,faith
+Zephaniah 3:17|love,joy
+Zechariah 9:9|advent,easter
+Malachi 3:10|provision
+""") + _verses("NT", """
+Matthew 1:21|christmas,salvation
+Matthew 1:23|christmas,advent
+Matthew 2:10|christmas,joy
+Matthew 5:9|peace
+Matthew 5:16|faith
+Matthew 5:44|love
+Matthew 6:9-10|prayer
+Matthew 6:14|forgiveness
+Matthew 6:33|provision,faith
+Matthew 6:34|peace
+Matthew 7:7|prayer
+Matthew 11:28|comfort,peace
+Matthew 17:20|faith
+Matthew 19:26|faith,hope
+Matthew 22:37-39|love
+Matthew 28:6|easter
+Matthew 28:19-20|courage
+Mark 9:23|faith
+Mark 10:45|lent,salvation
+Mark 11:24|prayer
+Mark 16:6|easter
+Luke 1:37|faith,advent
+Luke 1:46-47|advent,joy
+Luke 2:10-11|christmas,joy
+Luke 2:14|christmas,peace
+Luke 6:31|love
+Luke 6:38|provision
+Luke 15:7|forgiveness,lent
+Luke 24:6|easter
+John 1:1|creation,christmas
+John 1:5|hope,advent
+John 1:14|christmas
+John 3:16|love,salvation
+John 8:12|guidance
+John 10:10|joy
+John 11:25|easter,hope
+John 13:34|love
+John 14:1|peace,comfort
+John 14:6|guidance,salvation
+John 14:27|peace
+John 15:5|faith
+John 15:13|love,lent
+John 16:33|courage,peace
+John 20:29|faith,easter
+Acts 1:8|courage,strength
+Acts 2:38|forgiveness
+Acts 16:31|salvation
+Romans 5:1|peace,salvation
+Romans 5:8|love,lent
+Romans 6:4|renewal,easter
+Romans 8:1|forgiveness
+Romans 8:28|hope
+Romans 8:38-39|love
+Romans 10:9|salvation
+Romans 12:2|renewal,wisdom
+Romans 12:12|patience,prayer
+Romans 15:13|hope,joy
+1 Corinthians 10:13|strength
+1 Corinthians 13:4-5|love
+1 Corinthians 13:13|love,faith,hope
+1 Corinthians 15:57|easter,gratitude
+1 Corinthians 16:14|love
+2 Corinthians 4:16|renewal
+2 Corinthians 4:18|hope
+2 Corinthians 5:7|faith
+2 Corinthians 5:17|renewal
+2 Corinthians 9:7|provision
+2 Corinthians 12:9|strength
+Galatians 2:20|faith,lent
+Galatians 5:22-23|joy,peace
+Galatians 6:9|patience
+Ephesians 2:8-9|salvation,faith
+Ephesians 3:20|hope
+Ephesians 4:2|patience,love
+Ephesians 4:32|forgiveness
+Ephesians 6:10|strength
+Philippians 1:6|hope
+Philippians 4:4|joy
+Philippians 4:6-7|peace,prayer
+Philippians 4:8|wisdom
+Philippians 4:13|strength
+Philippians 4:19|provision
+Colossians 3:13|forgiveness
+Colossians 3:15|peace,gratitude
+Colossians 3:23|faith
+1 Thessalonians 5:16-18|joy,prayer,gratitude
+2 Thessalonians 3:16|peace
+1 Timothy 4:12|courage
+2 Timothy 1:7|courage
+2 Timothy 3:16|wisdom
+Titus 2:11|salvation,christmas
+Hebrews 4:16|prayer
+Hebrews 10:23|hope
+Hebrews 11:1|faith
+Hebrews 12:1-2|patience,faith
+Hebrews 13:5|provision,comfort
+Hebrews 13:8|faith
+James 1:2-3|patience,joy
+James 1:5|wisdom,prayer
+James 4:8|prayer
+James 5:16|prayer
+1 Peter 2:24|lent,easter
+1 Peter 3:15|hope
+1 Peter 5:7|comfort
+2 Peter 3:9|patience
+1 John 1:9|forgiveness,lent
+1 John 3:1|love
+1 John 4:8|love
+1 John 4:18|love,courage
+Revelation 3:20|prayer
+Revelation 21:4|comfort,hope
+Revelation 21:5|renewal
+"""))
+
+def easter(year: int) -> date:
+    """
+    Western Easter Sunday (anonymous Gregorian algorithm).
+    """
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = (h + l - 7 * m + 114) % 31 + 1
+    return date(year, month, day)
+
+def seasons(year: int) -> List[Tuple[str, date, date]]:
+    """
+    (theme, first day, last day) of each themed season in the year.
+    """
+    easter_day = easter(year)
+    christmas = date(year, 12, 25)
+    # Advent starts on the fourth Sunday before Christmas
+    sunday_before_christmas = christmas - timedelta(days=(christmas.weekday() + 1) % 7 or 7)
+    return [
+        ("renewal", date(year, 1, 1), date(year, 1, 7)),
+        ("lent", easter_day - timedelta(days=46), easter_day - timedelta(days=1)),
+        ("easter", easter_day, easter_day + timedelta(days=7)),
+        ("advent", sunday_before_christmas - timedelta(weeks=3), christmas - timedelta(days=1)),
+        ("christmas", christmas, date(year, 12, 31)),
+    ]
+
+def season_for(day: date) -> Optional[str]:
+    for theme, first, last in seasons(day.year):
+        if first <= day <= last:
+            return theme
+    return None
+
+@dataclass(frozen=True)
+class PlanDay:
+    date: date
+    reference: str
+    testament: str
+    topic: str  # The season's theme, or "daily"
+    text: Optional[str]  # Set when the plan was prefetched
+
+class ReadingPlan:
+    """
+    One year of daily verses. `days[n]` indexes `references` for day-of-year n + 1.
+    """
+
+    def __init__(self, year: int, references: List[str], testaments: List[str], days: List[int],
+                 day_topics: List[int], topics: List[str], window: int, seed: str,
+                 texts: Optional[List[Optional[str]]] = None, translation: Optional[str] = None):
+        self.year = year
+        self.references = references
+        self.testaments = testaments
+        self.days = days
+        self.day_topics = day_topics
+        self.topics = topics
+        self.window = window
+        self.seed = seed
+        self.texts = texts or [None] * len(references)
+        self.translation = translation
+
+    def day(self, day: date) -> PlanDay:
+        if day.year != self.year:
+            raise ValueError(f"{day} is not in the {self.year} plan")
+        index = day.timetuple().tm_yday - 1
+        entry = self.days[index]
+        return PlanDay(day, self.references[entry], self.testaments[entry], self.topics[self.day_topics[index]],
+                       self.texts[entry])
+
+    def to_dict(self) -> dict:
+        return {
+            "version": PLAN_VERSION,
+            "year": self.year,
+            "window": self.window,
+            "seed": self.seed,
+            "translation": self.translation,
+            "topics": self.topics,
+            "references": self.references,
+            "testaments": "".join(t[0] for t in self.testaments),  # "O"/"N" per reference
+            "texts": self.texts,
+            "days": self.days,
+            "day_topics": self.day_topics,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ReadingPlan":
+        if data.get("version") != PLAN_VERSION:
+            raise ValueError(f"Unsupported reading plan version: {data.get('version')}")
+        return cls(
+            year=data["year"], references=data["references"],
+            testaments=["OT" if t == "O" else "NT" for t in data["testaments"]],
+            days=data["days"], day_topics=data["day_topics"], topics=data["topics"], window=data["window"],
+            seed=data["seed"], texts=data.get("texts"), translation=data.get("translation")
+        )
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "ReadingPlan":
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def validate(self) -> List[str]:
+        """
+        Problems with the plan: wrong length, repeats inside the window, unbalanced testaments.
+        """
+        problems = []
+        expected = (date(self.year + 1, 1, 1) - date(self.year, 1, 1)).days
+        if len(self.days) != expected or len(self.day_topics) != expected:
+            problems.append(f"Plan has {len(self.days)} days, expected {expected}")
+        last_seen: Dict[int, int] = {}
+        for index, entry in enumerate(self.days):
+            if entry in last_seen and index - last_seen[entry] <= self.window:
+                problems.append(f"{self.references[entry]} repeats after {index - last_seen[entry]} days "
+                                f"(day {index + 1}, window {self.window})")
+            last_seen[entry] = index
+        old = sum(1 for entry in self.days if self.testaments[entry] == "OT")
+        if abs(old - (len(self.days) - old)) > len(self.days) // 10:
+            problems.append(f"Testaments unbalanced: {old} OT vs {len(self.days) - old} NT days")
+        return problems
+
+def build_plan(year: int, window: int = READING_PLAN_WINDOW, seed: str = READING_PLAN_SEED,
+               previous: Optional[ReadingPlan] = None, pool: Tuple[PlanVerse, ...] = CURATED_VERSES) -> ReadingPlan:
+    """
+    Precompute a year of daily verses. The same year, seed, window and pool always
+    give the same plan. Pass the previous year's plan to keep the no-repeat window
+    across New Year.
+    """
+    rng = random.Random(f"{seed}:{year}")
+    references = [verse.reference for verse in pool]
+    index_of = {reference: i for i, reference in enumerate(references)}
+    last_used: Dict[int, int] = {}
+    if previous is not None:
+        length = len(previous.days)
+        for offset, entry in enumerate(previous.days[-window:]):
+            reference = previous.references[entry]
+            if reference in index_of:
+                last_used[index_of[reference]] = offset - min(window, length)
+
+    topics = ["daily"]
+    days, day_topics = [], []
+    counts = {"OT": 0, "NT": 0}
+    day = date(year, 1, 1)
+    while day.year == year:
+        n = len(days)
+        theme = season_for(day)
+        # Alternate testaments by keeping the running counts level
+        testament = "OT" if counts["OT"] <= counts["NT"] else "NT"
+        fresh = [i for i in range(len(pool)) if n - last_used.get(i, -window - 1) > window]
+        candidates = (
+            [i for i in fresh if theme in pool[i].themes and pool[i].testament == testament]
+            or [i for i in fresh if theme in pool[i].themes]
+            or [i for i in fresh if pool[i].testament == testament]
+            or fresh
+        )
+        if candidates:
+            choice = rng.choice(candidates)
+        else:
+            # Pool smaller than the window: take the least recently used verse
+            choice = min(range(len(pool)), key=lambda i: (last_used.get(i, -window - 1), i))
+        last_used[choice] = n
+        counts[pool[choice].testament] += 1
+        days.append(choice)
+        topic = theme if theme and theme in pool[choice].themes else "daily"
+        if topic not in topics:
+            topics.append(topic)
+        day_topics.append(topics.index(topic))
+        day += timedelta(days=1)
+
+    # Keep only the verses the plan uses so the file stays small
+    used = sorted(set(days))
+    remap = {old: new for new, old in enumerate(used)}
+    return ReadingPlan(
+        year=year, references=[references[i] for i in used], testaments=[pool[i].testament for i in used],
+        days=[remap[i] for i in days], day_topics=day_topics, topics=topics, window=window, seed=seed
+    )
+
+def prefetch(plan: ReadingPlan, translation: str = DEFAULT_TRANSLATION, workers: int = 8) -> List[str]:
+    """
+    Fetch every verse text of the plan in bulk (concurrently) and store it in the plan.
+    Returns the references that could not be fetched.
+    """
+    from .bible_api import get_passage  # Import here; only needed when building plans
+
+    def fetch(reference: str) -> Optional[str]:
+        try:
+            passage = get_passage(reference, translation)
+        except Exception as e:
+            logger.error("Failed to prefetch %s: %s", reference, e)
+            return None
+        return passage[1] if passage else None
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="plan-prefetch") as pool:
+        plan.texts = list(pool.map(fetch, plan.references))
+    plan.translation = translation
+    return [reference for reference, text in zip(plan.references, plan.texts) if text is None]
+
+def plan_path(year: int, directory: str = READING_PLAN_DIR) -> str:
+    return os.path.join(directory, f"{year}.json")
+
+# First year of the in-memory chain: later years without a stored file are built
+# from the previous year's plan, so the no-repeat window holds across New Year
+PLAN_EPOCH = 2025
+
+_plans: Dict[int, ReadingPlan] = {}
+_plans_lock = threading.RLock()  # get_plan recurses into the previous year
+
+def get_plan(year: int) -> ReadingPlan:
+    """
+    The plan for a year: the stored file when present, else built in memory
+    (deterministic, no network) after the previous year's plan, stored or built
+    the same way back to PLAN_EPOCH. Cached per process.
+    """
+    plan = _plans.get(year)
+    if plan is None:
+        with _plans_lock:
+            plan = _plans.get(year)
+            if plan is None:
+                path = plan_path(year)
+                if os.path.exists(path):
+                    plan = ReadingPlan.load(path)
+                else:
+                    previous = get_plan(year - 1) if year > PLAN_EPOCH else None
+                    plan = build_plan(year, previous=previous)
+                _plans[year] = plan
+    return plan
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Build, prefetch and validate daily reading plans")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Precompute a year's plan and write it to READING_PLAN_DIR")
+    build.add_argument("--year", type=int, default=date.today().year)
+    build.add_argument("--window", type=int, default=READING_PLAN_WINDOW, help="Days before a verse may repeat")
+    build.add_argument("--seed", default=READING_PLAN_SEED)
+    build.add_argument("--prefetch", action="store_true", help="Store verse texts so daily lookups need no network")
+    build.add_argument("--translation", default=DEFAULT_TRANSLATION)
+    build.add_argument("--dir", default=READING_PLAN_DIR)
+
+    validate = commands.add_parser("validate", help="Check a stored plan, optionally fetching every reference")
+    validate.add_argument("--year", type=int, default=date.today().year)
+    validate.add_argument("--fetch", action="store_true", help="Check every reference resolves upstream")
+    validate.add_argument("--dir", default=READING_PLAN_DIR)
+
+    show = commands.add_parser("show", help="Print the plan entry for a date")
+    show.add_argument("--date", type=date.fromisoformat, default=date.today())
+    show.add_argument("--dir", default=READING_PLAN_DIR)
+
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        previous_path = plan_path(args.year - 1, args.dir)
+        previous = ReadingPlan.load(previous_path) if os.path.exists(previous_path) else None
+        plan = build_plan(args.year, window=args.window, seed=args.seed, previous=previous)
+        if args.prefetch:
+            missing = prefetch(plan, args.translation)
+            if missing:
+                print(f"Could not fetch {len(missing)} references: {', '.join(missing)}")
+        path = plan_path(args.year, args.dir)
+        plan.save(path)
+        print(f"Wrote {path}: {len(plan.days)} days, {len(plan.references)} distinct verses, "
+              f"{os.path.getsize(path)} bytes")
+    elif args.command == "validate":
+        plan = ReadingPlan.load(plan_path(args.year, args.dir))
+        problems = plan.validate()
+        if args.fetch:
+            problems += [f"Reference not found: {ref}" for ref in prefetch(plan, plan.translation or DEFAULT_TRANSLATION)]
+        elif plan.translation:
+            problems += [f"Missing text: {ref}" for ref, text in zip(plan.references, plan.texts) if text is None]
+        for problem in problems:
+            print(problem)
+        print("OK" if not problems else f"{len(problems)} problem(s)")
+        raise SystemExit(1 if problems else 0)
+    else:
+        path = plan_path(args.date.year, args.dir)
+        plan = ReadingPlan.load(path) if os.path.exists(path) else build_plan(args.date.year)
+        entry = plan.day(args.date)
+        print(f"{entry.date} [{entry.testament}, {entry.topic}] {entry.reference}" + (f"\n{entry.text}" if entry.text else ""))
+
+if __name__ == "__main__":
+    main()
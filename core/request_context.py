@@ -0,0 +1,15 @@
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Optional
+
+# Per-request values visible to everything a request runs, including
+# asyncio.to_thread workers (which copy the current context).
+caller_var: ContextVar[Optional[str]] = ContextVar("caller", default=None)
+context_id_var: ContextVar[Optional[str]] = ContextVar("context_id", default=None)
+task_id_var: ContextVar[Optional[str]] = ContextVar("task_id", default=None)
+translations_var: ContextVar[Optional[list[str]]] = ContextVar("translations", default=None)  # Primary first
+# Set by the WebSocket transport: called with (rpc id, taskId, contextId, state) as a request starts working
+status_listener_var: ContextVar[Optional[Callable[[str, str, str, str], Awaitable[None]]]] = ContextVar(
+    "status_listener", default=None
+)
+# The sampling profiler recording this request, if any; it only samples work carrying it
+profiler_var: ContextVar[Optional[object]] = ContextVar("profiler", default=None)
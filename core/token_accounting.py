@@ -0,0 +1,137 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .config import TOKEN_BUDGET_PER_CALLER, TOKEN_BUDGET_OVERRIDES, TOKEN_BUDGET_WINDOW, TOKEN_LEDGER_MAX_KEYS
+from .metrics import counter
+from .ratelimit import identity
+from .request_context import caller_var, context_id_var
+
+logger = logging.getLogger(__name__)
+
+LLM_CALLS = counter("llm_calls_total", "LLM calls per pipeline stage", ["stage"])
+LLM_TOKENS = counter("llm_tokens_total", "LLM tokens per pipeline stage", ["stage", "kind"])
+DEGRADED = counter("llm_degraded_total", "LLM calls skipped because the caller is over budget", ["stage"])
+
+def extract_usage(response) -> Dict[str, int]:
+    """
+    Read prompt/output/total token counts from a Gemini response's usage_metadata.
+    """
+    usage = getattr(response, "usage_metadata", None)
+
+    def count(name: str) -> int:
+        value = getattr(usage, name, 0)
+        return value if isinstance(value, int) else 0
+
+    prompt, output = count("prompt_token_count"), count("candidates_token_count")
+    return {"prompt": prompt, "output": output, "total": count("total_token_count") or prompt + output}
+
+def _empty() -> Dict[str, int]:
+    return {"calls": 0, "prompt": 0, "output": 0, "total": 0}
+
+def _add(bucket: Dict[str, int], usage: Dict[str, int]):
+    bucket["calls"] += 1
+    for kind in ("prompt", "output", "total"):
+        bucket[kind] += usage[kind]
+
+class TokenLedger:
+    """
+    Aggregates token usage by stage, caller and contextId, and tracks per-caller
+    budgets over a fixed window. Callers are counted by identity (API key or IP),
+    so a fresh contextId never starts a fresh budget. Caller/context maps are
+    bounded LRUs.
+    """
+
+    def __init__(self, budget: int = TOKEN_BUDGET_PER_CALLER, overrides: Optional[Dict[str, int]] = None,
+                 window: float = TOKEN_BUDGET_WINDOW, max_keys: int = TOKEN_LEDGER_MAX_KEYS):
+        self.budget = budget
+        self.overrides = overrides if overrides is not None else json.loads(TOKEN_BUDGET_OVERRIDES)
+        self.window = window
+        self.max_keys = max_keys
+        self.by_stage: Dict[str, Dict[str, int]] = {}
+        self.by_caller: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self.by_context: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+        self._windows: "OrderedDict[str, list]" = OrderedDict()  # caller -> [window start, tokens]
+        self._lock = threading.Lock()
+
+    def _bounded(self, table: OrderedDict, key: str) -> Dict[str, int]:
+        bucket = table.get(key)
+        if bucket is None:
+            bucket = table[key] = _empty()
+            if len(table) > self.max_keys:
+                table.popitem(last=False)
+        else:
+            table.move_to_end(key)
+        return bucket
+
+    def record(self, stage: str, usage: Dict[str, int], caller: Optional[str] = None, context_id: Optional[str] = None):
+        caller = identity(caller or caller_var.get() or "internal")
+        context_id = context_id or context_id_var.get()
+        LLM_CALLS.inc(stage=stage)
+        for kind in ("prompt", "output"):
+            LLM_TOKENS.inc(usage[kind], stage=stage, kind=kind)
+        with self._lock:
+            _add(self.by_stage.setdefault(stage, _empty()), usage)
+            _add(self._bounded(self.by_caller, caller), usage)
+            if context_id:
+                _add(self._bounded(self.by_context, context_id), usage)
+            window = self._windows.get(caller)
+            now = time.time()
+            if window is None or now - window[0] >= self.window:
+                window = self._windows[caller] = [now, 0]
+                if len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+            window[1] += usage["total"]
+
+    def budget_for(self, caller: str) -> int:
+        return int(self.overrides.get(caller, self.budget))
+
+    def over_budget(self, caller: Optional[str] = None) -> bool:
+        """
+        True when the caller used its whole budget in the current window (0 = unlimited).
+        """
+        caller = caller or caller_var.get()
+        if not caller:
+            return False
+        caller = identity(caller)
+        budget = self.budget_for(caller)
+        if budget <= 0:
+            return False
+        window = self._windows.get(caller)
+        return bool(window and time.time() - window[0] < self.window and window[1] >= budget)
+
+    def summary(self, caller: Optional[str] = None, context_id: Optional[str] = None) -> Dict[str, Any]:
+        with self._lock:
+            if caller is not None or context_id is not None:
+                result: Dict[str, Any] = {}
+                if caller is not None:
+                    caller = identity(caller)
+                    window = self._windows.get(caller)
+                    result["callers"] = {caller: {
+                        **self.by_caller.get(caller, _empty()),
+                        "window_tokens": window[1] if window else 0,
+                        "budget": self.budget_for(caller),
+                    }}
+                if context_id is not None:
+                    result["contexts"] = {context_id: dict(self.by_context.get(context_id, _empty()))}
+                return result
+            return {
+                "stages": {stage: dict(bucket) for stage, bucket in self.by_stage.items()},
+                "callers": {key: dict(bucket) for key, bucket in self.by_caller.items()},
+                "contexts": len(self.by_context),
+            }
+
+ledger = TokenLedger()
+
+def degraded(stage: str) -> bool:
+    """
+    True when the current caller is over budget and `stage` should use its cheap fallback.
+    """
+    if ledger.over_budget():
+        DEGRADED.inc(stage=stage)
+        logger.info("Caller %s over token budget, degrading stage '%s'", caller_var.get(), stage)
+        return True
+    return False
@@ -0,0 +1,319 @@
+"""
+Topic canonicalization.
+
+extract_topic answers "Love", "love ", "God's love" or "loving others" for the
+same request, so anything keyed on its raw output fragments. A topic is
+normalized (lowercase, possessives, punctuation and filler words dropped),
+each word is stemmed and the words sorted, and the result is looked up in a
+curated synonym map. Unknown topics can join the closest curated one by
+character-trigram cosine similarity of their keys (typos, spelling variants).
+Only curated topics are clustered into, so a key never depends on traffic order,
+and never across a negation ("impatience" is close to "patience" but means the
+opposite).
+
+    python -m core.topics report --topics topics.txt
+    python -m core.topics report --captures "captures/a2a_capture.jsonl*"
+"""
+import argparse
+import glob
+import json
+import math
+import re
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import TOPIC_CLUSTERING, TOPIC_CLUSTER_THRESHOLD, TOPIC_CACHE_SIZE
+from .metrics import counter
+
+TOPIC_REQUESTS = counter("topic_requests_total", "Requested topics by canonical key (uncurated ones as 'other')", ["topic"])
+TOPIC_CANONICALIZED = counter("topic_canonicalized_total", "Topics canonicalized by how the key was found", ["method"])
+
+NO_VERSE = "__NO_VERSE__"
+
+STOPWORDS = frozenset({
+    "a", "an", "the", "of", "about", "on", "for", "in", "to", "with", "my", "me", "i", "and", "or", "some",
+    "something", "verse", "verses", "bible", "biblical", "scripture", "scriptures", "passage", "topic",
+})
+
+# Canonical topic -> variants, written naturally; keys are derived with the same normalization
+SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    "love": ("loving", "loved", "god's love", "love of god", "loving others", "love one another", "charity"),
+    "hope": ("hopeful", "hopefulness", "hoping", "hope for the future"),
+    "faith": ("believing", "belief", "faithful in hard times"),
+    "trust": ("trusting god", "trust in god", "relying on god", "reliance on god"),
+    "peace": ("peaceful", "inner peace", "calm", "tranquility", "peace of mind"),
+    "anxiety": ("anxious", "worry", "worries", "worrying", "worried", "stress", "stressed"),
+    "fear": ("afraid", "fearful", "scared", "being afraid"),
+    "strength": ("strong", "strengthen", "inner strength", "god's strength"),
+    "courage": ("brave", "bravery", "courageous", "boldness"),
+    "comfort": ("consolation", "comforting", "god's comfort"),
+    "grief": ("grieving", "mourning", "sorrow", "bereavement", "loss", "loss of a loved one"),
+    "forgiveness": ("forgive", "forgiving", "being forgiven", "forgiving others", "pardon"),
+    "mercy": ("merciful", "god's mercy"),
+    "grace": ("god's grace", "amazing grace"),
+    "gratitude": ("thankfulness", "thankful", "thanks", "grateful", "thanksgiving", "giving thanks"),
+    "joy": ("joyful", "happiness", "happy", "rejoice", "rejoicing"),
+    "patience": ("patient", "waiting on god", "waiting"),
+    "perseverance": ("persevere", "endurance", "endure", "not giving up"),
+    "wisdom": ("wise", "discernment", "understanding"),
+    "guidance": ("direction", "god's guidance", "guide me", "decisions", "decision making"),
+    "purpose": ("god's plan", "god's plans", "calling", "destiny", "meaning"),
+    "healing": ("heal", "health", "sickness", "illness", "recovery"),
+    "salvation": ("saved", "being saved", "eternal life", "redemption"),
+    "prayer": ("praying", "pray", "prayers"),
+    "kindness": ("kind", "being kind", "gentleness"),
+    "humility": ("humble", "being humble"),
+    "provision": ("provide", "god's provision", "needs", "finances", "money"),
+    "protection": ("protect", "safety", "refuge", "shelter"),
+    "loneliness": ("lonely", "alone", "isolation"),
+    "depression": ("depressed", "sadness", "sad", "despair", "hopelessness"),
+    "anger": ("angry", "wrath", "rage"),
+    "temptation": ("tempted", "resisting temptation"),
+    "encouragement": ("encourage", "encouraging", "motivation", "uplifting"),
+    "family": ("parents", "children", "parenting"),
+    "marriage": ("husband and wife", "spouse", "wedding"),
+    "friendship": ("friends", "friend"),
+    "rest": ("weariness", "tired", "exhaustion", "sabbath"),
+    "obedience": ("obey", "obeying god"),
+}
+
+_SUFFIXES = (
+    ("fulness", ""), ("iveness", "ive"), ("ousness", "ous"), ("ness", ""), ("ment", ""), ("ings", ""), ("ing", ""),
+    ("ful", ""), ("ies", "y"), ("ied", "y"), ("edly", ""), ("ed", ""), ("ly", ""),
+)
+
+def normalize(topic: str) -> List[str]:
+    """
+    Lowercased words of a topic without possessives, punctuation or filler words.
+    """
+    text = topic.lower().replace("’", "'").replace("&", " and ")
+    text = re.sub(r"'s\b", "", text)
+    words = re.findall(r"[a-z0-9]+", text)
+    return [w for w in words if w not in STOPWORDS] or words
+
+def stem(word: str) -> str:
+    """
+    Light suffix stripping: love, loves, loved and loving all become "lov".
+    """
+    for suffix, replacement in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) + len(replacement) >= 3:
+            word = word[:len(word) - len(suffix)] + replacement
+            break
+    else:
+        if word.endswith(("sses", "xes", "ches", "shes")):
+            word = word[:-2]
+        elif word.endswith("s") and not word.endswith(("ss", "us", "is")) and len(word) > 3:
+            word = word[:-1]
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    return word
+
+def stem_key(topic: str) -> str:
+    """
+    Order-insensitive key of stemmed words: "God's love" and "love of God" match.
+    """
+    return " ".join(sorted({stem(w) for w in normalize(topic)}))
+
+NEGATION_PREFIXES = ("un", "im", "in", "ir", "il", "dis", "non")
+NEGATION_SUFFIXES = ("less",)
+
+def _same_root(a: str, b: str) -> bool:
+    return min(len(a), len(b)) >= 3 and (a.startswith(b) or b.startswith(a))
+
+def _negates(word: str, other: str) -> bool:
+    """
+    True when `word` is `other` with a negating prefix or suffix: "impatienc" / "patienc", "hopeless" / "hop".
+    """
+    return (any(word.startswith(prefix) and _same_root(word[len(prefix):], other) for prefix in NEGATION_PREFIXES)
+            or any(word.endswith(suffix) and _same_root(word[:-len(suffix)], other) for suffix in NEGATION_SUFFIXES))
+
+def opposite(key: str, other: str) -> bool:
+    """
+    True when one stem key negates a word of the other, so they must not be clustered.
+    """
+    words, others = key.split(), other.split()
+    return any(a != b and (_negates(a, b) or _negates(b, a)) for a in words for b in others)
+
+def _trigrams(text: str) -> Counter:
+    padded = f"  {text}  "
+    return Counter(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def _cosine(a: Counter, b: Counter) -> float:
+    dot = sum(count * b[gram] for gram, count in a.items() if gram in b)
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())) or 1.0)
+
+@dataclass(slots=True, frozen=True)
+class CanonicalTopic:
+    key: str
+    method: str  # "synonym", "cluster" or "stem"
+
+    @property
+    def curated(self) -> bool:
+        return self.method != "stem"
+
+class TopicCanonicalizer:
+    """
+    Maps topics to stable canonical keys: curated topic names where a synonym or
+    (with clustering) a close enough curated variant matches, else the stem key.
+    Results are memoized.
+    """
+
+    def __init__(self, synonyms: Dict[str, Tuple[str, ...]] = SYNONYMS, clustering: bool = TOPIC_CLUSTERING,
+                 threshold: float = TOPIC_CLUSTER_THRESHOLD, cache_size: int = TOPIC_CACHE_SIZE):
+        self.clustering = clustering
+        self.threshold = threshold
+        self.index: Dict[str, str] = {}
+        for canonical, variants in synonyms.items():
+            for variant in (canonical, *variants):
+                key = stem_key(variant)
+                if self.index.setdefault(key, canonical) != canonical:
+                    raise ValueError(f"Synonym {variant!r} of {canonical!r} already belongs to {self.index[key]!r}")
+        self._vectors = [(key, key.count(" "), _trigrams(key)) for key in self.index]
+        self.canonicalize = lru_cache(maxsize=cache_size)(self._canonicalize)
+
+    def _canonicalize(self, topic: str) -> CanonicalTopic:
+        if topic.strip() == NO_VERSE:
+            return CanonicalTopic(NO_VERSE, "synonym")
+        key = stem_key(topic)
+        if key in self.index:
+            return CanonicalTopic(self.index[key], "synonym")
+        if self.clustering and key:
+            # Only keys with as many words ("god" must not join "god lov"), never an opposite
+            vector, words = _trigrams(key), key.count(" ")
+            score, nearest = max(
+                ((_cosine(vector, other), known) for known, n, other in self._vectors
+                 if n == words and not opposite(key, known)),
+                default=(0.0, "")
+            )
+            if score >= self.threshold:
+                return CanonicalTopic(self.index[nearest], "cluster")
+        return CanonicalTopic(key, "stem")
+
+    def key(self, topic: str) -> str:
+        return self.canonicalize(topic).key
+
+    def record(self, topic: str) -> CanonicalTopic:
+        """
+        Canonicalize a requested topic and count it in the topic metrics.
+        """
+        canonical = self.canonicalize(topic)
+        TOPIC_CANONICALIZED.inc(method=canonical.method)
+        TOPIC_REQUESTS.inc(topic=canonical.key if canonical.curated else "other")
+        return canonical
+
+canonicalizer = TopicCanonicalizer()
+
+def canonical_topic(topic: str) -> str:
+    """
+    The stable canonical key of a topic, for caching, deduplication and metrics.
+    """
+    return canonicalizer.key(topic)
+
+# Report
+
+def _lru_hits(keys: Iterable[str], size: int) -> int:
+    cache: OrderedDict = OrderedDict()
+    hits = 0
+    for key in keys:
+        if key in cache:
+            hits += 1
+            cache.move_to_end(key)
+        else:
+            cache[key] = True
+            if len(cache) > size:
+                cache.popitem(last=False)
+    return hits
+
+def report(topics: List[str], cache_size: int = 256, canonicalize: Optional[TopicCanonicalizer] = None) -> dict:
+    """
+    Compare keying on the raw topic (stripped, lowercased) with canonical keys:
+    distinct keys, and hit ratio of an unbounded and a `cache_size` LRU cache.
+    """
+    canonicalize = canonicalize or canonicalizer
+    raw = [t.strip().lower() for t in topics]
+    canonical = [canonicalize.canonicalize(t) for t in topics]
+    keys = [c.key for c in canonical]
+    total = len(topics) or 1
+    variants: Dict[str, Counter] = {}
+    for topic, key in zip(raw, keys):
+        variants.setdefault(key, Counter())[topic] += 1
+    return {
+        "topics": len(topics),
+        "raw": {"distinct": len(set(raw)), "hit_ratio": 1 - len(set(raw)) / total,
+                "lru_hit_ratio": _lru_hits(raw, cache_size) / total},
+        "canonical": {"distinct": len(set(keys)), "hit_ratio": 1 - len(set(keys)) / total,
+                      "lru_hit_ratio": _lru_hits(keys, cache_size) / total},
+        "methods": dict(Counter(c.method for c in canonical)),
+        "top_keys": [
+            {"key": key, "count": sum(counts.values()), "variants": [v for v, _ in counts.most_common(8)]}
+            for key, counts in sorted(variants.items(), key=lambda item: -sum(item[1].values()))[:15]
+        ],
+    }
+
+def topics_from_captures(patterns: List[str]) -> List[str]:
+    """
+    Run intent extraction (a real LLM call each) over the user text of captured /a2a requests.
+    """
+    from .ai_service import extract_latest_user_text, extract_topic, split_topics
+    from .ingest import parse_rpc_request
+
+    topics = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        message = parse_rpc_request(json.loads(line)["body"]).message
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    query = extract_latest_user_text(message.parts)
+                    if query:
+                        topics.extend(split_topics(extract_topic(query)))
+    return topics
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Topic canonicalization tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    rep = commands.add_parser("report", help="Canonical-key cardinality and cache hit ratios over a topic corpus")
+    source = rep.add_mutually_exclusive_group(required=True)
+    source.add_argument("--topics", help="File of raw extract_topic outputs, one per line")
+    source.add_argument("--captures", nargs="+", help="Traffic capture files; topics are extracted with the LLM")
+    rep.add_argument("--cache-size", type=int, default=256, help="LRU size for the bounded hit ratio")
+    rep.add_argument("--json", action="store_true")
+
+    key = commands.add_parser("key", help="Print the canonical key of each topic")
+    key.add_argument("topic", nargs="+")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "key":
+        for topic in args.topic:
+            canonical = canonicalizer.canonicalize(topic)
+            print(f"{topic!r} -> {canonical.key!r} ({canonical.method})")
+        return
+
+    if args.topics:
+        with open(args.topics, encoding="utf-8") as f:
+            topics = [part for line in f for part in line.strip().split(",") if part.strip()]
+    else:
+        topics = topics_from_captures(args.captures)
+    result = report(topics, args.cache_size)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"{result['topics']} topics")
+    for name in ("raw", "canonical"):
+        row = result[name]
+        print(f"{name:>10}: {row['distinct']:6d} distinct keys, hit ratio {row['hit_ratio']:.1%} unbounded, "
+              f"{row['lru_hit_ratio']:.1%} with LRU {args.cache_size}")
+    print(f"{'methods':>10}: " + ", ".join(f"{m} {n}" for m, n in sorted(result["methods"].items())))
+    for entry in result["top_keys"]:
+        print(f"{entry['count']:6d}  {entry['key']}: {', '.join(entry['variants'])}")
+
+if __name__ == "__main__":
+    main()
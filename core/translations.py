@@ -0,0 +1,169 @@
+import json
+import logging
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Union
+
+from cachetools import TTLCache
+
+from .config import (
+    DEFAULT_TRANSLATION, CHANNEL_TRANSLATIONS, MAX_SIDE_BY_SIDE, LOCAL_BIBLE_DIR, PASSAGE_CACHE_TTL,
+    PASSAGE_CACHE_SIZE
+)
+from .metrics import counter
+
+logger = logging.getLogger(__name__)
+
+PASSAGE_LOOKUPS = counter("passage_lookups_total", "Passage lookups by translation and source", ["translation", "source"])
+
+@dataclass(frozen=True)
+class Translation:
+    code: str
+    name: str
+    provider: str  # "labs" (labs.bible.org) or "bible-api" (bible-api.com)
+    upstream_id: str = ""  # The provider's name for it, when the provider serves several
+
+# labs.bible.org only serves the NET Bible; bible-api.com serves public-domain translations.
+# Licensed translations (NIV, ESV, ...) are only available through a local store.
+TRANSLATIONS: Dict[str, Translation] = {t.code: t for t in (
+    Translation("NET", "New English Translation", "labs"),
+    Translation("KJV", "King James Version", "bible-api", "kjv"),
+    Translation("WEB", "World English Bible", "bible-api", "web"),
+    Translation("ASV", "American Standard Version", "bible-api", "asv"),
+    Translation("BBE", "Bible in Basic English", "bible-api", "bbe"),
+    Translation("DARBY", "Darby Bible", "bible-api", "darby"),
+    Translation("YLT", "Young's Literal Translation", "bible-api", "ylt"),
+    Translation("OEB", "Open English Bible (US)", "bible-api", "oeb-us"),
+)}
+
+# Translation codes double as local store file names, so nothing else gets near the filesystem
+VALID_CODE = re.compile(r"^[A-Z0-9-]+$")
+
+def normalize_reference(reference: str) -> str:
+    """
+    Canonical cache/store key for a reference: "1 john 4:8" and "1 John  4:8 " match.
+    """
+    return re.sub(r"\s+", " ", reference.strip()).lower()
+
+def get_translation(code: Optional[str]) -> Optional[Translation]:
+    """
+    Look up a translation by code (case-insensitive); translations with only a
+    local store file are served as provider "local".
+    """
+    if not code:
+        return None
+    code = code.strip().upper()
+    if not VALID_CODE.match(code):
+        return None
+    if code in TRANSLATIONS:
+        return TRANSLATIONS[code]
+    if local_stores.has(code):
+        return Translation(code, code, "local")
+    return None
+
+def select_translations(requested: Union[str, Iterable[str], None] = None, context_id: Optional[str] = None) -> List[str]:
+    """
+    Translations for one request, primary first: the requested ones (a code, a
+    comma-separated string or a list; unknown codes are dropped), else the
+    channel's configured translation, else DEFAULT_TRANSLATION. At most
+    MAX_SIDE_BY_SIDE are kept.
+    """
+    if isinstance(requested, str):
+        requested = requested.split(",")
+    codes = []
+    for code in requested or ():
+        translation = get_translation(code) if isinstance(code, str) else None
+        if translation is None:
+            logger.warning("Ignoring unknown translation: %r", code)
+        elif translation.code not in codes:
+            codes.append(translation.code)
+    if not codes:
+        channel = get_translation(CHANNEL_TRANSLATIONS.get(context_id)) if context_id else None
+        codes = [channel.code if channel else DEFAULT_TRANSLATION]
+    return codes[:MAX_SIDE_BY_SIDE]
+
+class LocalStore:
+    """
+    Optional on-disk verse stores, one JSON file per translation
+    ({LOCAL_BIBLE_DIR}/{CODE}.json mapping "Book C:V" to text), loaded lazily.
+    """
+
+    def __init__(self, directory: Optional[str] = LOCAL_BIBLE_DIR):
+        self.directory = directory
+        self._stores: Dict[str, Dict[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, code: str) -> Optional[str]:
+        if not self.directory or not VALID_CODE.match(code.upper()):
+            return None
+        return os.path.join(self.directory, f"{code.upper()}.json")
+
+    def has(self, code: str) -> bool:
+        path = self._path(code)
+        return code.upper() in self._stores or bool(path and os.path.exists(path))
+
+    def load(self, code: str) -> Dict[str, str]:
+        code = code.upper()
+        if not VALID_CODE.match(code):
+            return {}
+        store = self._stores.get(code)
+        if store is not None:
+            return store
+        with self._lock:
+            if code not in self._stores:
+                path = self._path(code)
+                entries = {}
+                if path and os.path.exists(path):
+                    with open(path, encoding="utf-8") as f:
+                        entries = {normalize_reference(ref): text for ref, text in json.load(f).items()}
+                    logger.info("Loaded %s verses for %s from %s", len(entries), code, path)
+                self._stores[code] = entries
+            return self._stores[code]
+
+    def lookup(self, code: str, reference: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        return self.load(code).get(normalize_reference(reference))
+
+class PassageCache:
+    """
+    TTL caches partitioned by translation, so a busy translation can't evict the others.
+    Values are (reference, text) tuples.
+    """
+
+    def __init__(self, ttl: float = PASSAGE_CACHE_TTL, maxsize: int = PASSAGE_CACHE_SIZE):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._partitions: Dict[str, TTLCache] = {}
+        self._lock = threading.Lock()
+
+    def _partition(self, code: str) -> TTLCache:
+        partition = self._partitions.get(code)
+        if partition is None:
+            partition = self._partitions[code] = TTLCache(maxsize=self.maxsize, ttl=self.ttl)
+        return partition
+
+    def get(self, code: str, reference: str) -> Optional[tuple[str, str]]:
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            return self._partition(code).get(normalize_reference(reference))
+
+    def set(self, code: str, reference: str, passage: tuple[str, str]):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._partition(code)[normalize_reference(reference)] = passage
+
+    def sizes(self) -> Dict[str, int]:
+        with self._lock:
+            return {code: len(partition) for code, partition in self._partitions.items()}
+
+    def clear(self):
+        with self._lock:
+            self._partitions.clear()
+
+local_stores = LocalStore()
+passage_cache = PassageCache()
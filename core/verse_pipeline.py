@@ -0,0 +1,267 @@
+"""
+Stage graphs behind the A2A verse flow.
+
+    topic:    reference -> fetch -> reflection -> verse   (speculative random verse beside them;
+              fetch gets every requested translation concurrently)
+    query:    intent -> verses                             (one topic pipeline per topic, concurrently)
+    response: verses -> chat -> render
+
+Stage functions look up ai_service/bible_api helpers at call time, so patching
+those modules (as the tests do) also changes what the pipelines run.
+"""
+import asyncio
+import logging
+
+from . import ai_service, bible_api
+from .config import (
+    SPECULATIVE_RANDOM_FALLBACK, STAGE_TIMEOUT_INTENT, STAGE_TIMEOUT_REFERENCE, STAGE_TIMEOUT_FETCH,
+    STAGE_TIMEOUT_REFLECTION, STAGE_TIMEOUT_CHAT, STAGE_CACHE_TTL_INTENT, STAGE_CACHE_TTL_REFERENCE,
+    DEFAULT_TRANSLATION
+)
+from .models import VerseResult, TaskRecord, MessageRecord, ArtifactRecord, PartRecord
+from .pipeline import Pipeline, Stage, StageCache
+from .request_context import translations_var
+from .topics import canonical_topic, canonicalizer
+
+logger = logging.getLogger(__name__)
+
+def _cache(key, ttl: float):
+    return StageCache(key, ttl) if ttl > 0 else None
+
+# Topic pipeline
+
+def _reference(ctx: dict) -> str:
+    reference = ai_service.generate_verse_reference(ctx["topic"])
+    logger.info("Generated reference for topic '%s': %s", ctx["topic"], reference)
+    return reference
+
+def _speculative(ctx: dict) -> VerseResult:
+    return bible_api.get_random_verse(ctx["topic"])
+
+async def _fetch(ctx: dict) -> dict[str, tuple[str, str]]:
+    # Every requested translation at once; the primary (first) one is required
+    passages = await bible_api.fetch_translations(ctx["reference"], ctx["translations"])
+    if ctx["translations"][0] not in passages:
+        raise LookupError(f"No passage for reference '{ctx['reference']}' in {ctx['translations'][0]}")
+    return passages
+
+async def _fetch_fallback(ctx: dict, error: Exception) -> dict[str, tuple[str, str]]:
+    logger.info("Falling back to random verse for topic '%s'", ctx["topic"])
+    verse = ctx.get("speculative")
+    if verse is None:
+        verse = await asyncio.to_thread(bible_api.get_random_verse, ctx["topic"])
+    # The random verse comes from labs.bible.org (NET); look it up in the requested translations
+    random_passage = (verse.verse_reference, verse.verse_text)
+    others = [code for code in ctx["translations"] if code != "NET"]
+    fetched = await bible_api.fetch_translations(verse.verse_reference, others) if others else {}
+    fetched["NET"] = random_passage
+    passages = {code: fetched[code] for code in ctx["translations"] if code in fetched}
+    if ctx["translations"][0] not in passages:
+        passages = {"NET": random_passage, **passages}
+    return passages
+
+def _speculative_fallback(ctx: dict, error: Exception):
+    bible_api.SPECULATIVE_OUTCOMES.inc(outcome="failed")
+    return None  # _fetch_fallback then makes its own request
+
+def _primary(ctx: dict) -> tuple[str, tuple[str, str]]:
+    return next(iter(ctx["fetch"].items()))
+
+def _reflection(ctx: dict) -> str:
+    return ai_service.generate_reflection(_primary(ctx)[1][1], ctx["topic"])
+
+def _reflection_fallback(ctx: dict, error: Exception) -> str:
+    return f"This verse speaks to the importance of {ctx['topic']} in our spiritual journey."
+
+def _verse(ctx: dict) -> VerseResult:
+    translation, (verse_reference, verse_text) = _primary(ctx)
+    alternates = {code: text for code, (_, text) in ctx["fetch"].items() if code != translation}
+    return VerseResult(topic=ctx["topic"], verse_reference=verse_reference, verse_text=verse_text,
+                       reflection=ctx["reflection"], translation=translation, alternates=alternates or None)
+
+def build_topic_pipeline(speculative: bool = SPECULATIVE_RANDOM_FALLBACK) -> Pipeline:
+    stages = [
+        Stage("reference", _reference, timeout=STAGE_TIMEOUT_REFERENCE,
+              cache=_cache(lambda ctx: canonical_topic(ctx["topic"]), STAGE_CACHE_TTL_REFERENCE)),
+        # Passages are cached per translation by bible_api.get_passage
+        Stage("fetch", _fetch, deps=("reference",), executor="async", timeout=STAGE_TIMEOUT_FETCH,
+              fallback=_fetch_fallback, fallback_deps=("speculative",) if speculative else ()),
+        Stage("reflection", _reflection, deps=("fetch",), timeout=STAGE_TIMEOUT_REFLECTION,
+              fallback=_reflection_fallback),
+        Stage("verse", _verse, deps=("fetch", "reflection"), executor="inline"),
+    ]
+    if speculative:
+        # Starts with the run; awaited only if the fetch falls back, cancelled otherwise
+        stages.append(Stage("speculative", _speculative, timeout=STAGE_TIMEOUT_FETCH, fallback=_speculative_fallback))
+    return Pipeline("topic", stages)
+
+TOPIC_PIPELINE = build_topic_pipeline()
+
+async def run_topic(topic: str) -> VerseResult:
+    translations = translations_var.get() or [DEFAULT_TRANSLATION]
+    run = await TOPIC_PIPELINE.run({"topic": topic, "translations": translations}, targets=["verse"])
+    if "speculative" in TOPIC_PIPELINE.stages and "speculative" not in run.fallbacks:
+        # A failed prefetch was already counted by _speculative_fallback
+        used = "fetch" in run.fallbacks and run.results.get("speculative") is not None
+        bible_api.SPECULATIVE_OUTCOMES.inc(outcome="used" if used else "wasted")
+        if not used:
+            bible_api.WASTED_CALLS.inc(kind="speculative")
+    return run.results["verse"]
+
+# Query pipeline
+
+async def _verses(ctx: dict) -> list[VerseResult]:
+    if ctx["intent"] == "__NO_VERSE__":
+        return []  # Signal that it's just chat.
+
+    topics = ai_service.split_topics(ctx["intent"])
+    for t in topics:
+        canonicalizer.record(t)
+    results = await asyncio.gather(*(ai_service.run_topic_pipeline(t) for t in topics), return_exceptions=True)
+
+    verses = []
+    for t, result in zip(topics, results):
+        if isinstance(result, Exception):
+            logger.error("Failed to process topic '%s': %s", t, result)
+        else:
+            verses.append(result)
+
+    if topics and not verses:
+        raise results[0]
+    return verses
+
+QUERY_PIPELINE = Pipeline("query", [
+    Stage("intent", lambda ctx: ai_service.extract_topic(ctx["query"]), timeout=STAGE_TIMEOUT_INTENT,
+          cache=_cache(lambda ctx: ctx["query"].strip().lower(), STAGE_CACHE_TTL_INTENT)),
+    Stage("verses", _verses, deps=("intent",), executor="async"),
+])
+
+# Response pipeline
+
+def _chat(ctx: dict):
+    if ctx["verses"]:
+        return None
+    return ai_service.generate_chat_reply(ctx["query"])
+
+def _chat_fallback(ctx: dict, error: Exception) -> str:
+    return ai_service.CASUAL_CHAT_FALLBACK
+
+def format_verse_text(verse: VerseResult) -> str:
+    """
+    The verse text, or every translation labelled when answering side by side.
+    """
+    if not verse.alternates:
+        return verse.verse_text
+    lines = [f"{verse.translation}: {verse.verse_text}"]
+    lines += [f"{code}: {text}" for code, text in verse.alternates.items()]
+    return "\n".join(lines)
+
+def verse_data(verse: VerseResult) -> dict:
+    data = {
+        "reference": verse.verse_reference,
+        "topic": verse.topic,
+        "reflection": verse.reflection,
+        "timestamp": verse.timestamp,
+        "translation": verse.translation
+    }
+    if verse.alternates:
+        data["alternates"] = verse.alternates
+    return data
+
+def render_task_result(ctx: dict) -> TaskRecord:
+    """
+    Build the A2A task from the verses (or chat reply).
+    With `compact`, the verse text is only carried by status.message: artifacts keep
+    just their data part and the inbound history is not echoed back.
+    """
+    verse_results, task_id, compact = ctx["verses"], ctx["task_id"], ctx["compact"]
+
+    # Build response message
+    if verse_results:
+        response_text = "Here's what i found:"
+        for verse_result in verse_results:
+            response_text += f"\n{verse_result.verse_reference}\n{format_verse_text(verse_result)}"
+            if verse_result.reflection:
+                response_text += f"\n\nReflection: {verse_result.reflection}\n"
+        response_text = response_text.rstrip()
+    else:
+        response_text = ctx["chat"]  # Just casual chat reply
+
+    response_message = MessageRecord(
+        role="agent",
+        parts=[PartRecord(kind="text", text=response_text)],
+        taskId=task_id
+    )
+
+    # Build artifacts, one per passage
+    if verse_results and compact:
+        artifacts = [
+            ArtifactRecord(
+                name="verse",
+                parts=[
+                    PartRecord(
+                        kind="data",
+                        data=verse_data(verse_result)
+                    )
+                ]
+            )
+            for verse_result in verse_results
+        ]
+    elif compact:
+        artifacts = []  # The chat reply is already in status.message
+    elif verse_results:
+        artifacts = [
+            ArtifactRecord(
+                name="verse",
+                parts=[
+                    PartRecord(
+                        kind="text",
+                        text=(
+                            f"📖 *Here's what i found:*\n\n"
+                            f"{verse_result.verse_reference}\n"
+                            f"{format_verse_text(verse_result)}\n\n"
+                            f"🕊️ Reflection: {verse_result.reflection}"
+                        )
+                    ),
+                    PartRecord(
+                        kind="data",
+                        data=verse_data(verse_result)
+                    )
+
+                ]
+            )
+            for verse_result in verse_results
+        ]
+    else:
+        artifacts = [
+            ArtifactRecord(
+                name="chat_response",
+                parts=[
+                    PartRecord(
+                        kind="text",
+                        text=response_text
+                    )
+                ]
+            )
+        ]
+
+    # Build history (not echoed in compact responses)
+    history = [] if compact else ctx["messages"] + [response_message]
+
+    # Determine state (completed since it's a single-turn task)
+    state = "completed"
+
+    return TaskRecord(
+        id=task_id,
+        contextId=ctx["context_id"],
+        state=state,
+        message=response_message,
+        artifacts=artifacts,
+        history=history
+    )
+
+RESPONSE_PIPELINE = Pipeline("response", [
+    Stage("verses", lambda ctx: ai_service.process_verse_requests(ctx["query"]), executor="async"),
+    Stage("chat", _chat, deps=("verses",), timeout=STAGE_TIMEOUT_CHAT, fallback=_chat_fallback),
+    Stage("render", render_task_result, deps=("verses", "chat"), executor="inline"),
+])
@@ -0,0 +1,169 @@
+"""
+JSON-RPC over one long-lived WebSocket connection, for high-frequency A2A clients.
+
+Each frame carries one request with the same body as POST /a2a, and is handled
+by the same function as /a2a. The handler gets a Request built from the frame
+and the connection's handshake (headers, client address), so rate limits,
+admission, idempotency, drain and capture apply to every message. Requests on a
+connection run concurrently. Replies go out as they finish, matched to their
+requests by JSON-RPC id. A `tasks/status` notification is pushed as each
+request starts working.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional, Set
+
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.websockets import WebSocket
+
+from .config import WS_MAX_IN_FLIGHT, WS_SEND_QUEUE, WS_SEND_TIMEOUT
+from .metrics import counter, gauge
+from .request_context import status_listener_var
+
+logger = logging.getLogger(__name__)
+
+WS_CONNECTIONS = gauge("ws_connections", "Open A2A WebSocket connections")
+WS_FRAMES = counter("ws_frames_total", "A2A WebSocket frames by direction", ["direction"])
+WS_BACKPRESSURE = counter(
+    "ws_backpressure_total", "Connections pausing reads at their in-flight limit, or closed as slow readers", ["reason"]
+)
+
+Handler = Callable[[Request], Awaitable[Response]]
+
+def frame_request(websocket: WebSocket, data: bytes, path: str = "/a2a") -> Request:
+    """
+    A POST request carrying one frame, with the connection's handshake headers
+    and client address, for handlers written against HTTP requests.
+    """
+    headers = [(name, value) for name, value in websocket.scope["headers"]
+               if name not in (b"content-length", b"content-type")]
+    headers += [(b"content-type", b"application/json"), (b"content-length", str(len(data)).encode())]
+    scope = {**websocket.scope, "type": "http", "method": "POST", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "headers": headers, "state": {}}
+    sent = False
+
+    async def receive():
+        nonlocal sent
+        if sent:
+            return {"type": "http.disconnect"}
+        sent = True
+        return {"type": "http.request", "body": data, "more_body": False}
+
+    return Request(scope, receive)
+
+def status_update(rpc_id: str, task_id: str, context_id: str, state: str) -> str:
+    """A `tasks/status` notification (A2A status-update event) for the request with `rpc_id`"""
+    return json.dumps({
+        "jsonrpc": "2.0",
+        "method": "tasks/status",
+        "params": {
+            "kind": "status-update",
+            "requestId": rpc_id,
+            "taskId": task_id,
+            "contextId": context_id,
+            "status": {"state": state, "timestamp": datetime.now(timezone.utc).isoformat()},
+            "final": False,
+        },
+    })
+
+class A2AConnection:
+    """
+    One client connection. At most `max_in_flight` requests run at once. At the
+    limit the connection stops reading, so TCP flow control slows a fast sender
+    instead of work queueing up here. Replies and notifications go through an
+    outbox of `send_queue` frames with a single writer. A client that doesn't
+    take a frame within `send_timeout` seconds is disconnected.
+    """
+
+    def __init__(self, websocket: WebSocket, handler: Handler, status_updates: bool = True,
+                 max_in_flight: int = WS_MAX_IN_FLIGHT, send_queue: int = WS_SEND_QUEUE,
+                 send_timeout: float = WS_SEND_TIMEOUT):
+        self.websocket = websocket
+        self.handler = handler
+        self.status_updates = status_updates
+        self.send_timeout = send_timeout
+        self.closed = False
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._outbox: "asyncio.Queue[Optional[str]]" = asyncio.Queue(maxsize=send_queue)
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def run(self):
+        await self.websocket.accept()
+        WS_CONNECTIONS.inc()
+        writer = asyncio.create_task(self._write())
+        try:
+            await self._read()
+        finally:
+            # Requests in flight still finish (a retry after reconnecting replays them); their replies are dropped
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            await self._outbox.put(None)
+            await writer
+            WS_CONNECTIONS.inc(-1)
+
+    async def _read(self):
+        while not self.closed:
+            if self._slots.locked():
+                WS_BACKPRESSURE.inc(reason="in_flight")
+            await self._slots.acquire()
+            try:
+                message = await self.websocket.receive()
+            except RuntimeError:  # Closed by the writer
+                message = {"type": "websocket.disconnect"}
+            if message["type"] == "websocket.disconnect":
+                self._slots.release()
+                self.closed = True
+                return
+            data = message.get("bytes") or (message.get("text") or "").encode()
+            WS_FRAMES.inc(direction="in")
+            task = asyncio.create_task(self._serve(data))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _serve(self, data: bytes):
+        request = frame_request(self.websocket, data)
+        try:
+            request._json = json.loads(data)  # Parsed once here; the handler reuses it
+        except ValueError:
+            pass  # Left to the handler, which answers with its usual error
+        if self.status_updates:
+            status_listener_var.set(self._push_status)
+        try:
+            response = await self.handler(request)
+            await self._outbox.put(response.body.decode())
+        except Exception as e:
+            logger.error("WebSocket request failed: %s", e)
+            body = getattr(request, "_json", None)
+            await self._outbox.put(json.dumps({
+                "jsonrpc": "2.0",
+                "id": body.get("id") if isinstance(body, dict) else None,
+                "error": {"code": -32603, "message": "Internal error", "data": {"details": str(e)}},
+            }))
+        finally:
+            self._slots.release()
+
+    async def _push_status(self, rpc_id: str, task_id: str, context_id: str, state: str):
+        await self._outbox.put(status_update(rpc_id, task_id, context_id, state))
+
+    async def _write(self):
+        while True:
+            frame = await self._outbox.get()
+            if frame is None:
+                return
+            if self.closed:
+                continue  # Drain the outbox so senders never block on a dead connection
+            try:
+                await asyncio.wait_for(self.websocket.send_text(frame), timeout=self.send_timeout)
+                WS_FRAMES.inc(direction="out")
+            except asyncio.TimeoutError:
+                WS_BACKPRESSURE.inc(reason="slow_reader")
+                logger.warning("Closing WebSocket: client took no frame for %ss", self.send_timeout)
+                self.closed = True
+                try:
+                    await asyncio.wait_for(self.websocket.close(code=1008), timeout=1)
+                except Exception:
+                    pass
+            except Exception:
+                self.closed = True  # Client went away
@@ -1,44 +1,108 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Request, WebSocket
+from fastapi.responses import JSONResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-from dotenv import load_dotenv
 import os
+import time
+import asyncio
 import logging
 from uuid import uuid4
 from typing import Optional, List
 
-from core.models import (
-    JSONRPCRequest, JSONRPCResponse, TaskResult, TaskStatus,
-    Artifact, MessagePart, A2AMessage, ErrorResponse
+from core.models import A2AMessage, ErrorResponse
+from core.ingest import PayloadTooLarge, REJECTED_REQUESTS, read_body, parse_rpc_request
+from core.idempotency import IdempotencyStore
+from core.drain import drain
+from core.websocket import A2AConnection
+from core.clients import warm_up, reset_clients
+from core.config import (
+    WARMUP_ON_STARTUP, CAPTURE_ENABLED, CAPTURE_DIR, CAPTURE_MAX_BYTES, CAPTURE_BACKUP_COUNT,
+    PROBE_INTERVAL_GEMINI, PROBE_INTERVAL_LLM, PROBE_INTERVAL_BIBLE_API,
+    PROBE_INTERVAL_SCHEDULER, LLM_PROVIDERS, READY_CRITICAL_DEPENDENCIES, LOOP_MONITOR_ENABLED, RATE_LIMIT_ENABLED,
+    COMPACT_OUTPUT_MODE, IDEMPOTENCY_ENABLED
 )
-from core.ai_service import process_verse_request
-from scheduler import setup_scheduler
-
-load_dotenv()
-logging.basicConfig(level=logging.INFO)
+from core.capture import TrafficCapture
+from core.auth import is_privileged
+from core.profiling import should_profile, start_profile, finish_profile
+from core.compression import CompressionMiddleware
+from core.admission import AdmissionController, ServerBusy
+from core.loop_monitor import LoopMonitor
+from core.ratelimit import create_rate_limiter
+from core.request_context import caller_var, context_id_var, task_id_var, translations_var, status_listener_var
+from core.translations import select_translations
+from core.token_accounting import ledger
+from core.llm import router as llm_router
+from core.metrics import render_metrics
+from core.logging_setup import configure_logging, Redacted
+from core.health import DependencyProber, check_gemini, check_bible_api, make_llm_check, make_scheduler_check
+import scheduler as jobs
+
+configure_logging()
 logger = logging.getLogger(__name__)
+access_logger = logging.getLogger("main.access")  # One line per request; a candidate for LOG_SAMPLE_RATES
 
 # Global agent state (in production, use Redis or database)
 verse_agent = None
+scheduler = None  # Set while the app is running
+prober = DependencyProber()
+loop_monitor = LoopMonitor() if LOOP_MONITOR_ENABLED else None
+admission = AdmissionController()
+rate_limiter = create_rate_limiter() if RATE_LIMIT_ENABLED else None
+capture = TrafficCapture(CAPTURE_DIR, CAPTURE_MAX_BYTES, CAPTURE_BACKUP_COUNT) if CAPTURE_ENABLED else None
+idempotency = IdempotencyStore() if IDEMPOTENCY_ENABLED else None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup and shutdown"""
-    global verse_agent
+    global verse_agent, scheduler
 
     # Startup: Initialize the verse agent
+    if loop_monitor:
+        loop_monitor.start()
+    drain.reset()
     verse_agent = {}  # Simple in-memory store for contexts (sufficient for stateless agent)
-    scheduler = setup_scheduler()
-    scheduler.start()  # Start daily verse scheduler
+    scheduler = jobs.setup_scheduler()
+    scheduler.start()  # Start daily verse scheduler (catches up a recently missed post)
+    jobs.schedule_recovery(scheduler)  # Redo a post the previous instance couldn't finish
+    if WARMUP_ON_STARTUP:
+        # Pre-open upstream connections before the server starts accepting traffic
+        await warm_up()
+
+    # Background dependency probing backing /ready
+    prober.register("llm", make_llm_check(llm_router), PROBE_INTERVAL_LLM, "llm" in READY_CRITICAL_DEPENDENCIES)
+    if "gemini" in LLM_PROVIDERS:
+        prober.register("gemini", check_gemini, PROBE_INTERVAL_GEMINI, "gemini" in READY_CRITICAL_DEPENDENCIES)
+    prober.register("bible_api", check_bible_api, PROBE_INTERVAL_BIBLE_API, "bible_api" in READY_CRITICAL_DEPENDENCIES)
+    prober.register(
+        "scheduler", make_scheduler_check(scheduler), PROBE_INTERVAL_SCHEDULER,
+        "scheduler" in READY_CRITICAL_DEPENDENCIES
+    )
+    prober.start()
+    if capture:
+        capture.start()
     logger.info("Bible Verse Agent started")
 
     yield
 
-    # Shutdown: Cleanup
+    # Shutdown: drain first, so requests and a daily post in progress can finish
+    start_drain()
+    if not await drain.wait():
+        interrupted = await asyncio.to_thread(jobs.run_log.interrupt_running)
+        logger.warning("Shutting down with %s still in flight; %s job run(s) left for the next instance",
+                       dict(+drain.in_flight), interrupted)
+
+    # Cleanup
+    await prober.stop()
+    if capture:
+        capture.stop()  # Flush captured traffic
     if verse_agent:
         verse_agent.clear()
     if scheduler:
         scheduler.shutdown()
+        scheduler = None
+    jobs.run_log.close()
+    reset_clients()
+    if loop_monitor:
+        await loop_monitor.stop()
     logger.info("Bible Verse Agent shut down")
 
 app = FastAPI(
@@ -47,15 +111,190 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan
 )
+app.add_middleware(CompressionMiddleware)
+
+def start_drain():
+    """Enter drain mode: fail /ready, stop starting scheduled jobs, then stop taking requests"""
+    drain.begin()
+    if scheduler and scheduler.running:
+        scheduler.pause()  # A post that falls due now is caught up by the next instance
+
+async def peek_body(request: Request) -> Optional[dict]:
+    """Parsed JSON body (cached by Starlette), or None if it isn't a JSON object"""
+    try:
+        body = await request.json()
+    except Exception:
+        return None
+    return body if isinstance(body, dict) else None
+
+def latest_message(body: Optional[dict]) -> dict:
+    """The last message of a raw message/send or execute body"""
+    params = (body or {}).get("params") or {}
+    message = params.get("message") or (params.get("messages") or [{}])[-1]
+    return message if isinstance(message, dict) else {}
+
+async def requested_profile_token(request: Request) -> Optional[str]:
+    """Profile token from the X-Profile-Token header or the message metadata"""
+    token = request.headers.get("X-Profile-Token")
+    if token:
+        return token
+    body = await peek_body(request)
+    params = (body or {}).get("params") or {}
+    metadata = latest_message(body).get("metadata") or params.get("metadata") or {}
+    return metadata.get("profile") if isinstance(metadata, dict) else None
+
+async def identify_caller(request: Request) -> tuple[str, str]:
+    """Rate-limit key and tier for the caller of this request"""
+    if rate_limiter is None:
+        return (f"ip:{request.client.host}" if request.client else "anonymous"), "default"
+    body = await peek_body(request)
+    params = (body or {}).get("params") or {}
+    context_id = params.get("contextId") or latest_message(body).get("contextId")
+    return rate_limiter.identify(
+        request.headers.get("X-API-Key"),
+        context_id if isinstance(context_id, str) else None,
+        request.client.host if request.client else None
+    )
+
+def rate_limited_response(request: Request, retry_after: int) -> JSONResponse:
+    """JSON-RPC rate limit error telling the caller when to retry"""
+    body = getattr(request, "_json", None)
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": str(retry_after)},
+        content={
+            "jsonrpc": "2.0",
+            "id": body.get("id") if isinstance(body, dict) else None,
+            "error": {
+                "code": -32001,
+                "message": "Rate limit exceeded",
+                "data": {"retryAfter": retry_after}
+            }
+        }
+    )
 
 @app.post("/a2a")
 async def a2a_endpoint(request: Request):
     """Main A2A endpoint for verse agent"""
-    logger.info(f"Received A2A request from {request.client.host if request.client else 'unknown'}")
+    return await serve_a2a(request)
+
+@app.websocket("/a2a/ws")
+async def a2a_websocket(websocket: WebSocket):
+    """JSON-RPC over one long-lived connection; every frame takes the same path as POST /a2a"""
+    if not drain.accepting():
+        await websocket.close(code=1013)  # Try again later (elsewhere)
+        return
+    status_updates = websocket.query_params.get("statusUpdates", "true").lower() != "false"
+    await A2AConnection(websocket, serve_a2a, status_updates=status_updates).run()
+
+async def serve_a2a(request: Request) -> JSONResponse:
+    """Read, admit, process and capture one A2A request (an HTTP body or a WebSocket frame)"""
+    arrived_at = time.time()
+    start = time.perf_counter()
+    try:
+        await read_body(request)  # Size-limited; later reads reuse it
+    except PayloadTooLarge as e:
+        return payload_too_large_response(e)
+    if not drain.accepting():
+        await peek_body(request)  # For the JSON-RPC id
+        REJECTED_REQUESTS.inc(reason="draining")
+        return server_busy_response(request, ServerBusy("draining", 1))
+    async with drain.track("request"):
+        response = await identify_and_process(request)
+    if capture:
+        capture.record(
+            getattr(request.state, "rpc_body", None), arrived_at, response.status_code,
+            round((time.perf_counter() - start) * 1000, 2)
+        )
+    return response
+
+async def identify_and_process(request: Request) -> JSONResponse:
+    """Identify the caller and process the request, replaying or joining retries"""
+    profile_token = await requested_profile_token(request)
+    caller, tier = await identify_caller(request)
+    caller_var.set(caller)
+    key = idempotency.key_for(caller, await peek_body(request)) if idempotency is not None else None
+    if key:
+        # Retries replay the stored response or wait for the original run
+        return await idempotency.run(key, lambda: process_a2a_request(request, caller, tier, profile_token))
+    return await process_a2a_request(request, caller, tier, profile_token)
+
+def payload_too_large_response(error: PayloadTooLarge) -> JSONResponse:
+    """JSON-RPC invalid request error for a body over the size limit"""
+    return JSONResponse(
+        status_code=413,
+        content={
+            "jsonrpc": "2.0",
+            "id": None,  # The body isn't parsed
+            "error": {
+                "code": -32600,
+                "message": "Invalid Request: request body too large",
+                "data": {"maxBytes": error.limit}
+            }
+        }
+    )
+
+async def process_a2a_request(request: Request, caller: str, tier: str, profile_token: Optional[str]) -> JSONResponse:
+    """Rate limit, admit, profile and handle one identified request"""
+    if rate_limiter:
+        decision = await rate_limiter.check(caller, tier)
+        if not decision.allowed:
+            logger.warning("Rate limited caller %s (tier %s)", caller, tier)
+            return rate_limited_response(request, decision.retry_after)
+    profiler = start_profile() if should_profile(profile_token) else None
+    try:
+        async with admission.admit():
+            response = await handle_a2a_request(request)
+    except ServerBusy as e:
+        response = server_busy_response(request, e)
+    finally:
+        if profiler:
+            rpc_id = (getattr(request.state, "rpc_body", None) or {}).get("id", "unknown")
+            profile_path = await asyncio.to_thread(finish_profile, profiler, f"a2a-{rpc_id}")
+    if profiler and is_privileged(profile_token):
+        response.headers["X-Profile-File"] = os.path.basename(profile_path)
+    return response
+
+def server_busy_response(request: Request, error: ServerBusy) -> JSONResponse:
+    """JSON-RPC "server busy" error telling the caller when to retry"""
+    body = getattr(request.state, "rpc_body", None)
+    if body is None:
+        body = getattr(request, "_json", None)  # Parsed already when checking for a profile token
+    logger.warning("Shedding A2A request: %s, retry after %ss", error.reason, error.retry_after)
+    return JSONResponse(
+        status_code=503,
+        headers={"Retry-After": str(error.retry_after)},
+        content={
+            "jsonrpc": "2.0",
+            "id": body.get("id") if isinstance(body, dict) else None,
+            "error": {
+                "code": -32000,
+                "message": "Server busy, retry later",
+                "data": {"reason": error.reason, "retryAfter": error.retry_after}
+            }
+        }
+    )
+
+def wants_compact_response(config: dict, messages: List[A2AMessage]) -> bool:
+    """Compact profile via acceptedOutputModes or {"responseProfile": "compact"} message metadata"""
+    if COMPACT_OUTPUT_MODE in (config.get("acceptedOutputModes") or []):
+        return True
+    metadata = (messages[-1].metadata if messages else None) or {}
+    return metadata.get("responseProfile") == "compact"
+
+def requested_translations(config: dict, messages: List[A2AMessage], context_id: str) -> list[str]:
+    """Translations from message metadata or configuration, else the channel's, else the default"""
+    metadata = (messages[-1].metadata or {}) if messages else {}
+    return select_translations(metadata.get("translation") or config.get("translation"), context_id)
+
+async def handle_a2a_request(request: Request) -> JSONResponse:
+    """Validate and process one JSON-RPC request"""
+    access_logger.info("Received A2A request from %s", request.client.host if request.client else "unknown")
     try:
         # Parse request body
         body = await request.json()
-        logger.info(f"Request body: {body}")
+        request.state.rpc_body = body
+        access_logger.debug("Request body: %s", Redacted(body))
 
         # Validate JSON-RPC request
         if body.get("jsonrpc") != "2.0" or "id" not in body:
@@ -71,61 +310,43 @@ async def a2a_endpoint(request: Request):
                 }
             )
 
-        rpc_request = JSONRPCRequest(**body)
-
-        # Extract messages, context, and task info
-        messages = []
-        context_id = None
-        task_id = None
-        config = {}
-
-        # Handle different method types safely
-        if hasattr(rpc_request.params, 'message'):
-            # message/send method
-            messages = [rpc_request.params.message]
-            config = rpc_request.params.configuration.model_dump() if hasattr(rpc_request.params, 'configuration') and rpc_request.params.configuration else {}
-        elif hasattr(rpc_request.params, 'messages'):
-            # execute method
-            messages = rpc_request.params.messages
-            context_id = getattr(rpc_request.params, 'contextId', None)
-            task_id = getattr(rpc_request.params, 'taskId', None)
-        else:
-            # Handle unknown methods gracefully
-            return JSONResponse(
-                status_code=200,
-                content={
-                    "jsonrpc": "2.0",
-                    "id": rpc_request.id,
-                    "error": {
-                        "code": -32601,
-                        "message": "Method not found: only 'message/send' and 'execute' are supported"
-                    }
-                }
-            )
+        # Only the last message is validated; earlier history is held raw
+        rpc_request = parse_rpc_request(body)
+        messages = rpc_request.messages
+        context_id = rpc_request.context_id
+        task_id = rpc_request.task_id
+        config = rpc_request.config
 
         # Generate IDs if not provided
         context_id = context_id or str(uuid4())
         task_id = task_id or str(uuid4())
+        context_id_var.set(context_id)
+        task_id_var.set(task_id)
+        translations_var.set(requested_translations(config, messages, context_id))
+        listener = status_listener_var.get()
+        if listener:
+            await listener(rpc_request.id, task_id, context_id, "working")  # Pushed to WebSocket clients
 
         # Process with verse agent
         from core.ai_service import process_messages
+        compact = wants_compact_response(config, messages)
         result = await process_messages(
             messages=messages,
             context_id=context_id,
             task_id=task_id,
-            config=config
+            config=config,
+            compact=compact
         )
 
-        # Build response
-        response = JSONRPCResponse(
-            id=rpc_request.id,
-            result=result
-        )
+        # Build response (serialized like JSONRPCResponse.model_dump, without building the models)
+        response = {"jsonrpc": "2.0", "id": rpc_request.id, "result": result.to_dict(exclude_none=compact)}
+        if not compact:
+            response["error"] = None
 
-        return response.model_dump()
+        return JSONResponse(content=response)
 
     except Exception as e:
-        logger.error(f"Error processing request: {str(e)}")
+        logger.error("Error processing request: %s", e)
         # Enhanced error handling with A2A error codes
         error_code = -32603  # Internal error
         error_message = "Internal error"
@@ -149,112 +370,6 @@ async def a2a_endpoint(request: Request):
             }
         )
 
-def extract_latest_user_text(message_parts: List) -> Optional[str]:
-    """
-    Extract the latest valid user text from message parts.
-    Handles nested data structures where text might be inside "data" blocks.
-    """
-    # Iterate through parts in reverse order to get the latest
-    for part in reversed(message_parts):
-        if part.kind == "text" and part.text and part.text.strip():
-            clean_text = part.text.strip()
-            # Skip HTML-only content
-            if clean_text not in ["<p></p>", "<p><br></p>", ""]:
-                return clean_text
-        elif part.kind == "data" and isinstance(part.data, list):
-            # Look inside the data list for text parts
-            for sub_part in reversed(part.data):
-                if isinstance(sub_part, dict) and sub_part.get("kind") == "text" and sub_part.get("text") and sub_part["text"].strip():
-                    clean_text = sub_part["text"].strip()
-                    if clean_text not in ["<p></p>", "<p><br></p>", ""]:
-                        return clean_text
-    return None
-
-async def process_messages(
-    messages: list[A2AMessage],
-    context_id: str,
-    task_id: str,
-    config: dict = {}
-) -> TaskResult:
-    """Process incoming messages and generate verse response"""
-
-    # Extract last user message
-    user_message = messages[-1] if messages else None
-    if not user_message:
-        raise ValueError("No message provided")
-
-    # Extract query from message parts using robust extraction
-    query = extract_latest_user_text(user_message.parts)
-
-    if not query:
-        logger.warning("No valid user query detected in message parts")
-        # Handle as casual chat instead of error
-        query = "__CASUAL_CHAT__"
-
-    logger.info(f"Processing verse request: {query}")
-
-    # Process the verse request (using existing logic)
-    verse_result = process_verse_request(query)
-
-    if verse_result:
-        # Build response message for verse
-        response_text = f"Here's a verse on '{verse_result.topic}':\n\n{verse_result.verse_reference}\n{verse_result.verse_text}"
-        if verse_result.reflection:
-            response_text += f"\n\nReflection: {verse_result.reflection}"
-
-        response_message = A2AMessage(
-            role="agent",
-            parts=[MessagePart(kind="text", text=response_text)],
-            taskId=task_id
-        )
-
-        # Build artifacts
-        artifacts = [
-            Artifact(
-                name="verse",
-                parts=[
-                    MessagePart(kind="text", text=verse_result.verse_text),
-                    MessagePart(kind="data", data={
-                        "reference": verse_result.verse_reference,
-                        "topic": verse_result.topic,
-                        "reflection": verse_result.reflection,
-                        "timestamp": verse_result.timestamp
-                    })
-                ]
-            )
-        ]
-    else:
-        # Handle casual chat
-        response_text = "Good morning to you too!\n\nWould you like me to share a Bible verse? You can say something like: I need a verse on Love."
-        response_message = A2AMessage(
-            role="agent",
-            parts=[MessagePart(kind="text", text=response_text)],
-            taskId=task_id
-        )
-        artifacts = [
-            Artifact(
-                name="chat_response",
-                parts=[MessagePart(kind="text", text=response_text)]
-            )
-        ]
-
-    # Build history
-    history = messages + [response_message]
-
-    # Determine state (completed since it's a single-turn task)
-    state = "completed"
-
-    return TaskResult(
-        id=task_id,
-        contextId=context_id,
-        status=TaskStatus(
-            state=state,
-            message=response_message
-        ),
-        artifacts=artifacts,
-        history=history
-    )
-    
 @app.get("/.well-known/agent.json")
 async def agent_metadata():
     """Endpoint to provide agent metadata for discovery"""
@@ -268,7 +383,8 @@ async def agent_metadata():
             "Daily verse posting"
         ],
         "endpoints": {
-            "a2a": "/a2a"
+            "a2a": "/a2a",
+            "a2a_websocket": "/a2a/ws"
         }
     }
 
@@ -276,7 +392,104 @@ async def agent_metadata():
 async def health_check():
     return {"status": "healthy", "agent": "bible-verse"}
 
-if __name__ == "__main__":
+@app.get("/ready")
+async def readiness_check():
+    """Readiness from cached background probes; does no I/O on the request path"""
+    report = prober.report()
+    if drain.draining:
+        report["ready"] = False
+        report["draining"] = drain.status()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
+
+@app.post("/admin/drain")
+async def begin_drain(request: Request):
+    """Start draining ahead of a shutdown, e.g. from a preStop hook (admin only)"""
+    if not is_privileged(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    start_drain()
+    return drain.status()
+
+@app.get("/admin/usage")
+async def caller_usage(request: Request, caller: Optional[str] = None):
+    """Per-caller request counters from the rate limiter (admin only)"""
+    if not is_privileged(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return {"callers": rate_limiter.usage(caller) if rate_limiter else {}}
+
+@app.get("/admin/tokens")
+async def token_usage(request: Request, caller: Optional[str] = None, context: Optional[str] = None):
+    """LLM token usage by stage, caller and contextId (admin only)"""
+    if not is_privileged(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return ledger.summary(caller=caller, context_id=context)
+
+@app.get("/admin/llm")
+async def llm_providers(request: Request):
+    """Routing state per LLM provider: latency, error rate, breaker (admin only)"""
+    if not is_privileged(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return {"providers": llm_router.report()}
+
+@app.get("/admin/jobs")
+async def list_jobs(request: Request):
+    """Scheduled jobs and their next run times (admin only)"""
+    if not is_privileged(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    scheduled = scheduler.get_jobs() if scheduler else []
+    return {
+        "jobs": [
+            {
+                "id": job.id,
+                "name": job.name,
+                "trigger": str(job.trigger),
+                "next_run_time": job.next_run_time.isoformat() if job.next_run_time else None
+            }
+            for job in scheduled
+        ]
+    }
+
+@app.get("/admin/jobs/runs")
+async def list_job_runs(request: Request, job: Optional[str] = None, limit: int = 50):
+    """Recent job runs with their trigger, status and duration (admin only)"""
+    if not is_privileged(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return {"runs": await asyncio.to_thread(jobs.run_log.runs, job, min(max(limit, 1), 500))}
+
+@app.post("/admin/jobs/{job_id}/run")
+async def trigger_job(request: Request, job_id: str):
+    """Run a job now and return its run record (admin only)"""
+    if not is_privileged(request.headers.get("X-Admin-Token")):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    if job_id not in jobs.JOBS:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    if not drain.accepting():
+        raise HTTPException(status_code=503, detail="Draining for shutdown", headers={"Retry-After": "1"})
+    run_id = await jobs.JOBS[job_id](trigger="manual")
+    runs = await asyncio.to_thread(jobs.run_log.runs, job_id, 20)
+    return next((run for run in runs if run["id"] == run_id), {"id": run_id})
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus text exposition of the in-process metrics"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+def serve(host: str = "0.0.0.0", port: int = 8000):
+    """Run under uvicorn; the first SIGTERM/SIGINT drains before the server stops, a second one stops it at once"""
     import uvicorn
-    port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+
+    class DrainingServer(uvicorn.Server):
+        def handle_exit(self, sig, frame):
+            if drain.draining:
+                super().handle_exit(sig, frame)
+                return
+            start_drain()
+            asyncio.get_running_loop().create_task(self.exit_when_drained(sig, frame))
+
+        async def exit_when_drained(self, sig, frame):
+            await drain.wait()
+            super().handle_exit(sig, frame)
+
+    DrainingServer(uvicorn.Config(app, host=host, port=port)).run()
+
+if __name__ == "__main__":
+    serve(port=int(os.getenv("PORT", 8000)))
@@ -0,0 +1,148 @@
+"""
+Replay captured /a2a traffic against a target instance.
+
+Requests are re-sent at their original inter-arrival times (or N times faster with
+--speed) and the replay's latency distribution and error rate are compared with
+what was captured.
+
+    python replay.py captures/a2a_capture.jsonl* --target http://localhost:8000 --speed 2
+
+Against a rate-limited target, pass --api-key with a key mapped to a tier sized for
+the replay; without one every request shares the replaying host's IP bucket.
+Captured JSON-RPC ids and messageIds are replaced per request (unless --keep-ids)
+so the target's idempotency store doesn't answer replays from its cache.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import time
+import uuid
+
+import httpx
+
+def load_capture(paths: list[str]) -> list[dict]:
+    """
+    Load captured records from one or more JSONL files, ordered by arrival time.
+    """
+    records = []
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path, encoding="utf-8") as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+    records.sort(key=lambda record: record["ts"])
+    return records
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+def summarize(latencies: list[float], errors: int, total: int) -> dict:
+    return {
+        "requests": total,
+        "error_rate": errors / total if total else 0.0,
+        "p50_ms": percentile(latencies, 50),
+        "p90_ms": percentile(latencies, 90),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": max(latencies) if latencies else 0.0,
+    }
+
+def is_error(status: int) -> bool:
+    return status >= 400
+
+def with_fresh_ids(body: dict) -> dict:
+    """
+    Copy of a captured request with a new JSON-RPC id and message messageId, so the
+    target's idempotency store doesn't answer it from a cached response.
+    """
+    body = json.loads(json.dumps(body))
+    if "id" in body:
+        body["id"] = uuid.uuid4().hex
+    message = (body.get("params") or {}).get("message")
+    if isinstance(message, dict) and "messageId" in message:
+        message["messageId"] = uuid.uuid4().hex
+    return body
+
+async def send(client: httpx.AsyncClient, record: dict, results: list, fresh_ids: bool = True):
+    start = time.perf_counter()
+    try:
+        body = with_fresh_ids(record["body"]) if fresh_ids else record["body"]
+        response = await client.post("/a2a", json=body)
+        status = response.status_code
+    except httpx.HTTPError:
+        status = 599  # Transport failure
+    results.append((status, (time.perf_counter() - start) * 1000))
+
+async def replay(records: list[dict], client: httpx.AsyncClient, speed: float = 1.0, fresh_ids: bool = True) -> list:
+    """
+    Send every record at its original offset from the first one, divided by `speed`.
+    Unless `fresh_ids` is off, each request gets new ids (see with_fresh_ids).
+    """
+    if not records:
+        return []
+    results = []
+    first_ts = records[0]["ts"]
+    started = time.perf_counter()
+    tasks = []
+    for record in records:
+        delay = (record["ts"] - first_ts) / speed - (time.perf_counter() - started)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, record, results, fresh_ids)))
+    await asyncio.gather(*tasks)
+    return results
+
+def compare(records: list[dict], results: list) -> dict:
+    captured = summarize(
+        [r["latency_ms"] for r in records],
+        sum(1 for r in records if is_error(r["status"])),
+        len(records)
+    )
+    replayed = summarize(
+        [latency for _, latency in results],
+        sum(1 for status, _ in results if is_error(status)),
+        len(results)
+    )
+    return {
+        "captured": captured,
+        "replayed": replayed,
+        "error_rate_delta": replayed["error_rate"] - captured["error_rate"],
+    }
+
+def print_report(report: dict):
+    print(f"{'':>10} {'requests':>9} {'errors':>8} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name in ("captured", "replayed"):
+        row = report[name]
+        print(f"{name:>10} {row['requests']:>9} {row['error_rate']:>8.2%} {row['p50_ms']:>9.1f} "
+              f"{row['p90_ms']:>9.1f} {row['p99_ms']:>9.1f} {row['max_ms']:>9.1f}")
+    print(f"error rate delta: {report['error_rate_delta']:+.2%}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", help="Capture files or glob patterns")
+    parser.add_argument("--target", default="http://localhost:8000", help="Base URL of the instance to replay against")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay N times faster than captured")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--api-key", help="Sent as X-API-Key, to land in a RATE_LIMIT_API_KEYS tier")
+    parser.add_argument("--keep-ids", action="store_true",
+                        help="Resend captured ids as-is (retries within IDEMPOTENCY_TTL get cached responses)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    records = load_capture(args.captures)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    headers = {"X-API-Key": args.api_key} if args.api_key else None
+    async with httpx.AsyncClient(base_url=args.target, timeout=args.timeout, limits=limits, headers=headers) as client:
+        results = await replay(records, client, speed=args.speed, fresh_ids=not args.keep_ids)
+
+    report = compare(records, results)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+if __name__ == "__main__":
+    asyncio.run(main())
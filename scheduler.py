@@ -1,72 +1,184 @@
-import requests
+import asyncio
+import time
 import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Optional
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 from core.bible_api import get_daily_verse
 from core.ai_service import generate_reflection
-from core.config import DAILY_POST_TIME, TELEX_BASE_URL, TELEX_WEBHOOK_HOOK_ID, TELEX_BEARER_TOKEN
+from core.clients import get_http_session
+from core.job_store import SQLiteJobStore, JobRunLog
+from core.profiling import start_profile, finish_profile, should_profile
+from core.request_context import profiler_var
+from core.drain import drain
+from core.config import (
+    PROFILE_SCHEDULER, DAILY_POST_TIME, DAILY_MISFIRE_GRACE, SCHEDULER_DB_PATH, TELEX_BASE_URL,
+    TELEX_WEBHOOK_HOOK_ID, TELEX_BEARER_TOKEN
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
-def post_daily_verse():
+# Run history shared by scheduled and manually triggered runs
+run_log = JobRunLog()
+
+def publish_daily_verse(slot: Optional[str] = None) -> str:
     """
-    Function to post the daily verse to Telex via A2A webhook.
+    Fetch, reflect on and post today's verse; returns its reference.
+    Raises when the verse can't be built or the webhook rejects it.
+    Posts for a slot carry ids derived from it, so a redone post (after an
+    interrupted shutdown) can be recognized as the same message downstream.
     """
-    try:
-        verse = get_daily_verse()
-        reflection = generate_reflection(verse.verse_text, verse.topic)
-        verse.reflection = reflection
+    message_id = uuid.uuid5(uuid.NAMESPACE_URL, f"daily_verse:{slot}").hex if slot else uuid.uuid4().hex
+    verse = get_daily_verse()
+    reflection = generate_reflection(verse.verse_text, verse.topic)
+    verse.reflection = reflection
 
-        # Prepare A2A message payload for Telex webhook
-        a2a_payload = {
-            "jsonrpc": "2.0",
-            "id": str(uuid.uuid4().hex),
-            "method": "message/send",
-            "params": {
-                "message": {
-                    "kind": "message",
-                    "role": "agent",
-                    "parts": [
-                        {
-                            "kind": "text",
-                            "text": f"📖 **Daily Bible Verse**\n\n**{verse.verse_reference}**\n{verse.verse_text}\n\n💭 *{verse.reflection}*",
-                            "metadata": None
-                        }
-                    ],
-                    "messageId": str(uuid.uuid4().hex),
-                    "contextId": None,
-                    "taskId": None
-                },
-                "metadata": None
-            }
+    # Prepare A2A message payload for Telex webhook
+    a2a_payload = {
+        "jsonrpc": "2.0",
+        "id": message_id,
+        "method": "message/send",
+        "params": {
+            "message": {
+                "kind": "message",
+                "role": "agent",
+                "parts": [
+                    {
+                        "kind": "text",
+                        "text": f"📖 **Daily Bible Verse**\n\n**{verse.verse_reference}**\n{verse.verse_text}\n\n💭 *{verse.reflection}*",
+                        "metadata": None
+                    }
+                ],
+                "messageId": message_id,
+                "contextId": None,
+                "taskId": None
+            },
+            "metadata": None
         }
+    }
 
-        # Send to Telex A2A webhook if configured
-        if TELEX_WEBHOOK_HOOK_ID and TELEX_BEARER_TOKEN:
-            webhook_url = f"{TELEX_BASE_URL}/a2a/webhooks/{TELEX_WEBHOOK_HOOK_ID}"
-            headers = {
-                "Authorization": f"Bearer {TELEX_BEARER_TOKEN}",
-                "Content-Type": "application/json"
-            }
-            response = requests.post(webhook_url, json=a2a_payload, headers=headers, timeout=10)
-            if response.status_code == 200:
-                logger.info(f"Daily verse posted successfully: {verse.verse_reference}")
-            else:
-                logger.error(f"Failed to post daily verse: {response.status_code} - {response.text}")
+    # Send to Telex A2A webhook if configured
+    if TELEX_WEBHOOK_HOOK_ID and TELEX_BEARER_TOKEN:
+        webhook_url = f"{TELEX_BASE_URL}/a2a/webhooks/{TELEX_WEBHOOK_HOOK_ID}"
+        headers = {
+            "Authorization": f"Bearer {TELEX_BEARER_TOKEN}",
+            "Content-Type": "application/json"
+        }
+        response = get_http_session().post(webhook_url, json=a2a_payload, headers=headers, timeout=10)
+        if response.status_code == 200:
+            logger.info("Daily verse posted successfully: %s", verse.verse_reference)
         else:
-            logger.warning("TELEX_WEBHOOK_HOOK_ID or TELEX_BEARER_TOKEN not configured, logging verse instead")
-            logger.info(f"Daily Verse: {verse.verse_reference} - {verse.verse_text} - Reflection: {verse.reflection}")
+            raise RuntimeError(f"Failed to post daily verse: {response.status_code} - {response.text}")
+    else:
+        logger.warning("TELEX_WEBHOOK_HOOK_ID or TELEX_BEARER_TOKEN not configured, logging verse instead")
+        logger.info("Daily Verse: %s - %s - Reflection: %s", verse.verse_reference, verse.verse_text, verse.reflection)
+    return verse.verse_reference
 
-    except Exception as e:
-        logger.error(f"Error posting daily verse: {e}")
+def parse_post_time(value: str) -> tuple[int, int]:
+    """
+    Parse DAILY_POST_TIME ("HH:MM", UTC).
+    """
+    try:
+        hour, minute = (int(part) for part in value.split(":"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"DAILY_POST_TIME must look like HH:MM, got {value!r}")
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"DAILY_POST_TIME out of range: {value!r}")
+    return hour, minute
 
-def setup_scheduler():
+def current_slot(now: Optional[datetime] = None) -> str:
+    """
+    The scheduled occurrence a daily run belongs to: the latest DAILY_POST_TIME at or before now.
+    """
+    now = now or datetime.now(timezone.utc)
+    hour, minute = parse_post_time(DAILY_POST_TIME)
+    slot = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if slot > now:
+        slot -= timedelta(days=1)
+    return slot.strftime("%Y-%m-%dT%H:%M")
+
+async def daily_verse_job(trigger: str = "scheduled", slot: Optional[str] = None) -> Optional[int]:
+    """
+    Coroutine job posting the daily verse; the blocking work runs in a thread so the
+    event loop keeps serving requests. Scheduled runs (and recoveries of an
+    interrupted `slot`) are skipped when their slot already succeeded (e.g. caught
+    up before a restart). Counts as work in flight while draining. Returns the run id.
+    """
+    slot = slot or (current_slot() if trigger == "scheduled" else None)
+    if slot and await asyncio.to_thread(run_log.slot_completed, "daily_verse", slot):
+        logger.info("Daily verse for %s already posted, skipping", slot)
+        return None
+
+    async with drain.track("job"):
+        run_id = await asyncio.to_thread(run_log.start, "daily_verse", trigger, slot)
+        start = time.perf_counter()
+        profiler = start_profile() if PROFILE_SCHEDULER or should_profile() else None
+        try:
+            reference = await asyncio.to_thread(publish_daily_verse, slot)
+        except Exception as e:
+            logger.error("Error posting daily verse: %s", e)
+            await asyncio.to_thread(run_log.finish, run_id, "failed", (time.perf_counter() - start) * 1000, str(e))
+        else:
+            await asyncio.to_thread(run_log.finish, run_id, "succeeded", (time.perf_counter() - start) * 1000, reference)
+        finally:
+            if profiler:
+                await asyncio.to_thread(finish_profile, profiler, "daily_verse")  # Writes the file off the loop
+                profiler_var.set(None)
+    return run_id
+
+def schedule_recovery(scheduler: AsyncIOScheduler, now: Optional[datetime] = None) -> Optional[str]:
+    """
+    Re-run the latest daily post a previous instance left unfinished (interrupted
+    by shutdown, or still "running" after a crash), if that slot is at most
+    DAILY_MISFIRE_GRACE seconds old. Returns the slot being redone.
+    """
+    now = now or datetime.now(timezone.utc)
+    slots = [
+        slot for slot in run_log.unfinished_slots("daily_verse")
+        if (now - datetime.strptime(slot, "%Y-%m-%dT%H:%M").replace(tzinfo=timezone.utc)).total_seconds()
+        <= DAILY_MISFIRE_GRACE
+    ]
+    if not slots:
+        return None
+    slot = slots[-1]
+    logger.info("Redoing unfinished daily verse post for %s", slot)
+    scheduler.add_job(
+        daily_verse_job, trigger="date", run_date=now, kwargs={"trigger": "recovery", "slot": slot},
+        id="daily_verse_recovery", name="Redo Unfinished Daily Verse", replace_existing=True
+    )
+    return slot
+
+# Jobs that can be triggered by hand from the admin endpoints
+JOBS = {"daily_verse": daily_verse_job}
+
+def setup_scheduler(db_path: str = SCHEDULER_DB_PATH) -> AsyncIOScheduler:
     """
     Set up the APScheduler for daily verse posting.
+    Jobs persist in SQLite; a post missed while the service was down runs on startup
+    if it is less than DAILY_MISFIRE_GRACE seconds late, and several missed posts
+    are coalesced into one.
     """
-    scheduler = AsyncIOScheduler()
-    hour, minute = DAILY_POST_TIME.split(":")
-    trigger = CronTrigger(hour=int(hour), minute=int(minute))
-    scheduler.add_job(post_daily_verse, trigger=trigger, id="daily_verse", name="Post Daily Verse")
+    scheduler = AsyncIOScheduler(
+        timezone=timezone.utc,
+        job_defaults={"coalesce": True, "misfire_grace_time": DAILY_MISFIRE_GRACE, "max_instances": 1}
+    )
+    store = SQLiteJobStore(db_path)
+    scheduler.add_jobstore(store, "default")
+
+    hour, minute = parse_post_time(DAILY_POST_TIME)
+    trigger = CronTrigger(hour=hour, minute=minute, timezone=timezone.utc)
+
+    # Replacing the stored job would reschedule it from now and drop a missed run,
+    # so keep the saved next run time while the schedule itself is unchanged
+    options = {}
+    saved = store.stored_state("daily_verse")
+    if saved and saved.get("next_run_time") and repr(saved["trigger"]) == repr(trigger):
+        options["next_run_time"] = saved["next_run_time"]
+
+    scheduler.add_job(
+        daily_verse_job, trigger=trigger, id="daily_verse", name="Post Daily Verse",
+        replace_existing=True, **options
+    )
     return scheduler
@@ -0,0 +1,459 @@
+"""
+Soak test: drive the app with hours of simulated /a2a traffic against local fake
+upstreams and watch its memory for slow leaks.
+
+The app runs in-process (lifespan, scheduler, probes and middleware included),
+with labs.bible.org, bible-api.com, the LLM (an OpenAI-compatible endpoint) and
+the Telex webhook served by a local fake. Traffic is a seeded mix of verse
+requests, chat, multi-topic and multi-translation requests, conversations with
+history and retries, spread over a fixed pool of contexts, with the daily post
+run every --job-every requests. The same seed sends the same requests, so a
+leak fix can be checked against the run that found it.
+
+Every --sample-every requests RSS and the Python heap's allocated blocks are
+sampled (after a full collection). Growth is the least-squares slope over the
+samples after --warmup (once caches and stores have filled up), reported per 10k
+requests; the run fails when it exceeds --max-rss-kib or --max-blocks. The object
+types that grew most since the end of warm-up are listed to point at the leak.
+
+tracemalloc costs something on every allocation (the app runs 5-20x slower under
+it), so it is opt-in: with --trace, traced memory is sampled and fitted too
+(--max-traced-kib) and the allocation sites that grew most are listed. Untraced
+runs manage roughly 80 requests/s, traced ones a few; trace a short run once an
+untraced one has found growth.
+
+    python soak.py --requests 50000 --seed 7
+    python soak.py --requests 2000 --seed 7 --trace --sample-every 100
+    python soak.py --requests 200000 --rate 5 --json > soak-report.json
+"""
+import argparse
+import asyncio
+import gc
+import hashlib
+import json
+import linecache
+import multiprocessing
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import ExitStack, asynccontextmanager
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+from unittest.mock import patch
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import httpx
+
+# Growth per 10k requests after warm-up before a run fails
+MAX_TRACED_KIB = 512
+MAX_RSS_KIB = 4096
+MAX_BLOCKS = 5000  # Python heap blocks; leaking one object per request adds at least 10k
+
+REFERENCES = [
+    "John 3:16", "Psalm 23:1", "Philippians 4:13", "Romans 8:28", "Isaiah 41:10", "Jeremiah 29:11",
+    "Proverbs 3:5", "Matthew 11:28", "1 Corinthians 13:4", "Joshua 1:9", "Psalm 46:1", "Hebrews 11:1",
+]
+TOPICS = [
+    "love", "hope", "faith", "peace", "strength", "fear", "anxiety", "forgiveness", "patience", "grief",
+    "gratitude", "courage", "joy", "wisdom", "healing", "God's love", "loving others", "trusting God",
+]
+TRANSLATIONS = [None, None, None, "KJV", "WEB", ["NET", "KJV"]]
+GREETINGS = ["hello", "hi there", "good morning!", "thanks, that was helpful", "who are you?"]
+VERSE_ASKS = ["I need a verse on {}", "Bible verse about {}", "scripture on {}", "something for {} please"]
+
+class FakeUpstreams:
+    """
+    A local HTTP server, in a child process so its threads and allocations stay out
+    of the measurements, standing in for every upstream the app calls.
+    `latency` (seconds) is added to each response.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.url = None
+        self._process = None
+
+    def __enter__(self):
+        context = multiprocessing.get_context("spawn")
+        ready = context.Queue()
+        self._process = context.Process(target=serve_upstreams, args=(self.latency, ready), name="soak-upstreams",
+                                        daemon=True)
+        self._process.start()
+        self.url = f"http://127.0.0.1:{ready.get(timeout=30)}"
+        return self
+
+    def __exit__(self, *exc):
+        self._process.terminate()
+        self._process.join()
+
+    def calls(self) -> Dict[str, int]:
+        """Requests served so far, by upstream"""
+        return httpx.get(f"{self.url}/_calls").json()
+
+def serve_upstreams(latency: float, ready):
+    calls: Counter = Counter()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Keep-alive, like the real upstreams
+        disable_nagle_algorithm = True
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def do_GET(self):
+            self.respond("GET")
+
+        def do_POST(self):
+            self.respond("POST")
+
+        def respond(self, method: str):
+            url = urlsplit(self.path)
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if latency:
+                time.sleep(latency)
+            if url.path == "/_calls":
+                kind, payload = None, dict(calls)
+            elif url.path.startswith("/labs"):
+                kind, payload = "labs", labs_passage(parse_qs(url.query).get("passage", ["random"])[0])
+            elif url.path.startswith("/bible-api/"):
+                reference = unquote(url.path[len("/bible-api/"):])
+                kind, payload = "bible_api", {"reference": reference, "verses": [{"text": passage_text(reference)}]}
+            elif url.path.endswith("/chat/completions") and method == "POST":
+                kind, payload = "llm", chat_completion(json.loads(body))
+            elif url.path.startswith("/telex/"):
+                kind, payload = "telex", {"status": "ok"}
+            else:
+                kind, payload = "unknown", {"error": "not found"}
+            if kind:
+                calls[kind] += 1
+            data = json.dumps(payload).encode()
+            self.send_response(404 if kind == "unknown" else 200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    ready.put(server.server_address[1])
+    server.serve_forever()
+
+def _pick(options: list, key: str):
+    return options[int(hashlib.sha256(key.encode()).hexdigest(), 16) % len(options)]
+
+def passage_text(reference: str) -> str:
+    return f"The text of {reference}, as the fake upstream has it."
+
+def labs_passage(reference: str) -> list:
+    """labs.bible.org rows for "Book C:V"; "random" is always the same verse, to keep runs reproducible"""
+    if reference == "random":
+        reference = REFERENCES[0]
+    book, _, location = reference.rpartition(" ")
+    chapter, _, verse = location.partition(":")
+    return [{"bookname": book or "John", "chapter": chapter or "3", "verse": verse or "16",
+             "text": passage_text(reference)}]
+
+def fake_reply(prompt: str) -> str:
+    """What the fake LLM answers, picked by which stage's prompt it got"""
+    intent = re.search(r"intent from this message: '(.*)'\.", prompt)
+    if intent:
+        query = intent.group(1).lower()
+        for ask in VERSE_ASKS:
+            prefix, _, suffix = ask.lower().partition("{}")
+            if query.startswith(prefix) and query.endswith(suffix):
+                return query[len(prefix):len(query) - len(suffix)].replace(" and ", ", ")
+        return "__NO_VERSE__"
+    reference = re.search(r"reference about (.*)\. Format", prompt)
+    if reference:
+        return _pick(REFERENCES, reference.group(1))
+    if "reflection on this Bible verse" in prompt:
+        return "May this verse give you strength today."
+    return "Hello! Would you like me to share a Bible verse? You can say something like: I need a verse on Love."
+
+def chat_completion(request: dict) -> dict:
+    prompt = request["messages"][-1]["content"]
+    text = fake_reply(prompt)
+    prompt_tokens, output_tokens = len(prompt.split()), len(text.split())
+    return {
+        "id": "chatcmpl-soak", "object": "chat.completion", "created": 0, "model": request.get("model"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": text}}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": output_tokens,
+                  "total_tokens": prompt_tokens + output_tokens},
+    }
+
+def _message(text: str, role: str = "user", **fields) -> dict:
+    return {"kind": "message", "role": role, "parts": [{"kind": "text", "text": text}],
+            "messageId": fields.pop("message_id"), **fields}
+
+def traffic(seed: int, contexts: int = 1000) -> Iterator[dict]:
+    """
+    Endless seeded stream of /a2a bodies. About 5% are retries of an earlier
+    request (same messageId), so idempotent replays are part of the mix.
+    """
+    rng = random.Random(seed)
+    recent: List[dict] = []
+    n = 0
+    while True:
+        n += 1
+        if recent and rng.random() < 0.05:
+            yield rng.choice(recent)
+            continue
+        context_id = f"soak-ctx-{rng.randrange(contexts)}"
+        roll = rng.random()
+        if roll < 0.15:
+            text = rng.choice(GREETINGS)
+        elif roll < 0.25:
+            text = rng.choice(VERSE_ASKS).format(f"{rng.choice(TOPICS)} and {rng.choice(TOPICS)}")
+        else:
+            text = rng.choice(VERSE_ASKS).format(rng.choice(TOPICS))
+        metadata = {}
+        translation = rng.choice(TRANSLATIONS)
+        if translation:
+            metadata["translation"] = translation
+        if rng.random() < 0.2:
+            metadata["responseProfile"] = "compact"
+        message = _message(text, message_id=f"soak-{seed}-{n}", contextId=context_id, metadata=metadata or None)
+        if rng.random() < 0.2:
+            history = [
+                _message(rng.choice(GREETINGS), role=rng.choice(["user", "agent"]), message_id=f"soak-{seed}-{n}-h{i}")
+                for i in range(rng.randint(1, 8))
+            ]
+            body = {"jsonrpc": "2.0", "id": f"req-{n}", "method": "execute",
+                    "params": {"contextId": context_id, "taskId": f"task-{n}", "messages": history + [message]}}
+        else:
+            body = {"jsonrpc": "2.0", "id": f"req-{n}", "method": "message/send", "params": {"message": message}}
+        recent.append(body)
+        if len(recent) > 100:
+            recent.pop(0)
+        yield body
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource  # Peak rather than current RSS, where /proc is unavailable
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def growth_per_10k(points: List[tuple]) -> float:
+    """Least-squares slope of (requests, bytes) points, in bytes per 10k requests"""
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    var = sum((x - mean_x) ** 2 for x, _ in points)
+    if not var:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / var * 10_000
+
+def type_counts() -> Counter:
+    return Counter(type(obj).__qualname__ for obj in gc.get_objects())
+
+@asynccontextmanager
+async def running_app(upstreams: FakeUpstreams, workdir: str):
+    """The app with its upstreams, stores and LLM pointed at the fakes, inside its lifespan"""
+    import main
+    import scheduler as jobs
+    from core import clients, llm
+    from core.job_store import JobRunLog
+    from core.ratelimit import RateLimiter, Tier
+
+    with ExitStack() as stack:
+        labs = f"{upstreams.url}/labs"
+        for target, value in [
+            ("core.bible_api.BIBLE_API_BASE_URL", labs),
+            ("core.clients.BIBLE_API_BASE_URL", labs),
+            ("core.health.BIBLE_API_BASE_URL", labs),
+            ("core.bible_api.BIBLE_API_COM_URL", f"{upstreams.url}/bible-api"),
+            ("core.llm.router", llm.ProviderRouter([
+                llm.OpenAICompatibleProvider("local", "soak-llm", base_url=f"{upstreams.url}/v1")
+            ])),
+            ("main.check_gemini", lambda: {"model": "soak-llm"}),
+            ("main.WARMUP_ON_STARTUP", False),  # Clients are built by the first requests, as in a cold start
+            # Generous limits, so the limiter keeps per-caller state without refusing traffic
+            ("main.rate_limiter", RateLimiter(tiers={"default": Tier("default", 1e9, 10 ** 9)}, api_key_tiers={})),
+            ("main.capture", None),
+            ("main.jobs.setup_scheduler", partial(jobs.setup_scheduler, db_path=os.path.join(workdir, "scheduler.sqlite"))),
+            ("scheduler.run_log", JobRunLog(os.path.join(workdir, "scheduler.sqlite"))),
+            ("scheduler.TELEX_BASE_URL", f"{upstreams.url}/telex"),
+            ("scheduler.TELEX_WEBHOOK_HOOK_ID", "soak"),
+            ("scheduler.TELEX_BEARER_TOKEN", "soak"),
+        ]:
+            stack.enter_context(patch(target, value))
+        clients.reset_clients()
+        async with main.app.router.lifespan_context(main.app):
+            yield main.app
+
+async def soak(requests: int = 50_000, seed: int = 0, concurrency: int = 8, contexts: int = 1000,
+               sample_every: int = 2_000, warmup: float = 0.5, job_every: int = 5_000, frames: int = 8,
+               latency: float = 0.0, rate: float = 5.0, top: int = 15, log=None, trace: bool = False) -> dict:
+    """
+    Run the soak and return its report: the samples, growth per 10k requests after
+    warm-up and the top growing object types (and, when `trace`d, allocation sites).
+    """
+    import scheduler as jobs
+
+    log = log or (lambda line: None)
+    bodies = traffic(seed, contexts)
+    statuses: Counter = Counter()
+    samples: List[dict] = []
+    baseline = baseline_types = baseline_at = None
+    warmup_at = int(requests * warmup)
+    if trace:
+        tracemalloc.start(frames)  # From the start, so memory freed after warm-up is netted out
+    started = time.perf_counter()
+    try:
+        with tempfile.TemporaryDirectory(prefix="soak-") as workdir, FakeUpstreams(latency) as upstreams:
+            async with running_app(upstreams, workdir) as app:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://soak", timeout=60) as client:
+                    async def send(body: dict):
+                        response = await client.post("/a2a", json=body)
+                        statuses[response.status_code] += 1
+
+                    sent = 0
+                    while sent < requests:
+                        batch = min(concurrency, requests - sent)
+                        await asyncio.gather(*(send(next(bodies)) for _ in range(batch)))
+                        before, sent = sent, sent + batch
+                        if job_every and sent // job_every > before // job_every:
+                            await jobs.daily_verse_job(trigger="manual")
+                        if sent // sample_every > before // sample_every or sent == requests:
+                            gc.collect()
+                            sample = {"requests": sent, "rss": rss_bytes(), "blocks": sys.getallocatedblocks(),
+                                      "elapsed_s": round(time.perf_counter() - started, 1)}
+                            if trace:
+                                sample["traced"] = tracemalloc.get_traced_memory()[0]
+                            samples.append(sample)
+                            traced = f"traced {sample['traced'] / 2**20:8.1f} MiB  " if trace else ""
+                            log(f"{sent:>9} requests  rss {sample['rss'] / 2**20:8.1f} MiB  "
+                                f"blocks {sample['blocks']:>10}  {traced}{sample['elapsed_s']:>8.1f}s")
+                            if baseline_at is None and sent >= warmup_at:
+                                baseline = tracemalloc.take_snapshot() if trace else None
+                                baseline_types, baseline_at = type_counts(), sent
+                    gc.collect()
+                    final = tracemalloc.take_snapshot() if trace else None
+                    final_types = type_counts()
+                    upstream_calls = upstreams.calls()
+    finally:
+        if trace:
+            tracemalloc.stop()
+
+    # Taking the baseline snapshot raises RSS once, so the fit starts after it
+    steady = [s for s in samples if baseline_at is not None and s["requests"] > baseline_at]
+    rss_growth = growth_per_10k([(s["requests"], s["rss"]) for s in steady]) / 1024
+    growth = {"rss": round(rss_growth, 1), "blocks": round(growth_per_10k([(s["requests"], s["blocks"]) for s in steady]))}
+    if trace:
+        growth["traced"] = round(growth_per_10k([(s["requests"], s["traced"]) for s in steady]) / 1024, 1)
+    sites = []
+    if baseline is not None:
+        # linecache fills when the loop monitor reports the snapshots themselves as blocking
+        noise = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, linecache.__file__)]
+        for diff in final.filter_traces(noise).compare_to(baseline.filter_traces(noise), "traceback")[:top]:
+            if diff.size_diff <= 0:
+                break
+            sites.append({
+                "size_diff_kib": round(diff.size_diff / 1024, 1),
+                "count_diff": diff.count_diff,
+                "traceback": [f"{frame.filename}:{frame.lineno}" for frame in diff.traceback][:4],
+            })
+    types = (final_types - baseline_types).most_common(top) if baseline_types is not None else []
+    return {
+        "config": {"requests": requests, "seed": seed, "concurrency": concurrency, "contexts": contexts,
+                   "sample_every": sample_every, "warmup": warmup, "job_every": job_every, "latency": latency,
+                   "trace": trace},
+        "simulated_hours": round(requests / rate / 3600, 1) if rate else None,
+        "elapsed_s": round(time.perf_counter() - started, 1),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "upstream_calls": upstream_calls,
+        "samples": samples,
+        "baseline_at": baseline_at,
+        "growth_per_10k": growth,
+        "top_sites": sites,
+        "top_types": [{"type": name, "count_diff": count} for name, count in types],
+    }
+
+def verdict(report: dict, max_traced_kib: float = MAX_TRACED_KIB, max_rss_kib: float = MAX_RSS_KIB,
+            max_blocks: float = MAX_BLOCKS) -> List[str]:
+    """Failures of a soak report against the growth thresholds (empty when it passes)"""
+    growth = report["growth_per_10k"]
+    failures = []
+    baseline_at = report["baseline_at"]
+    steady = [s for s in report["samples"] if baseline_at is not None and s["requests"] > baseline_at]
+    if len(steady) < 3:
+        failures.append(f"only {len(steady)} samples after warm-up; lower --sample-every or --warmup")
+    if growth.get("traced", 0) > max_traced_kib:
+        failures.append(f"traced memory grew {growth['traced']} KiB per 10k requests (max {max_traced_kib})")
+    if growth["rss"] > max_rss_kib:
+        failures.append(f"RSS grew {growth['rss']} KiB per 10k requests (max {max_rss_kib})")
+    if growth["blocks"] > max_blocks:
+        failures.append(f"Python heap grew {growth['blocks']} blocks per 10k requests (max {max_blocks})")
+    errors = sum(count for status, count in report["statuses"].items() if int(status) >= 500)
+    if errors:
+        failures.append(f"{errors} requests failed with 5xx")
+    return failures
+
+def cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--contexts", type=int, default=1000, help="Distinct contextIds (channels) in the mix")
+    parser.add_argument("--sample-every", type=int, default=2_000)
+    parser.add_argument("--warmup", type=float, default=0.5, help="Fraction of the run left out of the growth fit")
+    parser.add_argument("--job-every", type=int, default=5_000, help="Run the daily post every N requests (0: never)")
+    parser.add_argument("--trace", action="store_true", help="Run under tracemalloc to fit traced memory and list "
+                        "the allocation sites that grew (several times slower)")
+    parser.add_argument("--frames", type=int, default=8, help="Traceback depth recorded by tracemalloc")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to each fake upstream response")
+    parser.add_argument("--rate", type=float, default=5.0, help="Production requests/s, for the simulated hours")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--max-traced-kib", type=float, default=MAX_TRACED_KIB)
+    parser.add_argument("--max-rss-kib", type=float, default=MAX_RSS_KIB)
+    parser.add_argument("--max-blocks", type=float, default=MAX_BLOCKS)
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")  # Read when the app is imported; request logs would dominate the run
+    report = asyncio.run(soak(
+        args.requests, args.seed, args.concurrency, args.contexts, args.sample_every, args.warmup, args.job_every,
+        args.frames, args.latency, args.rate, args.top, log=lambda line: print(line, file=sys.stderr), trace=args.trace
+    ))
+    failures = verdict(report, args.max_traced_kib, args.max_rss_kib, args.max_blocks)
+    report["failures"] = failures
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        growth = report["growth_per_10k"]
+        print(f"{report['config']['requests']} requests (~{report['simulated_hours']}h at {args.rate}/s) "
+              f"in {report['elapsed_s']}s, seed {args.seed}; statuses {report['statuses']}")
+        traced = f"traced {growth['traced']} KiB, " if args.trace else ""
+        print(f"Growth per 10k requests after warm-up: {traced}RSS {growth['rss']} KiB, heap {growth['blocks']} blocks")
+        if args.trace:
+            print("\nTop growing allocation sites:")
+            for site in report["top_sites"]:
+                print(f"  {site['size_diff_kib']:>9.1f} KiB {site['count_diff']:>+8}  {site['traceback'][0]}")
+                for frame in site["traceback"][1:]:
+                    print(f"  {'':>19}  {frame}")
+        print("\nTop growing object types:")
+        for row in report["top_types"]:
+            print(f"  {row['count_diff']:>+8}  {row['type']}")
+        print("\n" + ("FAIL: " + "; ".join(failures) if failures else "PASS"))
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(cli())
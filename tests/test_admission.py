@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from core.admission import AdmissionController, ServerBusy
+
+async def hold(controller, seconds, events=None):
+    async with controller.admit():
+        if events is not None:
+            events.append("admitted")
+        await asyncio.sleep(seconds)
+
+@pytest.mark.asyncio
+async def test_admits_up_to_concurrency_then_queues():
+    controller = AdmissionController(max_concurrency=2, max_queue=2, deadline=5)
+    events = []
+    tasks = [asyncio.create_task(hold(controller, 0.05, events)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+
+    assert controller.active == 2
+    assert controller.queued == 1
+    await asyncio.gather(*tasks)
+    assert events == ["admitted"] * 3
+    assert controller.active == 0
+    assert len(controller.service_time) == 3
+
+@pytest.mark.asyncio
+async def test_rejects_when_queue_full():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, deadline=5)
+    tasks = [asyncio.create_task(hold(controller, 0.1)) for _ in range(2)]
+    await asyncio.sleep(0.01)
+
+    with pytest.raises(ServerBusy) as excinfo:
+        async with controller.admit():
+            pass
+    assert excinfo.value.reason == "queue_full"
+    assert excinfo.value.retry_after >= 1
+    await asyncio.gather(*tasks)
+
+@pytest.mark.asyncio
+async def test_rejects_when_estimated_wait_exceeds_deadline():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, deadline=2)
+    for _ in range(5):
+        controller.service_time.observe(3.0)  # Recent requests took 3s each
+    task = asyncio.create_task(hold(controller, 0.1))
+    await asyncio.sleep(0.01)
+
+    assert controller.estimate_wait() == 3.0
+    with pytest.raises(ServerBusy) as excinfo:
+        async with controller.admit():
+            pass
+    assert excinfo.value.reason == "deadline"
+    assert excinfo.value.retry_after == 3
+    await task
@@ -1,10 +1,13 @@
 import pytest
-from unittest.mock import patch, MagicMock
-from ai_service import extract_topic, generate_reflection, process_verse_request
+from unittest.mock import patch, MagicMock, AsyncMock
+import asyncio
+import time
+from core.ai_service import extract_topic, generate_reflection, split_topics, process_verse_requests
 from core.models import VerseResult
 
-@patch('ai_service.model.generate_content')
-def test_extract_topic(mock_generate):
+@patch('core.llm.get_model')
+def test_extract_topic(mock_get_model):
+    mock_generate = mock_get_model.return_value.generate_content
     mock_response = MagicMock()
     mock_response.text = "love"
     mock_generate.return_value = mock_response
@@ -13,8 +16,9 @@ def test_extract_topic(mock_generate):
     assert topic == "love"
     mock_generate.assert_called_once()
 
-@patch('ai_service.model.generate_content')
-def test_generate_reflection(mock_generate):
+@patch('core.llm.get_model')
+def test_generate_reflection(mock_get_model):
+    mock_generate = mock_get_model.return_value.generate_content
     mock_response = MagicMock()
     mock_response.text = "This verse emphasizes the importance of love."
     mock_generate.return_value = mock_response
@@ -23,35 +27,102 @@ def test_generate_reflection(mock_generate):
     assert reflection == "This verse emphasizes the importance of love."
     mock_generate.assert_called_once()
 
-@patch('ai_service.extract_topic')
-@patch('ai_service.generate_reflection')
-@patch('ai_service.get_verse_by_topic')
-def test_process_verse_request(mock_get_verse, mock_gen_reflect, mock_extract):
+@patch('core.ai_service.extract_topic')
+@patch('core.ai_service.generate_reflection')
+@patch('core.bible_api.hedged_fetch_passage')
+@patch('core.ai_service.generate_verse_reference')
+def test_process_verse_requests_runs_the_topic_pipeline(mock_reference, mock_fetch, mock_gen_reflect, mock_extract):
+    from core.translations import PassageCache
+    from core.verse_pipeline import build_topic_pipeline
     mock_extract.return_value = "love"
-    mock_verse = VerseResult(
-        topic="love",
-        verse_reference="1 John 4:8",
-        verse_text="Whoever does not love does not know God, because God is love.",
-        timestamp=1735148400.0
-    )
-    mock_get_verse.return_value = mock_verse
+    mock_reference.return_value = "1 John 4:8"
+    mock_fetch.return_value = ("1 John 4:8", "Whoever does not love does not know God, because God is love.")
     mock_gen_reflect.return_value = "Reflection text."
 
-    result = process_verse_request("Get a verse on love")
+    with patch('core.verse_pipeline.TOPIC_PIPELINE', build_topic_pipeline(speculative=False)), \
+         patch('core.bible_api.passage_cache', PassageCache(ttl=60)):
+        results = asyncio.run(process_verse_requests("Get a verse on love"))
 
-    assert result.topic == "love"
-    assert result.verse_reference == "1 John 4:8"
-    assert result.reflection == "Reflection text."
+    assert len(results) == 1
+    assert results[0].topic == "love"
+    assert results[0].verse_reference == "1 John 4:8"
+    assert results[0].reflection == "Reflection text."
     mock_extract.assert_called_once_with("Get a verse on love")
-    mock_get_verse.assert_called_once_with("love")
+    mock_reference.assert_called_once_with("love")
     mock_gen_reflect.assert_called_once_with("Whoever does not love does not know God, because God is love.", "love")
 
-@patch('ai_service.model.generate_content', side_effect=Exception("API error"))
-def test_extract_topic_failure(mock_generate):
+@patch('core.llm.get_model')
+def test_extract_topic_failure(mock_get_model):
+    mock_get_model.return_value.generate_content.side_effect = Exception("API error")
     with pytest.raises(Exception):
         extract_topic("love")
 
-@patch('ai_service.model.generate_content', side_effect=Exception("API error"))
-def test_generate_reflection_failure(mock_generate):
-    with pytest.raises(Exception):
-        generate_reflection("text", "topic")
+@patch('core.llm.get_model')
+def test_generate_reflection_failure(mock_get_model):
+    mock_get_model.return_value.generate_content.side_effect = Exception("API error")
+    reflection = generate_reflection("text", "topic")
+    assert reflection == "This verse speaks to the importance of topic in our spiritual journey."
+
+def test_split_topics():
+    assert split_topics("love") == ["love"]
+    assert split_topics("Love, hope ,love, ") == ["Love", "hope"]
+    assert split_topics("Love, God's love, hoping") == ["Love", "hoping"]
+
+@patch('core.ai_service.extract_topic')
+@patch('core.ai_service.run_topic_pipeline', new_callable=AsyncMock)
+def test_process_verse_requests_runs_topics_concurrently(mock_run_topic, mock_extract):
+    mock_extract.return_value = "love, hope, faith"
+
+    async def slow_topic(topic):
+        await asyncio.sleep(0.2)
+        return VerseResult(topic=topic, verse_reference="John 3:16", verse_text="text")
+
+    mock_run_topic.side_effect = slow_topic
+
+    start = time.perf_counter()
+    results = asyncio.run(process_verse_requests("verses on love and hope and faith"))
+    elapsed = time.perf_counter() - start
+
+    assert [r.topic for r in results] == ["love", "hope", "faith"]
+    assert elapsed < 0.5  # Close to the slowest topic, not the sum (0.6s)
+
+@patch('core.ai_service.extract_topic')
+@patch('core.ai_service.run_topic_pipeline', new_callable=AsyncMock)
+def test_process_verse_requests_keeps_partial_results(mock_run_topic, mock_extract):
+    mock_extract.return_value = "love, hope"
+    mock_run_topic.side_effect = [
+        VerseResult(topic="love", verse_reference="1 John 4:8", verse_text="God is love."),
+        Exception("Bible API down")
+    ]
+
+    results = asyncio.run(process_verse_requests("love and hope"))
+
+    assert [r.topic for r in results] == ["love"]
+
+@patch('core.ai_service.extract_topic')
+def test_process_verse_requests_chat(mock_extract):
+    mock_extract.return_value = "__NO_VERSE__"
+
+    assert asyncio.run(process_verse_requests("hello")) == []
+
+@patch('core.llm.get_model')
+def test_generate_records_token_usage(mock_get_model):
+    from types import SimpleNamespace
+    from core.token_accounting import TokenLedger
+    mock_get_model.return_value.generate_content.return_value = SimpleNamespace(
+        text=" love ",
+        usage_metadata=SimpleNamespace(prompt_token_count=40, candidates_token_count=1, total_token_count=41)
+    )
+    ledger = TokenLedger(budget=0, overrides={})
+    with patch('core.ai_service.ledger', ledger):
+        assert extract_topic("verse on love") == "love"
+
+    assert ledger.summary()["stages"]["intent"] == {"calls": 1, "prompt": 40, "output": 1, "total": 41}
+
+@patch('core.llm.get_model')
+@patch('core.ai_service.degraded', return_value=True)
+def test_over_budget_skips_reflection_and_chat_calls(mock_degraded, mock_get_model):
+    from core.ai_service import generate_chat_reply, CASUAL_CHAT_FALLBACK
+    assert generate_reflection("God is love.", "love") == "This verse speaks to the importance of love in our spiritual journey."
+    assert generate_chat_reply("hi") == CASUAL_CHAT_FALLBACK
+    mock_get_model.return_value.generate_content.assert_not_called()
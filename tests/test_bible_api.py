@@ -1,10 +1,21 @@
+import asyncio
 import pytest
+from datetime import date
 from unittest.mock import patch, MagicMock
-from core.bible_api import get_verse_by_topic, get_daily_verse
+from core.bible_api import get_daily_verse, parse_passage
+from core.translations import PassageCache
 
-@patch('core.bible_api.requests.get')
-@patch('core.bible_api.generate_verse_reference')
-def test_get_verse_by_topic_success(mock_generate, mock_get):
+def run_topic(topic, speculative=False):
+    """Run the topic pipeline with fresh reference and passage caches"""
+    from core.verse_pipeline import build_topic_pipeline, run_topic as run
+    with patch('core.verse_pipeline.TOPIC_PIPELINE', build_topic_pipeline(speculative=speculative)), \
+         patch('core.bible_api.passage_cache', PassageCache(ttl=60)), \
+         patch('core.ai_service.generate_reflection', return_value="Reflection."):
+        return asyncio.run(run(topic))
+
+@patch('core.bible_api.get_http_session')
+@patch('core.ai_service.generate_verse_reference')
+def test_run_topic_success(mock_generate, mock_session):
     mock_generate.return_value = "John 3:16"
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -14,18 +25,18 @@ def test_get_verse_by_topic_success(mock_generate, mock_get):
         "verse": 16,
         "text": "For God so loved the world..."
     }]
-    mock_get.return_value = mock_response
+    mock_session.return_value.get.return_value = mock_response
 
-    result = get_verse_by_topic("love")
+    result = run_topic("love")
 
     assert result.topic == "love"
     assert result.verse_reference == "John 3:16"
     assert result.verse_text == "For God so loved the world..."
-    assert result.reflection is None
+    assert result.reflection == "Reflection."
 
-@patch('core.bible_api.requests.get')
-@patch('core.bible_api.generate_verse_reference')
-def test_get_verse_by_topic_fallback(mock_generate, mock_get):
+@patch('core.bible_api.get_http_session')
+@patch('core.ai_service.generate_verse_reference')
+def test_run_topic_fallback(mock_generate, mock_session):
     mock_generate.side_effect = Exception("AI failed")
     mock_response = MagicMock()
     mock_response.status_code = 200
@@ -35,33 +46,210 @@ def test_get_verse_by_topic_fallback(mock_generate, mock_get):
         "verse": 1,
         "text": "In the beginning..."
     }]
-    mock_get.return_value = mock_response
+    mock_session.return_value.get.return_value = mock_response
 
-    result = get_verse_by_topic("creation")
+    result = run_topic("creation")
 
     assert result.topic == "creation"
     assert result.verse_reference == "Genesis 1:1"
     assert result.verse_text == "In the beginning..."
-    assert result.reflection is None
+
+@patch('core.bible_api.get_http_session')
+@patch('core.ai_service.generate_verse_reference')
+def test_run_topic_passage(mock_generate, mock_session):
+    mock_generate.return_value = "John 3:16-17"
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = [
+        {"bookname": "John", "chapter": "3", "verse": "16", "text": "For God so loved the world..."},
+        {"bookname": "John", "chapter": "3", "verse": "17", "text": "For God did not send his Son..."}
+    ]
+    mock_session.return_value.get.return_value = mock_response
+
+    result = run_topic("love")
+
+    assert result.verse_reference == "John 3:16-17"
+    assert result.verse_text == "For God so loved the world... For God did not send his Son..."
+
+def test_parse_passage_across_chapters():
+    reference, text = parse_passage([
+        {"bookname": "John", "chapter": "3", "verse": "36", "text": "Whoever believes..."},
+        {"bookname": "John", "chapter": "4", "verse": "1", "text": "Now Jesus learned..."}
+    ])
+
+    assert reference == "John 3:36-4:1"
+    assert text == "Whoever believes... Now Jesus learned..."
 
 @patch('core.bible_api.get_random_verse')
-@patch('core.bible_api.generate_verse_reference')
-def test_get_verse_by_topic_api_failure(mock_generate, mock_get_random):
+@patch('core.bible_api.get_http_session')
+@patch('core.ai_service.generate_verse_reference')
+def test_run_topic_api_failure(mock_generate, mock_session, mock_get_random):
+    from core.models import VerseResult
     mock_generate.return_value = "Invalid Reference"
-    mock_response = MagicMock()
-    mock_response.status_code = 404
-    mock_get_random.return_value = MagicMock()
+    mock_session.return_value.get.return_value.status_code = 404
+    mock_get_random.return_value = VerseResult(topic="love", verse_reference="1 John 4:8", verse_text="God is love.")
 
-    result = get_verse_by_topic("love")
+    result = run_topic("love")
 
+    assert result.verse_reference == "1 John 4:8"
     mock_get_random.assert_called_once_with("love")
 
-@patch('core.bible_api.get_verse_by_topic')
-def test_get_daily_verse(mock_get_verse):
-    mock_verse = MagicMock()
-    mock_get_verse.return_value = mock_verse
+@patch('core.bible_api.get_random_verse')
+@patch('core.bible_api.get_passage')
+def test_get_daily_verse(mock_passage, mock_random):
+    from core.reading_plan import build_plan
+    plan = build_plan(2026)
+    entry = plan.day(date(2026, 12, 25))
+    mock_passage.return_value = (entry.reference, "Planned text")
+
+    with patch('core.bible_api.get_plan', return_value=plan):
+        result = get_daily_verse(date(2026, 12, 25))
+        assert result.verse_reference == entry.reference
+        assert result.verse_text == "Planned text"
+        assert result.topic == entry.topic
+        mock_random.assert_not_called()
+
+        # Prefetched plans need no lookup at all
+        mock_passage.reset_mock()
+        plan.texts = ["Stored text"] * len(plan.references)
+        plan.translation = "NET"
+        assert get_daily_verse(date(2026, 12, 25)).verse_text == "Stored text"
+        mock_passage.assert_not_called()
+
+        # A random verse only when the planned one can't be fetched
+        plan.texts = [None] * len(plan.references)
+        mock_passage.return_value = None
+        assert get_daily_verse(date(2026, 12, 25)) == mock_random.return_value
+        mock_random.assert_called_once_with(entry.topic)
+
+def passage_response(reference_row):
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = [reference_row]
+    return response
+
+@patch('core.bible_api.hedge_delay', return_value=0.05)
+@patch('core.bible_api.get_http_session')
+def test_hedged_fetch_sends_duplicate_when_slow(mock_session, mock_delay):
+    import time
+    from core.bible_api import hedged_fetch_passage, HEDGE_OUTCOMES, WASTED_CALLS
+    calls = []
+
+    def get(url, timeout):
+        calls.append(url)
+        if len(calls) == 1:
+            time.sleep(0.3)  # Primary is stuck
+        return passage_response({"bookname": "John", "chapter": 3, "verse": 16, "text": "For God so loved..."})
+
+    mock_session.return_value.get.side_effect = get
+    wins_before = HEDGE_OUTCOMES.value(outcome="hedge_win")
+    wasted_before = WASTED_CALLS.value(kind="hedge")
+
+    start = time.perf_counter()
+    result = hedged_fetch_passage("John 3:16")
+
+    assert time.perf_counter() - start < 0.25
+    assert result == ("John 3:16", "For God so loved...")
+    assert len(calls) == 2
+    assert HEDGE_OUTCOMES.value(outcome="hedge_win") == wins_before + 1
+    assert WASTED_CALLS.value(kind="hedge") == wasted_before + 1
+
+@patch('core.bible_api.hedge_delay', return_value=0.05)
+@patch('core.bible_api.get_http_session')
+def test_hedged_fetch_waits_for_hedge_when_primary_fails(mock_session, mock_delay):
+    import time
+    from core.bible_api import hedged_fetch_passage, HEDGE_OUTCOMES, WASTED_CALLS
+    calls = []
+
+    def get(url, timeout):
+        calls.append(url)
+        if len(calls) == 1:
+            time.sleep(0.1)
+            return MagicMock(status_code=503)  # Fails while the hedge is still in flight
+        time.sleep(0.2)
+        return passage_response({"bookname": "John", "chapter": 3, "verse": 16, "text": "For God so loved..."})
+
+    mock_session.return_value.get.side_effect = get
+    wins_before = HEDGE_OUTCOMES.value(outcome="hedge_win")
+    wasted_before = WASTED_CALLS.value(kind="hedge")
+
+    assert hedged_fetch_passage("John 3:16") == ("John 3:16", "For God so loved...")
+    assert HEDGE_OUTCOMES.value(outcome="hedge_win") == wins_before + 1
+    assert WASTED_CALLS.value(kind="hedge") == wasted_before  # The failed primary wasn't wasted
+
+@patch('core.bible_api.get_http_session')
+def test_fetch_passage_raises_on_server_errors_only(mock_session):
+    from core.bible_api import fetch_passage, UpstreamError
+    mock_session.return_value.get.return_value = MagicMock(status_code=429)
+    with pytest.raises(UpstreamError):
+        fetch_passage("John 3:16")
+
+    mock_session.return_value.get.return_value = MagicMock(status_code=404)
+    assert fetch_passage("Nowhere 1:1") is None
+
+@patch('core.bible_api.hedge_delay', return_value=1.0)
+@patch('core.bible_api.get_http_session')
+def test_hedged_fetch_no_duplicate_when_fast(mock_session, mock_delay):
+    from core.bible_api import hedged_fetch_passage
+    mock_session.return_value.get.return_value = passage_response(
+        {"bookname": "John", "chapter": 3, "verse": 16, "text": "For God so loved..."}
+    )
+
+    assert hedged_fetch_passage("John 3:16") == ("John 3:16", "For God so loved...")
+    assert mock_session.return_value.get.call_count == 1
+
+def test_hedge_delay_follows_percentile():
+    from core.bible_api import hedge_delay, BIBLE_API_LATENCY
+    from core.metrics import RollingLatency
+    latency = RollingLatency()
+    with patch('core.bible_api.BIBLE_API_LATENCY', latency):
+        assert hedge_delay() == 1.0  # Initial delay until enough samples
+        for _ in range(100):
+            latency.observe(0.5)
+        assert hedge_delay() == 0.5
+
+@patch('core.bible_api.get_random_verse')
+@patch('core.ai_service.generate_verse_reference')
+def test_speculative_fallback_runs_alongside_reference(mock_generate, mock_get_random):
+    import time
+    from core.bible_api import SPECULATIVE_OUTCOMES
+    from core.models import VerseResult
+
+    def slow_reference(topic):
+        time.sleep(0.2)
+        raise Exception("AI failed")
+
+    def slow_random(topic):
+        time.sleep(0.2)
+        return VerseResult(topic=topic, verse_reference="Genesis 1:1", verse_text="In the beginning...")
+
+    mock_generate.side_effect = slow_reference
+    mock_get_random.side_effect = slow_random
+    used_before = SPECULATIVE_OUTCOMES.value(outcome="used")
+
+    start = time.perf_counter()
+    result = run_topic("creation", speculative=True)
+
+    assert time.perf_counter() - start < 0.35  # Overlapped, not 0.4s serial
+    assert result.verse_reference == "Genesis 1:1"
+    mock_get_random.assert_called_once_with("creation")
+    assert SPECULATIVE_OUTCOMES.value(outcome="used") == used_before + 1
+
+@patch('core.bible_api.get_random_verse')
+@patch('core.ai_service.generate_verse_reference')
+def test_failed_speculative_fetch_is_counted_once(mock_generate, mock_get_random):
+    from core.bible_api import SPECULATIVE_OUTCOMES, WASTED_CALLS
+    from core.models import VerseResult
+    mock_generate.side_effect = Exception("AI failed")
+    mock_get_random.side_effect = [
+        Exception("labs.bible.org down"),
+        VerseResult(topic="creation", verse_reference="Genesis 1:1", verse_text="In the beginning..."),
+    ]
+    before = {outcome: SPECULATIVE_OUTCOMES.value(outcome=outcome) for outcome in ("used", "wasted", "failed")}
+    wasted_before = WASTED_CALLS.value(kind="speculative")
 
-    result = get_daily_verse()
+    assert run_topic("creation", speculative=True).verse_reference == "Genesis 1:1"
 
-    assert result == mock_verse
-    mock_get_verse.assert_called_once_with("daily")
+    after = {outcome: SPECULATIVE_OUTCOMES.value(outcome=outcome) for outcome in ("used", "wasted", "failed")}
+    assert {outcome: after[outcome] - before[outcome] for outcome in after} == {"used": 0, "wasted": 0, "failed": 1}
+    assert WASTED_CALLS.value(kind="speculative") == wasted_before
@@ -0,0 +1,31 @@
+import json
+import os
+from core.capture import TrafficCapture, sanitize
+
+def test_sanitize_redacts_credentials():
+    body = {
+        "params": {
+            "message": {"parts": [{"kind": "text", "text": "love"}]},
+            "configuration": {"pushNotificationConfig": {"url": "https://hook", "token": "secret-token"}}
+        }
+    }
+
+    clean = sanitize(body)
+
+    assert clean["params"]["configuration"]["pushNotificationConfig"]["token"] == "[REDACTED]"
+    assert clean["params"]["message"]["parts"][0]["text"] == "love"
+    assert body["params"]["configuration"]["pushNotificationConfig"]["token"] == "secret-token"
+
+def test_capture_writes_and_rotates(tmp_path):
+    capture = TrafficCapture(str(tmp_path), max_bytes=200, backup_count=2)
+    capture.start()
+    for i in range(10):
+        capture.record({"id": str(i), "method": "message/send"}, arrived_at=1000.0 + i, status=200, latency_ms=5.0)
+    capture.stop()
+
+    files = sorted(os.listdir(tmp_path))
+    assert files == ["a2a_capture.jsonl", "a2a_capture.jsonl.1", "a2a_capture.jsonl.2"]
+
+    with open(tmp_path / "a2a_capture.jsonl.1") as f:
+        record = json.loads(f.readline())
+    assert set(record) == {"ts", "status", "latency_ms", "body"}
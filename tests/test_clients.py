@@ -0,0 +1,65 @@
+import asyncio
+import sys
+from unittest.mock import patch, MagicMock, AsyncMock
+import core.clients as clients
+
+def test_http_session_is_shared():
+    clients.reset_clients()
+    try:
+        assert clients.get_http_session() is clients.get_http_session()
+    finally:
+        clients.reset_clients()
+
+def test_model_is_built_once():
+    clients.reset_clients()
+    fake_genai = MagicMock()
+    with patch.dict(sys.modules, {"google.generativeai": fake_genai}):
+        first = clients.get_model()
+        second = clients.get_model()
+
+    assert first is second
+    fake_genai.configure.assert_called_once()
+    fake_genai.GenerativeModel.assert_called_once()
+    clients.reset_clients()
+
+def test_warm_up_tolerates_failures():
+    from core.llm import ProviderRouter, GeminiProvider, StubProvider
+    with patch('core.llm.router', ProviderRouter([GeminiProvider(), StubProvider()])), \
+         patch('core.llm.get_model', side_effect=Exception("no key")), \
+         patch('core.clients._prime_http') as mock_prime, \
+         patch('core.bible_api.preload_translations', new_callable=AsyncMock) as mock_preload, \
+         patch('core.clients.logger') as mock_logger:
+        asyncio.run(clients.warm_up())
+
+    mock_prime.assert_called_once()
+    mock_preload.assert_awaited_once()
+    mock_logger.warning.assert_called_once()
+    message, *args = mock_logger.warning.call_args.args
+    assert message % tuple(args) == "Warm-up step 'gemini' failed: no key"
+
+def test_warm_up_builds_only_configured_providers():
+    from core.llm import ProviderRouter, OpenAICompatibleProvider, StubProvider
+    local = OpenAICompatibleProvider("local", "llama", "http://localhost:8080/v1")
+    with patch('core.llm.router', ProviderRouter([local, StubProvider()])), \
+         patch('core.llm.get_model') as mock_get_model, \
+         patch('core.clients._prime_http'), \
+         patch('core.bible_api.preload_translations', new_callable=AsyncMock), \
+         patch('core.clients.logger') as mock_logger:
+        asyncio.run(clients.warm_up())
+
+    mock_get_model.assert_not_called()  # Gemini isn't configured
+    assert local._client is not None
+    mock_logger.warning.assert_not_called()
+
+def test_models_are_cached_per_name():
+    clients.reset_clients()
+    fake_genai = MagicMock()
+    fake_genai.GenerativeModel.side_effect = lambda name: MagicMock(name=name)
+    with patch.dict(sys.modules, {"google.generativeai": fake_genai}):
+        default = clients.get_model()
+        lite = clients.get_model("gemini-2.5-flash-lite")
+
+    assert default is not lite
+    assert clients.get_model("gemini-2.5-flash-lite") is lite
+    fake_genai.configure.assert_called_once()
+    clients.reset_clients()
@@ -0,0 +1,57 @@
+import gzip
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from httpx import AsyncClient, ASGITransport
+from core.compression import CompressionMiddleware, choose_encoding
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100)
+
+    @app.get("/big")
+    async def big():
+        return PlainTextResponse("verse " * 200)
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            yield b"a" * 200
+            yield b"b" * 200
+        return StreamingResponse(chunks())
+
+    return app
+
+def test_choose_encoding():
+    with patch('core.compression.brotli', None):
+        assert choose_encoding("gzip, deflate, br") == "gzip"
+        assert choose_encoding("br") is None
+        assert choose_encoding("deflate, *") == "gzip"
+        assert choose_encoding("gzip;q=0, *") is None
+        assert choose_encoding("gzip;q=0") is None
+        assert choose_encoding("") is None
+    with patch('core.compression.brotli', object()):
+        assert choose_encoding("gzip, br") == "br"
+        assert choose_encoding("gzip, br;q=0") == "gzip"
+
+@pytest.mark.asyncio
+async def test_compresses_large_responses_only():
+    async with AsyncClient(transport=ASGITransport(app=make_app()), base_url="http://test") as client:
+        big = await client.get("/big", headers={"Accept-Encoding": "gzip"})
+        small = await client.get("/small", headers={"Accept-Encoding": "gzip"})
+        plain = await client.get("/big", headers={"Accept-Encoding": "identity"})
+        stream = await client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+    assert big.headers["content-encoding"] == "gzip"
+    assert big.headers["vary"] == "Accept-Encoding"
+    assert int(big.headers["content-length"]) < 1200
+    assert big.text == "verse " * 200  # httpx decodes transparently
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in plain.headers
+    assert "content-encoding" not in stream.headers
+    assert stream.text == "a" * 200 + "b" * 200
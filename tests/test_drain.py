@@ -0,0 +1,51 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from core.drain import DrainController
+
+@pytest.mark.asyncio
+async def test_wait_returns_once_work_in_flight_finishes():
+    drain = DrainController(grace_period=2, ready_delay=0)
+
+    async def job():
+        async with drain.track("job"):
+            await asyncio.sleep(0.05)
+
+    task = asyncio.create_task(job())
+    await asyncio.sleep(0)
+    assert drain.status()["in_flight"] == {"job": 1}
+
+    assert await drain.wait() is True
+    assert task.done()
+    assert drain.status()["in_flight"] == {}
+
+@pytest.mark.asyncio
+async def test_wait_gives_up_after_grace_period():
+    drain = DrainController(grace_period=0.05, ready_delay=0)
+    release = asyncio.Event()
+
+    async def stuck():
+        async with drain.track("request"):
+            await release.wait()
+
+    task = asyncio.create_task(stuck())
+    await asyncio.sleep(0)
+    assert await drain.wait() is False
+    release.set()
+    await task
+
+def test_keeps_accepting_during_ready_delay():
+    drain = DrainController(ready_delay=10)
+    assert drain.accepting() and not drain.draining
+
+    with patch('core.drain.time.monotonic', return_value=100.0):
+        drain.begin()
+    with patch('core.drain.time.monotonic', return_value=105.0):
+        assert drain.draining and drain.accepting()
+    with patch('core.drain.time.monotonic', return_value=111.0):
+        assert not drain.accepting()
+
+    drain.reset()
+    assert not drain.draining
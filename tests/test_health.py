@@ -0,0 +1,83 @@
+import asyncio
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from core.health import CircuitBreaker, DependencyProber, make_llm_check, make_scheduler_check
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+@pytest.mark.asyncio
+async def test_prober_caches_results():
+    calls = []
+
+    def healthy_check():
+        calls.append("ok")
+        return {"version": "1"}
+
+    def failing_check():
+        raise Exception("connection refused")
+
+    prober = DependencyProber()
+    prober.register("healthy_dep", healthy_check, interval=60)
+    prober.register("failing_dep", failing_check, interval=60, critical=False)
+
+    report = prober.report()
+    assert report["ready"] is False  # Nothing probed yet
+    assert report["dependencies"]["healthy_dep"]["healthy"] is None
+
+    prober.start()
+    await asyncio.sleep(0.05)
+
+    report = prober.report()
+    assert report["ready"] is True  # failing_dep is not critical
+    assert report["dependencies"]["healthy_dep"]["healthy"] is True
+    assert report["dependencies"]["healthy_dep"]["version"] == "1"
+    assert report["dependencies"]["failing_dep"]["error"] == "connection refused"
+    assert report["dependencies"]["failing_dep"]["latency_ms"] is not None
+
+    # Reading the report does not re-run checks
+    prober.report()
+    assert len(calls) == 1
+    await prober.stop()
+
+@pytest.mark.asyncio
+async def test_scheduler_check_reports_next_run():
+    scheduler = MagicMock()
+    scheduler.running = True
+    scheduler.get_job.return_value.next_run_time.isoformat.return_value = "2026-01-01T08:00:00+00:00"
+
+    details = await make_scheduler_check(scheduler)()
+    assert details == {"next_run_time": "2026-01-01T08:00:00+00:00"}
+
+    scheduler.running = False
+    with pytest.raises(Exception):
+        await make_scheduler_check(scheduler)()
+
+@pytest.mark.asyncio
+async def test_llm_check_passes_while_any_provider_is_healthy():
+    from core.llm import FakeProvider, ProviderRouter
+    down, up = FakeProvider("down", fail=True), FakeProvider("up")
+    router = ProviderRouter([down, up], explore_every=0)
+    router.generate("chat", "hi")
+    check = make_llm_check(router)
+
+    assert await check() == {"providers": {"down": False, "up": True}}
+
+    up.fail = True
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            router.generate("chat", "hi")
+    with pytest.raises(Exception, match="No healthy LLM provider"):
+        await check()
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+from starlette.responses import JSONResponse
+
+from core.idempotency import IdempotencyStore, REPLAY_HEADER
+
+def body(rpc_id="1", message_id="m-1"):
+    return {"jsonrpc": "2.0", "id": rpc_id, "method": "message/send",
+            "params": {"message": {"role": "user", "messageId": message_id, "parts": []}}}
+
+def test_key_for():
+    assert IdempotencyStore.key_for("ip:1", body()) == ("ip:1", "1", "m-1")
+    assert IdempotencyStore.key_for("ip:1", body(message_id=None)) is None
+    execute = {"id": 7, "params": {"messages": [{"messageId": "old"}, {"messageId": "new"}]}}
+    assert IdempotencyStore.key_for("ip:1", execute) == ("ip:1", "7", "new")
+    assert IdempotencyStore.key_for("ip:1", None) is None
+
+def test_concurrent_retries_join_the_running_request():
+    store = IdempotencyStore()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return JSONResponse({"result": len(calls)})
+
+    async def scenario():
+        key = ("ip:1", "1", "m-1")
+        first, retry = await asyncio.gather(store.run(key, compute), store.run(key, compute))
+        later = await store.run(key, compute)
+        return first, retry, later
+
+    first, retry, later = asyncio.run(scenario())
+
+    assert calls == [1]
+    assert first.body == retry.body == later.body
+    assert retry.headers[REPLAY_HEADER] == "true"
+    assert REPLAY_HEADER not in first.headers
+
+def test_failures_are_not_stored():
+    store = IdempotencyStore()
+    key = ("ip:1", "1", "m-1")
+
+    async def error_response():
+        return JSONResponse({"error": "busy"}, status_code=503)
+
+    async def failure():
+        raise RuntimeError("boom")
+
+    async def ok():
+        return JSONResponse({"result": "ok"})
+
+    async def scenario():
+        assert (await store.run(key, error_response)).status_code == 503
+        with pytest.raises(RuntimeError):
+            await store.run(key, failure)
+        return await store.run(key, ok)
+
+    assert asyncio.run(scenario()).status_code == 200
+    assert len(store) == 1
+
+def test_entries_expire():
+    store = IdempotencyStore(ttl=0.01)
+    key = ("ip:1", "1", "m-1")
+
+    async def compute():
+        return JSONResponse({"result": "ok"})
+
+    async def scenario():
+        await store.run(key, compute)
+        await asyncio.sleep(0.02)
+        return len(store)
+
+    assert asyncio.run(scenario()) == 0
@@ -0,0 +1,49 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from starlette.requests import Request
+
+from core.ingest import PayloadTooLarge, RawMessage, parse_rpc_request, read_body
+from core.models import A2AMessage
+
+def streaming_request(chunks, headers=()):
+    messages = [{"type": "http.request", "body": chunk, "more_body": i < len(chunks) - 1} for i, chunk in enumerate(chunks)]
+
+    async def receive():
+        return messages.pop(0)
+
+    return Request({"type": "http", "method": "POST", "headers": list(headers)}, receive)
+
+def test_read_body_limits_streamed_and_declared_sizes():
+    assert asyncio.run(read_body(streaming_request([b"ab", b"cd"]), limit=4)) == b"abcd"
+    with pytest.raises(PayloadTooLarge):
+        asyncio.run(read_body(streaming_request([b"ab", b"cd", b"e"]), limit=4))
+    with pytest.raises(PayloadTooLarge):
+        asyncio.run(read_body(streaming_request([b""], headers=[(b"content-length", b"5000")]), limit=4))
+
+def test_only_the_last_message_is_validated():
+    history = [{"role": "user", "parts": [{"kind": "data", "data": list(range(100))}]} for _ in range(500)]
+    body = {"jsonrpc": "2.0", "id": "1", "method": "execute",
+            "params": {"contextId": "ctx", "messages": history + [{"role": "user", "parts": [{"kind": "text", "text": "hope"}]}]}}
+
+    with patch.object(A2AMessage, "model_validate", wraps=A2AMessage.model_validate) as validate:
+        parsed = parse_rpc_request(body, max_history=10)
+
+    assert validate.call_count == 1
+    assert parsed.message.parts[0].text == "hope"
+    assert parsed.context_id == "ctx"
+    assert len(parsed.history) == 10 and all(isinstance(m, RawMessage) for m in parsed.history)
+    assert parsed.messages[-1] is parsed.message
+
+def test_invalid_requests_raise_value_errors():
+    with pytest.raises(ValueError):
+        parse_rpc_request({"jsonrpc": "2.0", "id": "1", "method": "message/send", "params": {}})
+    with pytest.raises(ValueError):
+        parse_rpc_request({"jsonrpc": "2.0", "id": "1", "method": "execute", "params": {"messages": []}})
+    with pytest.raises(ValueError):
+        parse_rpc_request({"jsonrpc": "2.0", "id": "1", "method": "message/send", "params": {"message": {"role": "x"}}})
+
+def test_raw_history_is_validated_when_echoed():
+    assert RawMessage({"role": "user", "parts": [{"kind": "text", "text": "hi"}]}).to_dict(exclude_none=True)["parts"] == [{"kind": "text", "text": "hi"}]
+    assert RawMessage({"role": "nobody"}).to_dict() is None
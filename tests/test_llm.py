@@ -0,0 +1,110 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+from core.llm import (
+    FakeProvider, GeminiProvider, ProviderRouter, StageSettings, StubProvider, load_stage_settings
+)
+
+def test_routes_to_fastest_healthy_provider():
+    slow, fast = FakeProvider("slow", latency=0.02), FakeProvider("fast")
+    router = ProviderRouter([slow, fast], explore_every=0)
+
+    router.generate("intent", "hi")  # Untried providers go first, in configured order
+    router.generate("intent", "hi")
+    for _ in range(5):
+        assert router.generate("intent", "hi").provider == "fast"
+
+    assert len(slow.calls) == 1
+    assert router.report()["fast"]["mean_latency_s"] < router.report()["slow"]["mean_latency_s"]
+
+def test_fails_over_and_skips_degraded_provider():
+    broken, backup = FakeProvider("broken", fail=True), FakeProvider("backup", reply={"intent": "love"})
+    router = ProviderRouter([broken, backup], explore_every=0)
+
+    for _ in range(5):
+        response = router.generate("intent", "verse on love")
+        assert (response.text, response.provider) == ("love", "backup")
+
+    assert len(broken.calls) == 1  # Error rate above the limit after its first failure
+    assert router.report()["broken"]["healthy"] is False
+    assert router.order()[-1] is broken  # Still tried as a last resort
+
+def test_failed_provider_is_probed_and_recovers():
+    flaky, backup = FakeProvider("flaky", fail=True), FakeProvider("backup", latency=0.002)
+    router = ProviderRouter([flaky, backup], explore_every=0, probe_interval=0.05)
+
+    for _ in range(30):
+        router.generate("intent", "hi")
+    assert router.report()["flaky"]["healthy"] is False
+
+    flaky.fail = False
+    time.sleep(0.06)
+    assert router.generate("intent", "hi").provider == "flaky"  # The probe goes first and succeeds
+    assert router.report()["flaky"]["error_rate"] == 0.0
+    assert router.report()["flaky"]["healthy"] is True
+
+    calls = [router.generate("intent", "hi").provider for _ in range(20)]
+    assert calls.count("flaky") == 20  # Fastest again
+
+def test_raises_when_every_provider_fails():
+    router = ProviderRouter([FakeProvider("a", fail=True), FakeProvider("b", fail=True)])
+
+    with pytest.raises(RuntimeError, match="b failed"):
+        router.generate("chat", "hi")
+
+def test_exploration_retries_least_recently_used_provider():
+    slow, fast = FakeProvider("slow", latency=0.01), FakeProvider("fast")
+    router = ProviderRouter([slow, fast], explore_every=5)
+
+    for _ in range(10):
+        router.generate("intent", "hi")
+
+    assert len(slow.calls) >= 2  # Sampled again despite being slower
+
+def test_ai_service_generate_uses_router():
+    from core.ai_service import extract_topic
+    from core.token_accounting import TokenLedger
+    ledger = TokenLedger(budget=0, overrides={})
+    router = ProviderRouter([FakeProvider("down", fail=True), StubProvider()])
+
+    with patch('core.llm.router', router), patch('core.ai_service.ledger', ledger):
+        assert extract_topic("I need hope") == "hope"
+
+    assert ledger.summary()["stages"]["intent"]["calls"] == 1
+
+def test_stage_settings_merge_over_defaults():
+    settings = load_stage_settings(
+        {"intent": {"max_output_tokens": 4}, "chat": {"model": "big", "stop": "END"}},
+        defaults={"intent": {"model": {"gemini": "small"}, "max_output_tokens": 16, "temperature": 0.0}, "chat": {}}
+    )
+
+    assert settings["intent"] == StageSettings(model={"gemini": "small"}, max_output_tokens=4, temperature=0.0)
+    assert settings["intent"].model_for("gemini") == "small"
+    assert settings["intent"].model_for("openai") is None
+    assert settings["chat"].model_for("openai") == "big"
+    assert settings["chat"].stop == ("END",)
+    with pytest.raises(ValueError):
+        load_stage_settings({"intent": {"max_tokens": 4}})
+
+def test_router_applies_each_stage_settings():
+    provider = FakeProvider(reply="hope, faith\nand an explanation nobody asked for")
+    router = ProviderRouter([provider], settings={"intent": StageSettings(max_output_tokens=1, stop=("\n",))})
+
+    assert router.generate("intent", "hi").text == "hope,"
+    assert router.generate("chat", "hi").text.endswith("nobody asked for")
+    assert provider.calls[1][2] == StageSettings()
+
+def test_gemini_provider_uses_stage_model_and_generation_config():
+    settings = StageSettings(model={"gemini": "gemini-2.5-flash-lite"}, max_output_tokens=16, temperature=0.0, stop=("\n",))
+    with patch('core.llm.get_model') as mock_get_model:
+        mock_get_model.return_value.generate_content.return_value = SimpleNamespace(text="love", usage_metadata=None)
+        response = GeminiProvider("gemini-2.5-flash").generate("intent", "prompt", settings)
+
+    mock_get_model.assert_called_once_with("gemini-2.5-flash-lite")
+    mock_get_model.return_value.generate_content.assert_called_once_with(
+        "prompt", generation_config={"max_output_tokens": 16, "temperature": 0.0, "stop_sequences": ["\n"]}
+    )
+    assert response.model == "gemini-2.5-flash-lite"
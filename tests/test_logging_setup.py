@@ -0,0 +1,67 @@
+import io
+import json
+import logging
+import threading
+from unittest.mock import patch
+
+from core.logging_setup import configure_logging, stop_logging, Redacted, SamplingFilter
+from core.request_context import task_id_var, context_id_var
+
+def capture_logs(**kwargs) -> io.StringIO:
+    stream = io.StringIO()
+    configure_logging(stream=stream, **kwargs)
+    return stream
+
+def test_json_records_carry_request_context():
+    stream = capture_logs(fmt="json")
+    task_token, context_token = task_id_var.set("task-1"), context_id_var.set("ctx-1")
+    try:
+        logging.getLogger("test.context").info("Processing %s", "hope", extra={"stage": "intent"})
+    finally:
+        task_id_var.reset(task_token)
+        context_id_var.reset(context_token)
+        stop_logging()
+
+    entry = json.loads(stream.getvalue().splitlines()[-1])
+    assert entry["message"] == "Processing hope"
+    assert entry["taskId"] == "task-1" and entry["contextId"] == "ctx-1"
+    assert entry["stage"] == "intent"
+    assert entry["level"] == "INFO"
+
+def test_messages_are_formatted_off_the_calling_thread():
+    formatted_on = []
+
+    class Probe:
+        def __str__(self):
+            formatted_on.append(threading.current_thread().name)
+            return "probe"
+
+    stream = capture_logs(fmt="text")
+    logging.getLogger("test.lazy").info("value: %s", Probe())
+    stop_logging()
+
+    assert "value: probe" in stream.getvalue()
+    assert formatted_on and formatted_on[0] != threading.current_thread().name
+
+def test_sampling_keeps_every_nth_record_below_warning():
+    sampler = SamplingFilter({"main.access": 0.25})
+    record = lambda name, level=logging.INFO: logging.LogRecord(name, level, __file__, 0, "line", None, None)
+
+    kept = [sampler.filter(record("main.access")) for _ in range(8)]
+
+    assert kept.count(True) == 2
+    assert sampler.filter(record("main.access", logging.WARNING))
+    assert sampler.filter(record("main"))  # Not sampled
+    assert not SamplingFilter({"main": 0}).filter(record("main.access"))  # Prefix match, rate 0 drops all
+
+def test_redacted_hides_user_text_and_credentials():
+    body = {"id": "1", "token": "secret", "params": {"message": {"parts": [{"kind": "text", "text": "pray for me"}]}}}
+
+    rendered = str(Redacted(body))
+    assert "pray for me" not in rendered and "secret" not in rendered
+    assert "<11 chars>" in rendered
+    assert str(Redacted("pray for me")) == "<11 chars>"
+
+    with patch('core.logging_setup.LOG_REDACT_BODIES', False):
+        assert "pray for me" in str(Redacted(body))
+        assert "secret" not in str(Redacted(body))
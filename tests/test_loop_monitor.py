@@ -0,0 +1,35 @@
+import asyncio
+import time
+import pytest
+from core.loop_monitor import LoopMonitor, LOOP_LAG
+from core.metrics import render_metrics
+
+def blocking_handler():
+    time.sleep(0.3)
+
+@pytest.mark.asyncio
+async def test_loop_monitor_records_lag_and_blocking_site():
+    monitor = LoopMonitor(interval=0.01, threshold=0.05)
+    before = LOOP_LAG.count()
+    monitor.start()
+    await asyncio.sleep(0.05)
+
+    blocking_handler()  # Freezes the loop
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+
+    assert LOOP_LAG.count() > before
+    assert len(monitor.sites) == 1
+    site, count = next(iter(monitor.sites.items()))
+    assert count == 1
+    assert site.endswith("in blocking_handler")
+    assert "event_loop_blocked_total" in render_metrics()
+
+@pytest.mark.asyncio
+async def test_loop_monitor_quiet_when_not_blocked():
+    monitor = LoopMonitor(interval=0.01, threshold=0.1)
+    monitor.start()
+    await asyncio.sleep(0.1)
+    await monitor.stop()
+
+    assert monitor.sites == {}
@@ -1,7 +1,7 @@
 import pytest
 import asyncio
 from httpx import AsyncClient, ASGITransport
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from main import app
 from core.models import JSONRPCResponse, VerseResult, A2AMessage, MessagePart, TaskResult, TaskStatus, MessageParams
 
@@ -12,7 +12,7 @@ def client():
 
 @pytest.mark.asyncio
 async def test_valid_message_send_request(client):
-    with patch('ai_service.process_verse_request') as mock_process:
+    with patch('core.ai_service.process_verse_requests', new_callable=AsyncMock) as mock_process:
         mock_verse = VerseResult(
             topic="love",
             verse_reference="1 John 4:8",
@@ -20,7 +20,7 @@ async def test_valid_message_send_request(client):
             reflection="This verse reminds us that love is the essence of God's nature.",
             timestamp=1735148400.0
         )
-        mock_process.return_value = mock_verse
+        mock_process.return_value = [mock_verse]
 
         response = await client.post("/a2a", json={
             "jsonrpc": "2.0",
@@ -76,7 +76,7 @@ async def test_missing_params(client):
 
 @pytest.mark.asyncio
 async def test_ai_service_failure(client):
-    with patch('ai_service.process_verse_request', side_effect=Exception("AI service error")):
+    with patch('core.ai_service.process_verse_requests', side_effect=Exception("AI service error")):
         response = await client.post("/a2a", json={
             "jsonrpc": "2.0",
             "id": "123",
@@ -96,7 +96,7 @@ async def test_ai_service_failure(client):
 
 @pytest.mark.asyncio
 async def test_execute_method(client):
-    with patch('ai_service.process_verse_request') as mock_process:
+    with patch('core.ai_service.process_verse_requests', new_callable=AsyncMock) as mock_process:
         mock_verse = VerseResult(
             topic="faith",
             verse_reference="Hebrews 11:1",
@@ -104,7 +104,7 @@ async def test_execute_method(client):
             reflection="Faith is the foundation of our relationship with God.",
             timestamp=1735148400.0
         )
-        mock_process.return_value = mock_verse
+        mock_process.return_value = [mock_verse]
 
         response = await client.post("/a2a", json={
             "jsonrpc": "2.0",
@@ -130,3 +130,275 @@ async def test_execute_method(client):
         assert isinstance(data["result"], dict)
         assert data["result"]["contextId"] == "ctx-123"
         assert data["result"]["id"] == "task-456"
+
+@pytest.mark.asyncio
+async def test_multi_topic_returns_artifact_per_passage(client):
+    with patch('core.ai_service.process_verse_requests', new_callable=AsyncMock) as mock_process:
+        mock_process.return_value = [
+            VerseResult(topic="love", verse_reference="1 John 4:8", verse_text="God is love.", reflection="Love."),
+            VerseResult(topic="hope", verse_reference="Romans 15:13", verse_text="May the God of hope...", reflection="Hope.")
+        ]
+
+        response = await client.post("/a2a", json={
+            "jsonrpc": "2.0",
+            "id": "789",
+            "method": "message/send",
+            "params": {
+                "message": {
+                    "role": "user",
+                    "parts": [{"kind": "text", "text": "Verses on love and hope"}]
+                }
+            }
+        })
+
+        assert response.status_code == 200
+        artifacts = response.json()["result"]["artifacts"]
+        assert [a["parts"][1]["data"]["reference"] for a in artifacts] == ["1 John 4:8", "Romans 15:13"]
+
+@pytest.mark.asyncio
+async def test_ready_reflects_cached_probe_results(client):
+    report = {"ready": False, "dependencies": {"gemini": {"healthy": False}}}
+    with patch('main.prober.report', return_value=report):
+        response = await client.get("/ready")
+    assert response.status_code == 503
+    assert response.json() == report
+
+    report = {"ready": True, "dependencies": {"gemini": {"healthy": True}}}
+    with patch('main.prober.report', return_value=report):
+        response = await client.get("/ready")
+    assert response.status_code == 200
+
+@pytest.mark.asyncio
+async def test_capture_records_request(client):
+    mock_capture = MagicMock()
+    with patch('main.capture', mock_capture):
+        await client.post("/a2a", json={"jsonrpc": "2.0", "id": "123", "method": "message/send", "params": {}})
+
+    body, arrived_at, status, latency_ms = mock_capture.record.call_args[0]
+    assert body["id"] == "123"
+    assert status == 500
+    assert latency_ms >= 0
+
+@pytest.mark.asyncio
+async def test_profile_header_saves_profile(client, tmp_path):
+    with patch('core.auth.ADMIN_TOKEN', "s3cret"), patch('core.profiling.PROFILE_DIR', str(tmp_path)):
+        response = await client.post(
+            "/a2a",
+            json={"jsonrpc": "2.0", "id": "123", "method": "message/send", "params": {}},
+            headers={"X-Profile-Token": "s3cret"}
+        )
+
+    assert response.headers["X-Profile-File"].startswith("a2a-123-")
+    assert (tmp_path / response.headers["X-Profile-File"]).exists()
+
+@pytest.mark.asyncio
+async def test_a2a_sheds_load_with_retry_after(client):
+    from core.admission import ServerBusy
+    with patch('main.admission.admit', side_effect=ServerBusy("queue_full", 4)):
+        response = await client.post("/a2a", json={"jsonrpc": "2.0", "id": "123", "method": "message/send", "params": {}})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "4"
+    data = response.json()
+    assert data["id"] == "123"
+    assert data["error"]["code"] == -32000
+
+    # Health and discovery are never subject to admission control
+    with patch('main.admission.admit', side_effect=ServerBusy("queue_full", 4)):
+        assert (await client.get("/health")).status_code == 200
+        assert (await client.get("/.well-known/agent.json")).status_code == 200
+
+@pytest.mark.asyncio
+async def test_a2a_rate_limits_per_caller(client):
+    from core.ratelimit import RateLimiter, Tier
+    limiter = RateLimiter(tiers={"default": Tier("default", rate=0.01, burst=1)}, api_key_tiers={})
+    body = {"jsonrpc": "2.0", "id": "123", "method": "execute", "params": {"contextId": "ctx-noisy", "messages": []}}
+    with patch('main.rate_limiter', limiter):
+        first = await client.post("/a2a", json=body)
+        second = await client.post("/a2a", json=body)
+
+    assert first.status_code != 429
+    assert second.status_code == 429
+    assert second.json()["error"]["code"] == -32001
+    assert int(second.headers["Retry-After"]) >= 1
+    assert limiter.usage("ip:127.0.0.1")["ip:127.0.0.1"]["limited"] == 1
+
+@pytest.mark.asyncio
+async def test_admin_usage_requires_token(client):
+    assert (await client.get("/admin/usage")).status_code == 403
+    with patch('core.auth.ADMIN_TOKEN', "s3cret"):
+        response = await client.get("/admin/usage", headers={"X-Admin-Token": "s3cret"})
+    assert response.status_code == 200
+    assert "callers" in response.json()
+
+@pytest.mark.asyncio
+async def test_compact_response_profile(client):
+    with patch('core.ai_service.process_verse_requests', new_callable=AsyncMock) as mock_process:
+        mock_process.return_value = [
+            VerseResult(topic="love", verse_reference="1 John 4:8", verse_text="God is love.", reflection="Love.")
+        ]
+        request = {
+            "jsonrpc": "2.0",
+            "id": "123",
+            "method": "message/send",
+            "params": {
+                "message": {"role": "user", "parts": [{"kind": "text", "text": "Verse on love"}]},
+                "configuration": {"acceptedOutputModes": ["application/vnd.a2a.compact+json"]}
+            }
+        }
+        compact = await client.post("/a2a", json=request)
+        request["params"]["configuration"]["acceptedOutputModes"] = ["text/plain"]
+        full = await client.post("/a2a", json=request)
+
+    compact_result = compact.json()["result"]
+    assert compact_result["history"] == []
+    assert [p["kind"] for p in compact_result["artifacts"][0]["parts"]] == ["data"]
+    assert "God is love." in compact_result["status"]["message"]["parts"][0]["text"]
+    assert "taskId" in compact_result["status"]["message"]
+    assert "metadata" not in compact_result["status"]["message"]  # None fields are dropped
+    assert len(compact.content) < len(full.content)
+    assert len(full.json()["result"]["history"]) == 2
+
+@pytest.mark.asyncio
+async def test_admin_trigger_and_list_job_runs(client, tmp_path):
+    from core.job_store import JobRunLog
+    log = JobRunLog(str(tmp_path / "scheduler.sqlite"))
+    with patch('core.auth.ADMIN_TOKEN', "s3cret"), patch('scheduler.run_log', log), \
+         patch('scheduler.publish_daily_verse', return_value="Psalm 23:1"):
+        headers = {"X-Admin-Token": "s3cret"}
+        assert (await client.post("/admin/jobs/daily_verse/run")).status_code == 403
+        assert (await client.post("/admin/jobs/unknown/run", headers=headers)).status_code == 404
+        run = (await client.post("/admin/jobs/daily_verse/run", headers=headers)).json()
+        runs = (await client.get("/admin/jobs/runs", headers=headers)).json()["runs"]
+
+    assert run["status"] == "succeeded"
+    assert run["trigger"] == "manual"
+    assert runs[0]["id"] == run["id"]
+    assert runs[0]["duration_ms"] is not None
+
+@pytest.mark.asyncio
+async def test_translation_selection_and_side_by_side_render(client):
+    from core.request_context import translations_var
+    seen = []
+
+    async def fake_verses(query):
+        seen.append(translations_var.get())
+        return [VerseResult(topic="shepherd", verse_reference="Psalm 23:1", verse_text="The LORD is my shepherd...",
+                            reflection="Rest.", translation="KJV", alternates={"NET": "The LORD is my shepherd..."})]
+
+    with patch('core.ai_service.process_verse_requests', side_effect=fake_verses):
+        response = await client.post("/a2a", json={
+            "jsonrpc": "2.0",
+            "id": "t1",
+            "method": "message/send",
+            "params": {
+                "message": {"role": "user", "parts": [{"kind": "text", "text": "Psalm 23"}],
+                            "metadata": {"translation": ["kjv", "net"]}}
+            }
+        })
+
+    assert seen == [["KJV", "NET"]]
+    result = response.json()["result"]
+    assert "KJV: The LORD is my shepherd...\nNET: The LORD is my shepherd..." in result["status"]["message"]["parts"][0]["text"]
+    data = result["artifacts"][0]["parts"][1]["data"]
+    assert data["translation"] == "KJV"
+    assert data["alternates"] == {"NET": "The LORD is my shepherd..."}
+
+@pytest.mark.asyncio
+async def test_oversized_request_is_rejected(client):
+    with patch('core.ingest.MAX_REQUEST_BYTES', 100):
+        response = await client.post("/a2a", json={
+            "jsonrpc": "2.0",
+            "id": "big",
+            "method": "message/send",
+            "params": {"message": {"role": "user", "parts": [{"kind": "text", "text": "x" * 500}]}}
+        })
+
+    assert response.status_code == 413
+    assert response.json()["error"]["code"] == -32600
+    assert response.json()["error"]["data"]["maxBytes"] == 100
+
+@pytest.mark.asyncio
+async def test_execute_history_is_not_validated_up_front(client):
+    history = [{"role": "user", "parts": [{"kind": "data", "data": {"blob": "x" * 1000}}]} for _ in range(20)]
+    history.append({"role": "not-a-role", "parts": []})  # Invalid, but never answered
+    with patch('core.ai_service.process_verse_requests', new_callable=AsyncMock) as mock_process:
+        mock_process.return_value = [VerseResult(topic="love", verse_reference="1 John 4:8", verse_text="God is love.")]
+        response = await client.post("/a2a", json={
+            "jsonrpc": "2.0",
+            "id": "exec",
+            "method": "execute",
+            "params": {"messages": history + [{"role": "user", "parts": [{"kind": "text", "text": "Verse on love"}]}]}
+        })
+
+    assert response.status_code == 200
+    result = response.json()["result"]
+    assert len(result["history"]) == 22  # 20 valid history messages, the request and the reply
+    mock_process.assert_awaited_once_with("Verse on love")
+
+@pytest.mark.asyncio
+async def test_retry_replays_stored_response(client):
+    request = {
+        "jsonrpc": "2.0",
+        "id": "retry-1",
+        "method": "message/send",
+        "params": {"message": {"role": "user", "messageId": "msg-retry-1", "parts": [{"kind": "text", "text": "Verse on love"}]}}
+    }
+    with patch('core.ai_service.process_verse_requests', new_callable=AsyncMock) as mock_process:
+        mock_process.return_value = [VerseResult(topic="love", verse_reference="1 John 4:8", verse_text="God is love.")]
+        first = await client.post("/a2a", json=request)
+        retry = await client.post("/a2a", json=request)
+
+    assert mock_process.await_count == 1
+    assert retry.json() == first.json()
+    assert retry.headers["X-Idempotent-Replay"] == "true"
+
+@pytest.mark.asyncio
+async def test_drain_finishes_in_flight_requests_and_rejects_new_ones(client):
+    import main
+    from core.drain import DrainController
+    controller = DrainController(grace_period=5, ready_delay=0)
+    release = asyncio.Event()
+
+    async def slow_verses(query):
+        await release.wait()
+        return [VerseResult(topic="love", verse_reference="1 John 4:8", verse_text="God is love.")]
+
+    def body(rpc_id):
+        return {"jsonrpc": "2.0", "id": rpc_id, "method": "message/send",
+                "params": {"message": {"role": "user", "parts": [{"kind": "text", "text": "Verse on love"}]}}}
+
+    with patch('main.drain', controller), patch('core.ai_service.process_verse_requests', slow_verses):
+        in_flight = asyncio.create_task(client.post("/a2a", json=body("first")))
+        while not controller.in_flight["request"]:
+            await asyncio.sleep(0.01)
+
+        main.start_drain()
+        rejected = await client.post("/a2a", json=body("second"))
+        ready = await client.get("/ready")
+        drained = asyncio.create_task(controller.wait())
+        await asyncio.sleep(0.05)
+        assert not drained.done()
+
+        release.set()
+        assert await drained is True
+        response = await in_flight
+
+    assert response.status_code == 200
+    assert rejected.status_code == 503
+    assert rejected.headers["Retry-After"] == "1"
+    assert rejected.json()["id"] == "second"
+    assert rejected.json()["error"]["data"]["reason"] == "draining"
+    assert ready.status_code == 503
+    assert ready.json()["draining"]["in_flight"] == {"request": 1}
+
+@pytest.mark.asyncio
+async def test_admin_drain_requires_token(client):
+    from core.drain import DrainController
+    controller = DrainController()
+    with patch('main.drain', controller), patch('core.auth.ADMIN_TOKEN', "s3cret"):
+        assert (await client.post("/admin/drain")).status_code == 403
+        assert not controller.draining
+        response = await client.post("/admin/drain", headers={"X-Admin-Token": "s3cret"})
+
+    assert response.json()["draining"] is True
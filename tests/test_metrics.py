@@ -0,0 +1,62 @@
+import threading
+from core.metrics import Counter, Gauge, Histogram, RollingLatency
+
+def test_counter_with_labels():
+    requests = Counter("test_requests_total", "Requests", ["stage"])
+    requests.inc(stage="intent")
+    requests.inc(2, stage="intent")
+
+    assert requests.value(stage="intent") == 3
+    assert 'test_requests_total{stage="intent"} 3.0' in requests.render()
+
+def test_gauge_sets_value():
+    inflight = Gauge("test_inflight", "In flight")
+    inflight.set(4)
+    inflight.set(2)
+
+    assert inflight.render()[1] == "# TYPE test_inflight gauge"
+    assert "test_inflight 2" in inflight.render()
+
+def test_histogram_cumulative_buckets():
+    latency = Histogram("test_latency_seconds", "Latency", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value)
+
+    lines = latency.render()
+    assert 'test_latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{le="1.0"} 2' in lines
+    assert 'test_latency_seconds_bucket{le="+Inf"} 3' in lines
+    assert "test_latency_seconds_count 3" in lines
+    assert latency.count() == 3
+
+def test_render_while_threads_add_label_sets():
+    calls = Counter("test_calls_total", "Calls", ["caller"])
+    latency = Histogram("test_call_seconds", "Latency", ["caller"], buckets=(0.1,))
+
+    def record(worker):
+        for i in range(2000):
+            calls.inc(caller=f"{worker}-{i}")
+            latency.observe(0.05, caller=f"{worker}-{i}")
+
+    workers = [threading.Thread(target=record, args=(n,)) for n in range(4)]
+    for worker in workers:
+        worker.start()
+    while any(worker.is_alive() for worker in workers):
+        calls.render()  # Raised "dictionary changed size during iteration" when unlocked
+        latency.render()
+    for worker in workers:
+        worker.join()
+
+    assert len(calls.values()) == 8000
+    assert len([line for line in latency.render() if line.startswith("test_call_seconds_count")]) == 8000
+
+def test_rolling_latency_window():
+    latency = RollingLatency(window=3)
+    assert latency.mean(default=1.5) == 1.5
+    for value in (10.0, 1.0, 2.0, 3.0):
+        latency.observe(value)
+
+    assert len(latency) == 3
+    assert latency.mean() == 2.0
+    assert latency.percentile(50) == 2.0
+    assert latency.percentile(100) == 3.0
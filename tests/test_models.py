@@ -1,7 +1,11 @@
+import json
+import time
+
 import pytest
 from core.models import (
     JSONRPCRequest, JSONRPCResponse, VerseRequestParams, VerseResult, ErrorResponse,
-    A2AMessage, MessagePart, TaskResult, TaskStatus, Artifact, MessageParams, ExecuteParams
+    A2AMessage, MessagePart, TaskResult, TaskStatus, Artifact, MessageParams, ExecuteParams,
+    TaskRecord, MessageRecord, ArtifactRecord, PartRecord
 )
 
 def test_jsonrpc_request():
@@ -112,3 +116,38 @@ def test_execute_params():
     assert len(params.messages) == 1
     assert params.contextId == "ctx-123"
     assert params.taskId == "task-123"
+
+def test_task_record_serializes_like_task_result():
+    inbound = A2AMessage(role="user", parts=[MessagePart(kind="text", text="love")])
+    record = TaskRecord(
+        id="task-1",
+        contextId="ctx-1",
+        state="completed",
+        message=MessageRecord(role="agent", parts=[PartRecord(kind="text", text="God is love.")], taskId="task-1"),
+        artifacts=[ArtifactRecord(name="verse", parts=[PartRecord(kind="data", data={"reference": "1 John 4:8"})])],
+        history=[inbound]
+    )
+    model = TaskResult(
+        id="task-1",
+        contextId="ctx-1",
+        status=TaskStatus(
+            state="completed",
+            timestamp=record.timestamp,
+            message=A2AMessage(role="agent", parts=[MessagePart(kind="text", text="God is love.")], taskId="task-1",
+                               messageId=record.message.messageId)
+        ),
+        artifacts=[Artifact(name="verse", parts=[MessagePart(kind="data", data={"reference": "1 John 4:8"})],
+                            artifactId=record.artifacts[0].artifactId)],
+        history=[inbound]
+    )
+
+    for exclude_none in (False, True):
+        assert json.dumps(record.to_dict(exclude_none)) == json.dumps(model.model_dump(exclude_none=exclude_none))
+
+def test_verse_result_timestamp_is_per_instance():
+    first = VerseResult(topic="love", verse_reference="1 John 4:8", verse_text="God is love.")
+    time.sleep(0.01)
+    second = VerseResult(topic="love", verse_reference="1 John 4:8", verse_text="God is love.")
+
+    assert second.timestamp > first.timestamp
+    assert not hasattr(first, "__dict__")  # Slotted record
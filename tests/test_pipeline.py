@@ -0,0 +1,118 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from core.models import VerseResult
+from core.pipeline import Pipeline, Stage, StageCache, STAGE_OUTCOMES
+
+def test_independent_stages_run_concurrently():
+    def slow(value):
+        def run(ctx):
+            time.sleep(0.2)
+            return value
+        return run
+
+    pipeline = Pipeline("test_concurrent", [
+        Stage("a", slow(1)),
+        Stage("b", slow(2)),
+        Stage("sum", lambda ctx: ctx["a"] + ctx["b"], deps=("a", "b"), executor="inline"),
+    ])
+
+    start = time.perf_counter()
+    run = asyncio.run(pipeline.run({}))
+    elapsed = time.perf_counter() - start
+
+    assert run.results["sum"] == 3
+    assert elapsed < 0.35  # Both slow stages overlapped
+    assert set(run.timings) == {"a", "b", "sum"}
+
+def test_timeout_uses_fallback():
+    async def hang(ctx):
+        await asyncio.sleep(1)
+
+    pipeline = Pipeline("test_timeout", [
+        Stage("slow", hang, executor="async", timeout=0.05, fallback=lambda ctx, error: "fallback"),
+    ])
+
+    run = asyncio.run(pipeline.run({}))
+
+    assert run.results["slow"] == "fallback"
+    assert "slow" in run.fallbacks
+    assert STAGE_OUTCOMES.value(pipeline="test_timeout", stage="slow", outcome="fallback") == 1
+
+def test_error_without_fallback_propagates():
+    def fail(ctx):
+        raise RuntimeError("boom")
+
+    pipeline = Pipeline("test_error", [
+        Stage("fail", fail),
+        Stage("after", lambda ctx: ctx["fail"], deps=("fail",), executor="inline"),
+    ])
+
+    with pytest.raises(RuntimeError, match="boom"):
+        asyncio.run(pipeline.run({}))
+
+def test_cache_hit_skips_stage():
+    calls = []
+    pipeline = Pipeline("test_cache", [
+        Stage("double", lambda ctx: calls.append(ctx["n"]) or ctx["n"] * 2, executor="inline",
+              cache=StageCache(lambda ctx: ctx["n"], ttl=60)),
+    ])
+
+    assert asyncio.run(pipeline.run({"n": 2})).results["double"] == 4
+    assert asyncio.run(pipeline.run({"n": 2})).results["double"] == 4
+    assert calls == [2]
+
+def test_fallback_deps_only_awaited_on_failure():
+    async def prefetch(ctx):
+        await asyncio.sleep(1)
+        return "prefetched"
+
+    pipeline = Pipeline("test_fallback_deps", [
+        Stage("prefetch", prefetch, executor="async"),
+        Stage("main", lambda ctx: "main", executor="inline",
+              fallback=lambda ctx, error: ctx["prefetch"], fallback_deps=("prefetch",)),
+    ])
+
+    start = time.perf_counter()
+    run = asyncio.run(pipeline.run({}, targets=["main"]))
+
+    assert run.results == {"main": "main"}
+    assert time.perf_counter() - start < 0.5  # The unused prefetch was cancelled
+
+def test_rejects_cycles_and_unknown_deps():
+    with pytest.raises(ValueError):
+        Pipeline("cycle", [Stage("a", len, deps=("b",)), Stage("b", len, deps=("a",))])
+    with pytest.raises(ValueError):
+        Pipeline("unknown", [Stage("a", len, deps=("missing",))])
+
+@patch('core.ai_service.generate_reflection', return_value="Reflection.")
+@patch('core.bible_api.get_random_verse')
+@patch('core.bible_api.hedged_fetch_passage', return_value=None)
+@patch('core.ai_service.generate_verse_reference', return_value="Nowhere 1:1")
+def test_topic_pipeline_falls_back_to_random_verse(mock_reference, mock_fetch, mock_random, mock_reflection):
+    from core.verse_pipeline import run_topic
+    mock_random.return_value = VerseResult(topic="hope", verse_reference="Romans 15:13", verse_text="May the God of hope...")
+
+    verse = asyncio.run(run_topic("hope"))
+
+    assert verse.verse_reference == "Romans 15:13"
+    assert verse.reflection == "Reflection."
+    mock_reflection.assert_called_once_with("May the God of hope...", "hope")
+
+@patch('core.bible_api.get_random_verse')
+@patch('core.bible_api.hedged_fetch_passage')
+@patch('core.ai_service.generate_verse_reference')
+def test_speculative_topic_pipeline_uses_prefetched_verse(mock_reference, mock_fetch, mock_random):
+    from core.verse_pipeline import build_topic_pipeline
+    mock_reference.side_effect = Exception("Gemini down")
+    mock_random.return_value = VerseResult(topic="hope", verse_reference="Romans 15:13", verse_text="May the God of hope...")
+
+    with patch('core.ai_service.generate_reflection', return_value="Reflection."):
+        run = asyncio.run(build_topic_pipeline(speculative=True).run({"topic": "hope", "translations": ["NET"]}, targets=["verse"]))
+
+    assert run.results["verse"].verse_reference == "Romans 15:13"
+    mock_random.assert_called_once_with("hope")
+    mock_fetch.assert_not_called()
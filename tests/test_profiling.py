@@ -0,0 +1,102 @@
+import json
+import os
+import time
+from unittest.mock import patch
+import core.profiling as profiling
+from core.profiling import SamplingProfiler, should_profile, profiled
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def test_sampling_profiler_exports_speedscope():
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    busy_wait(0.05)
+    profiler.stop()
+
+    data = profiler.to_speedscope("test")
+    assert data["shared"]["frames"]
+    main_profile = next(p for p in data["profiles"] if p["name"] == "MainThread")
+    assert main_profile["samples"]
+    assert len(main_profile["samples"]) == len(main_profile["weights"])
+    frame_names = {data["shared"]["frames"][i]["name"] for stack in main_profile["samples"] for i in stack}
+    assert "busy_wait" in frame_names
+    assert "busy_wait" in profiler.to_collapsed()
+
+def other_wait(seconds):
+    busy_wait(seconds)
+
+def frame_names(profiler, thread_name):
+    return {profiler.frames[i][0] for stack in profiler.samples.get(thread_name, []) for i in stack}
+
+def test_profiler_only_samples_its_own_work():
+    import asyncio
+    import contextvars
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+    from core.profiling import start_profile
+    from core.request_context import profiler_var
+    stop = threading.Event()
+    unrelated = threading.Thread(target=lambda: stop.wait(), name="unrelated")
+    unrelated.start()
+
+    async def other_request():
+        await asyncio.sleep(0.01)
+        other_wait(0.05)  # On the loop, in a context without the profiler
+
+    async def profiled_request():
+        profiler = start_profile()
+        await asyncio.sleep(0.01)
+        busy_wait(0.05)
+        with ThreadPoolExecutor(1, thread_name_prefix="worker") as pool:
+            pool.submit(contextvars.copy_context().run, busy_wait, 0.05).result()
+            pool.submit(other_wait, 0.05).result()
+        await asyncio.to_thread(busy_wait, 0.05)
+        profiler.stop()
+        return profiler
+
+    async def main():
+        other = asyncio.create_task(other_request())
+        profiler = await asyncio.create_task(profiled_request())
+        await other
+        return profiler
+
+    profiler = asyncio.run(main())
+    profiling._active -= 1  # Stopped directly instead of through finish_profile
+    stop.set()
+    unrelated.join()
+
+    assert "unrelated" not in profiler.samples
+    assert "busy_wait" in frame_names(profiler, "MainThread")
+    assert "other_wait" not in frame_names(profiler, "MainThread")
+    assert "busy_wait" in frame_names(profiler, "worker_0")
+    assert "other_wait" not in frame_names(profiler, "worker_0")
+    assert profiler.skipped > 0
+    assert profiler_var.get() is None  # Set in the request's task only
+
+def test_should_profile_requires_admin_token():
+    with patch('core.auth.ADMIN_TOKEN', "s3cret"), patch('core.profiling.PROFILE_SAMPLE_RATE', 0):
+        assert should_profile("s3cret")
+        assert not should_profile("wrong")
+        assert not should_profile(None)
+    with patch('core.auth.ADMIN_TOKEN', None), patch('core.profiling.PROFILE_SAMPLE_RATE', 0):
+        assert not should_profile("anything")
+    with patch('core.profiling.PROFILE_SAMPLE_RATE', 1.0):
+        assert should_profile(None)
+
+def test_profiled_writes_file_and_limits_concurrency(tmp_path):
+    with patch('core.profiling.PROFILE_DIR', str(tmp_path)):
+        with profiled("daily_verse", force=True) as profiler:
+            assert profiler is not None
+            with profiled("nested", force=True) as nested:
+                assert nested is None  # PROFILE_MAX_CONCURRENT is 1
+            busy_wait(0.01)
+
+    files = os.listdir(tmp_path)
+    assert len(files) == 1
+    assert files[0].startswith("daily_verse-")
+    with open(tmp_path / files[0]) as f:
+        assert json.load(f)["name"] == "daily_verse"
+    assert profiling._active == 0
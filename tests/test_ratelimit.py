@@ -0,0 +1,77 @@
+import time
+import pytest
+from core.ratelimit import InMemoryBackend, RateLimiter, Tier, load_tiers, hash_key
+
+TIERS = {"default": Tier("default", rate=10.0, burst=2), "partner": Tier("partner", rate=100.0, burst=5)}
+
+def test_token_bucket_limits_and_refills():
+    backend = InMemoryBackend()
+    assert backend.take("ip:1.2.3.4", rate=10.0, burst=2).allowed
+    assert backend.take("ip:1.2.3.4", rate=10.0, burst=2).allowed
+    decision = backend.take("ip:1.2.3.4", rate=10.0, burst=2)
+    assert not decision.allowed
+    assert decision.retry_after == 1
+
+    time.sleep(0.11)  # One token back at 10/s
+    assert backend.take("ip:1.2.3.4", rate=10.0, burst=2).allowed
+
+def test_backend_evicts_least_recent_callers():
+    backend = InMemoryBackend(max_keys=2)
+    for caller in ("a", "b", "c"):
+        backend.take(caller, rate=1.0, burst=1)
+
+    assert list(backend._buckets) == ["b", "c"]
+
+@pytest.mark.asyncio
+async def test_callers_are_isolated():
+    limiter = RateLimiter(tiers=TIERS, api_key_tiers={})
+    for _ in range(2):
+        await limiter.check("ip:noisy")
+
+    assert not (await limiter.check("ip:noisy")).allowed
+    assert (await limiter.check("ip:quiet")).allowed
+    usage = limiter.usage()
+    assert usage["ip:noisy"]["allowed"] == 2
+    assert usage["ip:noisy"]["limited"] == 1
+    assert limiter.usage("ip:quiet")["ip:quiet"]["allowed"] == 1
+
+def test_identify_prefers_api_key_and_maps_tier():
+    limiter = RateLimiter(tiers=TIERS, api_key_tiers={"partner-key": "partner"})
+
+    assert limiter.identify("partner-key", "ctx-1", "1.2.3.4") == (f"key:{hash_key('partner-key')}", "partner")
+    assert limiter.identify(None, "ctx-1", "1.2.3.4") == ("ip:1.2.3.4", "default")
+    assert limiter.identify(None, None, None) == ("anonymous", "default")
+
+def test_made_up_keys_and_contexts_share_the_ip_bucket():
+    limiter = RateLimiter(tiers=TIERS, api_key_tiers={"partner-key": "partner"})
+
+    assert limiter.identify("made-up-key", None, "1.2.3.4") == ("ip:1.2.3.4", "default")
+    assert limiter.identify("another-key", "fresh-ctx", "1.2.3.4") == ("ip:1.2.3.4", "default")
+
+    by_context = RateLimiter(tiers=TIERS, api_key_tiers={}, key_order=["api_key", "context", "ip"])
+    assert by_context.identify("made-up-key", "ctx-1", "1.2.3.4") == ("ip:1.2.3.4/ctx:ctx-1", "default")
+
+@pytest.mark.asyncio
+async def test_async_backend_is_awaited():
+    class AsyncBackend(InMemoryBackend):
+        async def take(self, *args, **kwargs):
+            return super().take(*args, **kwargs)
+
+    limiter = RateLimiter(tiers=TIERS, api_key_tiers={}, backend=AsyncBackend())
+    assert (await limiter.check("ip:1.2.3.4")).allowed
+    assert (await limiter.check("ip:1.2.3.4")).allowed
+    assert not (await limiter.check("ip:1.2.3.4")).allowed
+
+@pytest.mark.asyncio
+async def test_broken_backend_fails_open():
+    class BrokenBackend:
+        async def take(self, *args, **kwargs):
+            raise ConnectionError("redis down")
+
+    limiter = RateLimiter(tiers=TIERS, api_key_tiers={}, backend=BrokenBackend())
+    assert (await limiter.check("ip:1.2.3.4")).allowed
+
+def test_load_tiers_requires_default():
+    assert load_tiers('{"default": {"rate": 1, "burst": 3}}')["default"].burst == 3
+    with pytest.raises(ValueError):
+        load_tiers('{"partner": {"rate": 1, "burst": 3}}')
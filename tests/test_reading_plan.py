@@ -0,0 +1,74 @@
+from collections import Counter
+from datetime import date
+from unittest.mock import patch
+
+from core.reading_plan import CURATED_VERSES, ReadingPlan, build_plan, easter, prefetch, season_for
+
+def test_build_plan_is_deterministic_and_valid():
+    plan = build_plan(2026)
+
+    assert build_plan(2026).days == plan.days
+    assert build_plan(2026, seed="other").days != plan.days
+    assert len(plan.days) == 365 and len(build_plan(2028).days) == 366
+    assert plan.validate() == []
+    testaments = Counter(plan.testaments[entry] for entry in plan.days)
+    assert abs(testaments["OT"] - testaments["NT"]) <= 10
+
+def test_no_repeats_within_window_across_years():
+    first = build_plan(2026, window=60)
+    second = build_plan(2027, window=60, previous=first)
+    references = [first.references[e] for e in first.days] + [second.references[e] for e in second.days]
+
+    last_seen = {}
+    for day, reference in enumerate(references):
+        assert day - last_seen.get(reference, -61) > 60
+        last_seen[reference] = day
+
+def test_small_pool_reuses_least_recent_verse():
+    plan = build_plan(2026, window=30, pool=CURATED_VERSES[:10])
+
+    assert len(plan.days) == 365
+    assert len(set(plan.days[:10])) == 10  # Every verse used before any repeats
+
+def test_seasons():
+    assert easter(2024) == date(2024, 3, 31)
+    assert easter(2026) == date(2026, 4, 5)
+    assert season_for(date(2026, 1, 3)) == "renewal"
+    assert season_for(date(2026, 2, 18)) == "lent"  # Ash Wednesday
+    assert season_for(date(2026, 4, 5)) == "easter"
+    assert season_for(date(2026, 11, 29)) == "advent"  # First Sunday of Advent
+    assert season_for(date(2026, 12, 25)) == "christmas"
+    assert season_for(date(2026, 7, 1)) is None
+
+    plan = build_plan(2026)
+    assert plan.day(date(2026, 12, 25)).topic == "christmas"
+    assert plan.day(date(2026, 4, 5)).topic == "easter"
+
+def test_save_load_and_prefetch(tmp_path):
+    plan = build_plan(2026)
+    missing = plan.references[0]
+
+    with patch('core.bible_api.get_passage', side_effect=lambda ref, translation: None if ref == missing else (ref, f"Text of {ref}")):
+        assert prefetch(plan, "NET") == [missing]
+
+    path = tmp_path / "2026.json"
+    plan.save(str(path))
+    loaded = ReadingPlan.load(str(path))
+
+    assert loaded.days == plan.days
+    entry = loaded.day(date(2026, 10, 18))
+    assert entry.reference == plan.day(date(2026, 10, 18)).reference
+    assert entry.text == f"Text of {entry.reference}" or entry.reference == missing
+    assert loaded.translation == "NET"
+
+def test_in_memory_plans_keep_the_window_across_new_year(tmp_path):
+    from core.reading_plan import get_plan
+    with patch('core.reading_plan.plan_path', lambda year: str(tmp_path / f"{year}.json")), \
+         patch('core.reading_plan._plans', {}):
+        previous, current = get_plan(2025), get_plan(2026)
+
+    references = [previous.references[e] for e in previous.days] + [current.references[e] for e in current.days]
+    last_seen = {}
+    for day, reference in enumerate(references):
+        assert day - last_seen.get(reference, -current.window - 1) > current.window
+        last_seen[reference] = day
@@ -0,0 +1,70 @@
+import asyncio
+import json
+import time
+import httpx
+from replay import load_capture, replay, compare, percentile, with_fresh_ids
+
+def write_capture(path, records):
+    with open(path, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+
+def test_load_capture_orders_records(tmp_path):
+    write_capture(tmp_path / "a.jsonl", [{"ts": 3.0, "status": 200, "latency_ms": 1.0, "body": {}}])
+    write_capture(tmp_path / "a.jsonl.1", [{"ts": 1.0, "status": 200, "latency_ms": 1.0, "body": {}}])
+
+    records = load_capture([str(tmp_path / "a.jsonl*")])
+
+    assert [r["ts"] for r in records] == [1.0, 3.0]
+
+def test_percentile():
+    assert percentile([5, 1, 3, 2, 4], 50) == 3
+    assert percentile([], 99) == 0.0
+
+def test_replay_keeps_inter_arrival_times_and_compares():
+    records = [
+        {"ts": 100.0, "status": 200, "latency_ms": 10.0, "body": {"id": "1"}},
+        {"ts": 100.4, "status": 500, "latency_ms": 20.0, "body": {"id": "2"}},
+    ]
+
+    def handler(request):
+        body = json.loads(request.content)
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": body["id"], "result": {}})
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://target") as client:
+            start = time.perf_counter()
+            results = await replay(records, client, speed=2.0)
+            return results, time.perf_counter() - start
+
+    results, elapsed = asyncio.run(run())
+
+    assert len(results) == 2
+    assert 0.18 <= elapsed < 0.4  # 0.4s gap replayed twice as fast
+    report = compare(records, results)
+    assert report["captured"]["error_rate"] == 0.5
+    assert report["replayed"]["error_rate"] == 0.0
+    assert report["error_rate_delta"] == -0.5
+
+def test_replayed_requests_get_fresh_ids():
+    body = {"jsonrpc": "2.0", "id": "1", "params": {"message": {"messageId": "m1", "parts": []}}}
+    records = [{"ts": 0.0, "status": 200, "latency_ms": 1.0, "body": body}] * 2
+    sent = []
+
+    def handler(request):
+        sent.append(json.loads(request.content))
+        return httpx.Response(200, json={})
+
+    async def run(fresh_ids):
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="http://target") as client:
+            await replay(records, client, fresh_ids=fresh_ids)
+
+    asyncio.run(run(True))
+    assert len({b["id"] for b in sent}) == 2 and "1" not in {b["id"] for b in sent}
+    assert len({b["params"]["message"]["messageId"] for b in sent}) == 2
+    assert body["id"] == "1"  # Captured record untouched
+
+    sent.clear()
+    asyncio.run(run(False))
+    assert [b["id"] for b in sent] == ["1", "1"]
+    assert with_fresh_ids({"method": "tasks/get"}) == {"method": "tasks/get"}
@@ -1,9 +1,15 @@
 import pytest
 from unittest.mock import patch, MagicMock
-from scheduler import post_daily_verse, setup_scheduler
+from scheduler import (
+    publish_daily_verse, setup_scheduler, parse_post_time, current_slot, daily_verse_job,
+    schedule_recovery
+)
+from core.job_store import JobRunLog
+from datetime import datetime, timedelta, timezone
 import asyncio
+import threading
 
-def test_post_daily_verse():
+def test_publish_daily_verse():
     """Test the daily verse posting function"""
     with patch('scheduler.get_daily_verse') as mock_get_verse, \
          patch('scheduler.generate_reflection') as mock_reflection, \
@@ -20,7 +26,7 @@ def test_post_daily_verse():
         mock_reflection.return_value = "This verse shows God's incredible love."
 
         # Call the function
-        post_daily_verse()
+        assert publish_daily_verse() == "John 3:16"
 
         # Verify the verse was fetched
         mock_get_verse.assert_called_once()
@@ -30,27 +36,46 @@ def test_post_daily_verse():
 
         # Verify logging occurred
         mock_logger.info.assert_called_once()
-        log_message = mock_logger.info.call_args[0][0]
+        log_message = mock_logger.info.call_args[0][0] % mock_logger.info.call_args[0][1:]
         assert "John 3:16" in log_message
         assert "For God so loved the world..." in log_message
         assert "This verse shows God's incredible love." in log_message
 
-def test_post_daily_verse_error():
+@pytest.mark.asyncio
+async def test_daily_verse_job_error(tmp_path):
     """Test error handling in daily verse posting"""
-    with patch('scheduler.get_daily_verse', side_effect=Exception("API Error")), \
+    with patch('scheduler.run_log', JobRunLog(str(tmp_path / "scheduler.sqlite"))), \
+         patch('scheduler.get_daily_verse', side_effect=Exception("API Error")), \
          patch('scheduler.logger') as mock_logger:
 
         # Call the function
-        post_daily_verse()
+        await daily_verse_job(trigger="manual")
 
         # Verify error was logged
-        mock_logger.error.assert_called_once_with("Error posting daily verse: API Error")
+        mock_logger.error.assert_called_once()
+        message, error = mock_logger.error.call_args[0]
+        assert message % error == "Error posting daily verse: API Error"
+
+@pytest.mark.asyncio
+async def test_daily_verse_job_profiles_off_the_event_loop(tmp_path):
+    profiler = MagicMock()
+    loop_thread = threading.get_ident()
+    finished_on = []
+    with patch('scheduler.run_log', JobRunLog(str(tmp_path / "scheduler.sqlite"))), \
+         patch('scheduler.PROFILE_SCHEDULER', True), \
+         patch('scheduler.start_profile', return_value=profiler), \
+         patch('scheduler.finish_profile', side_effect=lambda *args: finished_on.append(threading.get_ident())) as finish, \
+         patch('scheduler.publish_daily_verse', return_value="John 3:16"):
+        await daily_verse_job(trigger="manual")
+
+    finish.assert_called_once_with(profiler, "daily_verse")
+    assert finished_on[0] != loop_thread
 
 @pytest.mark.asyncio
-async def test_setup_scheduler():
+async def test_setup_scheduler(tmp_path):
     """Test scheduler setup"""
     # This test verifies the scheduler can be created without errors
-    scheduler = setup_scheduler()
+    scheduler = setup_scheduler(str(tmp_path / "scheduler.sqlite"))
 
     # Verify it's an AsyncIOScheduler
     assert scheduler is not None
@@ -61,22 +86,116 @@ async def test_setup_scheduler():
     assert jobs[0].name == "Post Daily Verse"
     assert jobs[0].id == "daily_verse"
 
-    # Clean up
-    await scheduler.shutdown()
+@pytest.mark.asyncio
+async def test_scheduler_persists_jobs_and_keeps_missed_run(tmp_path):
+    db_path = str(tmp_path / "scheduler.sqlite")
+    scheduler = setup_scheduler(db_path)
+    scheduler.start(paused=True)
+    # Pretend the service went down with a post still pending yesterday
+    missed = datetime.now(timezone.utc) - timedelta(hours=1)
+    scheduler.modify_job("daily_verse", next_run_time=missed)
+    scheduler.shutdown(wait=False)
+
+    restarted = setup_scheduler(db_path)
+    assert restarted.get_jobs()[0].next_run_time == missed  # Runs on start instead of being skipped
+
+def test_parse_post_time():
+    assert parse_post_time("08:30") == (8, 30)
+    with pytest.raises(ValueError):
+        parse_post_time(None)
+    with pytest.raises(ValueError):
+        parse_post_time("25:00")
+
+def test_current_slot():
+    with patch('scheduler.DAILY_POST_TIME', "08:00"):
+        assert current_slot(datetime(2025, 1, 2, 9, 0, tzinfo=timezone.utc)) == "2025-01-02T08:00"
+        assert current_slot(datetime(2025, 1, 2, 7, 0, tzinfo=timezone.utc)) == "2025-01-01T08:00"
+
+@pytest.mark.asyncio
+async def test_daily_verse_job_records_runs_and_skips_completed_slot(tmp_path):
+    log = JobRunLog(str(tmp_path / "scheduler.sqlite"))
+    with patch('scheduler.run_log', log), \
+         patch('scheduler.publish_daily_verse', return_value="John 3:16") as mock_publish:
+        run_id = await daily_verse_job()
+        assert await daily_verse_job() is None  # Same slot already posted
+        await daily_verse_job(trigger="manual")  # Manual runs always post
+
+    assert mock_publish.call_count == 2
+    runs = log.runs("daily_verse")
+    assert [run["trigger"] for run in runs] == ["manual", "scheduled"]
+    assert runs[1]["id"] == run_id
+    assert runs[1]["status"] == "succeeded"
+    assert runs[1]["detail"] == "John 3:16"
+    assert runs[1]["duration_ms"] >= 0
+
+@pytest.mark.asyncio
+async def test_daily_verse_job_records_failure(tmp_path):
+    log = JobRunLog(str(tmp_path / "scheduler.sqlite"))
+    with patch('scheduler.run_log', log), \
+         patch('scheduler.publish_daily_verse', side_effect=RuntimeError("Telex down")):
+        await daily_verse_job()
+
+    run = log.runs()[0]
+    assert run["status"] == "failed"
+    assert run["detail"] == "Telex down"
+
+@pytest.mark.asyncio
+async def test_interrupted_post_is_redone_by_next_instance(tmp_path):
+    db_path = str(tmp_path / "scheduler.sqlite")
+    log = JobRunLog(db_path)
+    log.start("daily_verse", "scheduled", "2025-01-01T08:00")  # Cut off by the grace period
+    log.start("daily_verse", "scheduled", "2024-12-01T08:00")  # Too old to redo
+    assert log.interrupt_running() == 2
+    log.start("daily_verse", "scheduled", "2024-12-31T08:00")
+    log.interrupt_running()
+    log.finish(log.start("daily_verse", "recovery", "2024-12-31T08:00"), "succeeded", 1.0)  # Already redone
+    assert log.unfinished_slots("daily_verse") == ["2024-12-01T08:00", "2025-01-01T08:00"]
+
+    now = datetime(2025, 1, 1, 9, 0, tzinfo=timezone.utc)
+    with patch('scheduler.run_log', log):
+        scheduler = setup_scheduler(db_path)
+        assert schedule_recovery(scheduler, now) == "2025-01-01T08:00"
+        job = scheduler.get_job("daily_verse_recovery")
+        assert job.kwargs == {"trigger": "recovery", "slot": "2025-01-01T08:00"}
+
+        with patch('scheduler.publish_daily_verse', return_value="John 3:16") as mock_publish:
+            await daily_verse_job(**job.kwargs)
+            assert await daily_verse_job(**job.kwargs) is None  # Redone once only
+
+    mock_publish.assert_called_once_with("2025-01-01T08:00")
+    assert log.unfinished_slots("daily_verse") == ["2024-12-01T08:00"]
+
+def test_posts_for_a_slot_reuse_their_message_id():
+    verse = MagicMock(verse_reference="John 3:16", verse_text="For God so loved the world", topic="love")
+    session = MagicMock()
+    session.post.return_value.status_code = 200
+    with patch('scheduler.get_daily_verse', return_value=verse), \
+         patch('scheduler.generate_reflection', return_value="Reflection"), \
+         patch('scheduler.get_http_session', return_value=session), \
+         patch('scheduler.TELEX_WEBHOOK_HOOK_ID', "hook"), patch('scheduler.TELEX_BEARER_TOKEN', "token"):
+        publish_daily_verse("2025-01-01T08:00")
+        publish_daily_verse("2025-01-01T08:00")
+        publish_daily_verse()
+
+    payloads = [call.kwargs["json"] for call in session.post.call_args_list]
+    assert payloads[0]["params"]["message"]["messageId"] == payloads[1]["params"]["message"]["messageId"]
+    assert payloads[0]["id"] == payloads[1]["id"]
+    assert payloads[2]["params"]["message"]["messageId"] != payloads[0]["params"]["message"]["messageId"]
 
 if __name__ == "__main__":
     # Manual test to trigger daily verse posting
     print("Testing daily verse posting...")
-    test_post_daily_verse()
+    test_publish_daily_verse()
     print("✅ Daily verse posting test passed")
 
     print("Testing error handling...")
-    test_post_daily_verse_error()
+    import tempfile, pathlib
+    asyncio.run(test_daily_verse_job_error(pathlib.Path(tempfile.mkdtemp())))
     print("✅ Error handling test passed")
 
     print("Testing scheduler setup...")
     try:
-        asyncio.run(test_setup_scheduler())
+        asyncio.run(test_setup_scheduler(pathlib.Path(tempfile.mkdtemp())))
         print("✅ Scheduler setup test passed")
     except Exception as e:
         print(f"⚠️  Scheduler setup test had issues (expected in standalone mode): {e}")
@@ -84,6 +203,6 @@ if __name__ == "__main__":
 
     print("\n🎉 Core scheduler tests passed!")
     print("\nTo manually trigger the daily verse posting, run:")
-    print("python -c \"from scheduler import post_daily_verse; post_daily_verse()\"")
+    print("python -c \"import asyncio; from scheduler import daily_verse_job; asyncio.run(daily_verse_job(trigger='manual'))\"")
     print("\nThe scheduler runs automatically when the FastAPI app starts.")
     print("Check the logs for 'Daily Verse:' messages to see when it posts.")
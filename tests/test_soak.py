@@ -0,0 +1,61 @@
+import os
+import pytest
+from soak import fake_reply, growth_per_10k, soak, traffic, verdict
+
+def take(stream, n):
+    return [next(stream) for _ in range(n)]
+
+def test_traffic_is_reproducible_from_the_seed():
+    first = take(traffic(7), 300)
+
+    assert first == take(traffic(7), 300)
+    assert first != take(traffic(8), 300)
+    ids = [body["id"] for body in first]
+    assert len(set(ids)) < len(ids)  # Some requests are retries
+    assert {body["method"] for body in first} == {"message/send", "execute"}
+
+def test_traffic_stays_within_the_context_pool():
+    contexts = set()
+    for body in take(traffic(1, contexts=5), 200):
+        message = body["params"].get("message") or body["params"]["messages"][-1]
+        contexts.add(message["contextId"])
+
+    assert len(contexts) <= 5
+
+def test_fake_reply_answers_each_stage():
+    assert fake_reply("Decide the user's intent from this message: 'I need a verse on hope and peace'.") == "hope, peace"
+    assert fake_reply("Decide the user's intent from this message: 'hello'.") == "__NO_VERSE__"
+    reference = fake_reply("Give only a valid Bible verse reference about hope. Format: Book Chapter:Verse.")
+    assert reference == fake_reply("Give only a valid Bible verse reference about hope. Format: Book Chapter:Verse.")
+
+def test_growth_per_10k_is_the_least_squares_slope():
+    assert growth_per_10k([(0, 100), (10_000, 1100), (20_000, 2100)]) == pytest.approx(1000)
+    assert growth_per_10k([(0, 5)]) == 0.0
+
+def test_verdict_flags_growth_errors_and_missing_samples():
+    report = {
+        "samples": [{"requests": r} for r in (2_000, 4_000, 6_000, 8_000, 10_000)],
+        "baseline_at": 4_000,
+        "growth_per_10k": {"rss": 900.0, "blocks": 150},
+        "statuses": {"200": 9_990, "429": 10},
+    }
+    assert verdict(report) == []
+
+    report["growth_per_10k"]["blocks"] = 10_000
+    report["statuses"]["500"] = 3
+    report["samples"] = report["samples"][:3]
+    failures = verdict(report)
+    assert len(failures) == 3
+
+    report["growth_per_10k"]["traced"] = 2_000.0  # Only in --trace runs
+    assert len(verdict(report)) == 4
+
+@pytest.mark.skipif(not os.getenv("SOAK_REQUESTS"), reason="Soak run; set SOAK_REQUESTS (and optionally SOAK_SEED)")
+def test_soak_memory_growth():
+    import asyncio
+
+    requests = int(os.environ["SOAK_REQUESTS"])
+    report = asyncio.run(soak(requests=requests, seed=int(os.getenv("SOAK_SEED", "0")),
+                              sample_every=max(100, requests // 25)))
+
+    assert verdict(report) == [], report
@@ -0,0 +1,69 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+from core.request_context import caller_var, context_id_var
+from core.token_accounting import TokenLedger, extract_usage, degraded
+
+def usage(prompt, output):
+    return {"prompt": prompt, "output": output, "total": prompt + output}
+
+def test_extract_usage_from_gemini_response():
+    response = SimpleNamespace(usage_metadata=SimpleNamespace(
+        prompt_token_count=42, candidates_token_count=7, total_token_count=49
+    ))
+    assert extract_usage(response) == {"prompt": 42, "output": 7, "total": 49}
+    assert extract_usage(SimpleNamespace()) == {"prompt": 0, "output": 0, "total": 0}
+
+def test_ledger_aggregates_by_stage_caller_and_context():
+    ledger = TokenLedger(budget=0, overrides={})
+    ledger.record("intent", usage(50, 2), caller="ip:1", context_id="ctx-1")
+    ledger.record("reflection", usage(80, 30), caller="ip:1", context_id="ctx-1")
+    ledger.record("intent", usage(50, 3), caller="ip:2")
+
+    summary = ledger.summary()
+    assert summary["stages"]["intent"] == {"calls": 2, "prompt": 100, "output": 5, "total": 105}
+    assert summary["callers"]["ip:1"]["total"] == 162
+    assert summary["contexts"] == 1
+    assert ledger.summary(context_id="ctx-1")["contexts"]["ctx-1"]["calls"] == 2
+    assert ledger.summary(caller="ip:2")["callers"]["ip:2"]["window_tokens"] == 53
+
+def test_ledger_reads_caller_from_request_context():
+    ledger = TokenLedger(budget=0, overrides={})
+    caller_token = caller_var.set("key:abc")
+    context_token = context_id_var.set("ctx-9")
+    try:
+        ledger.record("chat", usage(10, 5))
+    finally:
+        caller_var.reset(caller_token)
+        context_id_var.reset(context_token)
+
+    assert ledger.summary(caller="key:abc", context_id="ctx-9")["contexts"]["ctx-9"]["total"] == 15
+
+def test_budget_window_and_overrides():
+    ledger = TokenLedger(budget=100, overrides={"key:vip": 0}, window=0.05)
+    ledger.record("reflection", usage(90, 20), caller="ip:1")
+    ledger.record("reflection", usage(90, 20), caller="key:vip")
+
+    assert ledger.over_budget("ip:1")
+    assert not ledger.over_budget("key:vip")  # Unlimited override
+    time.sleep(0.06)
+    assert not ledger.over_budget("ip:1")  # New window
+
+def test_degraded_uses_current_caller():
+    ledger = TokenLedger(budget=10, overrides={})
+    ledger.record("chat", usage(20, 0), caller="ip:1")
+    with patch('core.token_accounting.ledger', ledger):
+        token = caller_var.set("ip:1")
+        try:
+            assert degraded("reflection")
+        finally:
+            caller_var.reset(token)
+        assert not degraded("reflection")  # No caller outside a request
+
+def test_budget_follows_identity_not_context():
+    ledger = TokenLedger(budget=100, overrides={})
+    ledger.record("reflection", usage(90, 20), caller="ip:1.2.3.4/ctx:first")
+
+    assert ledger.over_budget("ip:1.2.3.4/ctx:fresh")
+    assert ledger.over_budget("ip:1.2.3.4")
+    assert not ledger.over_budget("ip:5.6.7.8/ctx:first")
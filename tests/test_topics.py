@@ -0,0 +1,55 @@
+import pytest
+from unittest.mock import patch
+
+from core.topics import TopicCanonicalizer, canonical_topic, report, stem, stem_key
+
+def test_stem_merges_inflections():
+    assert {stem(w) for w in ("love", "loves", "loved", "loving")} == {"lov"}
+    assert stem("forgiveness") == stem("forgive") == stem("forgiving")
+    assert stem("worries") == stem("worried") == "worry"
+    assert stem("bless") == "bless"  # Double s is not a plural
+
+def test_stem_key_ignores_case_order_possessives_and_filler():
+    assert stem_key("God's love") == stem_key("the love of God") == stem_key("  LOVING god ")
+    assert stem_key("verses about hope") == stem_key("hope")
+
+def test_variants_share_a_canonical_key():
+    keys = {canonical_topic(t) for t in ("Love", "love ", "God's love", "loving others", "Love of God")}
+    assert keys == {"love"}
+    assert canonical_topic("worried") == canonical_topic("Anxiety") == "anxiety"
+    assert canonical_topic("__NO_VERSE__") == "__NO_VERSE__"
+
+def test_clustering_only_joins_close_curated_topics():
+    canonicalizer = TopicCanonicalizer(clustering=True, threshold=0.7)
+    assert canonicalizer.canonicalize("salvaton").key == "salvation"
+    assert canonicalizer.canonicalize("salvaton").method == "cluster"
+    assert canonicalizer.canonicalize("heaven").key == "heaven"
+    assert canonicalizer.canonicalize("god").key == "god"  # Not "God's love": word counts differ
+
+    plain = TopicCanonicalizer(clustering=False)
+    assert plain.canonicalize("salvaton").method == "stem"
+
+def test_clustering_never_joins_opposites():
+    from core.ai_service import split_topics
+    canonicalizer = TopicCanonicalizer(clustering=True, threshold=0.7)
+    for topic, curated in (("impatience", "patience"), ("impatient", "patience"), ("disobedience", "obedience"),
+                           ("fearless", "fear"), ("unforgiveness", "forgiveness")):
+        assert canonicalizer.canonicalize(topic).key != curated, topic
+    assert canonicalizer.canonicalize("salvaton").key == "salvation"  # Typos still join
+
+    with patch('core.topics.canonicalizer', canonicalizer):
+        assert split_topics("patience, impatience") == ["patience", "impatience"]
+
+def test_conflicting_synonyms_are_rejected():
+    with pytest.raises(ValueError, match="already belongs"):
+        TopicCanonicalizer({"love": ("charity",), "generosity": ("charity",)})
+
+def test_report_compares_raw_and_canonical_keys():
+    topics = ["Love", "love", "God's love", "hope", "Hope ", "hoping", "grace"]
+    result = report(topics, cache_size=1)
+
+    assert result["raw"]["distinct"] == 5
+    assert result["canonical"]["distinct"] == 3
+    assert result["canonical"]["hit_ratio"] > result["raw"]["hit_ratio"]
+    assert result["canonical"]["lru_hit_ratio"] == 4 / 7
+    assert result["top_keys"][0]["key"] in {"love", "hope"}
@@ -0,0 +1,96 @@
+import asyncio
+import json
+import time
+from unittest.mock import patch, MagicMock
+
+from core.translations import LocalStore, PassageCache, select_translations, normalize_reference
+
+def test_select_translations():
+    assert select_translations("kjv") == ["KJV"]
+    assert select_translations(["NET", "kjv", "NET", "nope"]) == ["NET", "KJV"]
+    assert select_translations("web,kjv") == ["WEB", "KJV"]
+    assert select_translations(None) == ["NET"]
+    with patch('core.translations.CHANNEL_TRANSLATIONS', {"channel-1": "WEB"}):
+        assert select_translations(None, "channel-1") == ["WEB"]
+        assert select_translations("KJV", "channel-1") == ["KJV"]  # The request wins
+    with patch('core.translations.MAX_SIDE_BY_SIDE', 2):
+        assert select_translations(["NET", "KJV", "WEB"]) == ["NET", "KJV"]
+
+def test_local_store(tmp_path):
+    (tmp_path / "NIV.json").write_text(json.dumps({"John 3:16": "For God so loved the world..."}))
+    store = LocalStore(str(tmp_path))
+
+    assert store.has("niv")
+    assert store.lookup("NIV", " john  3:16") == "For God so loved the world..."
+    assert store.lookup("NIV", "John 3:17") is None
+    assert not store.has("ESV")
+
+def test_codes_outside_the_store_are_rejected(tmp_path):
+    from core.translations import get_translation
+    store_dir = tmp_path / "store"
+    store_dir.mkdir()
+    (tmp_path / "SECRET.json").write_text(json.dumps({"John 3:16": "outside the store"}))
+    store = LocalStore(str(store_dir))
+
+    assert not store.has("../secret")
+    assert store.lookup("../SECRET", "John 3:16") is None
+    with patch('core.translations.local_stores', store):
+        assert get_translation("../secret") is None
+        assert select_translations("../secret,kjv") == ["KJV"]
+
+def test_passage_cache_is_partitioned_by_translation():
+    cache = PassageCache(ttl=60, maxsize=1)
+    cache.set("NET", "John 3:16", ("John 3:16", "net text"))
+    cache.set("KJV", "John 3:16", ("John 3:16", "kjv text"))
+    cache.set("KJV", "John 1:1", ("John 1:1", "kjv text"))  # Evicts only within KJV
+
+    assert cache.get("NET", "john 3:16") == ("John 3:16", "net text")
+    assert cache.get("KJV", "John 3:16") is None
+    assert cache.sizes() == {"NET": 1, "KJV": 1}
+    assert normalize_reference(" 1 John  4:8") == "1 john 4:8"
+
+@patch('core.bible_api.get_http_session')
+def test_fetch_bible_api_com(mock_session):
+    from core.bible_api import fetch_passage
+    mock_response = MagicMock()
+    mock_response.status_code = 200
+    mock_response.json.return_value = {
+        "reference": "John 3:16",
+        "verses": [{"book_name": "John", "chapter": 3, "verse": 16, "text": "For God so loved the world,\n"}],
+        "translation_id": "kjv"
+    }
+    mock_session.return_value.get.return_value = mock_response
+
+    assert fetch_passage("John 3:16", "KJV") == ("John 3:16", "For God so loved the world,")
+    assert "bible-api.com/John%203%3A16?translation=kjv" in mock_session.return_value.get.call_args[0][0]
+
+def test_fetch_translations_side_by_side_concurrently():
+    from core.bible_api import fetch_translations
+
+    def slow_fetch(reference, translation):
+        time.sleep(0.2)
+        return None if translation == "WEB" else (reference, f"{translation} text")
+
+    with patch('core.bible_api.hedged_fetch_passage', side_effect=slow_fetch), \
+         patch('core.bible_api.passage_cache', PassageCache(ttl=60)):
+        start = time.perf_counter()
+        passages = asyncio.run(fetch_translations("Psalm 23:1", ["KJV", "NET", "WEB"]))
+        elapsed = time.perf_counter() - start
+
+    assert passages == {"KJV": ("Psalm 23:1", "KJV text"), "NET": ("Psalm 23:1", "NET text")}
+    assert elapsed < 0.35  # One round-trip, not three
+
+def test_get_passage_prefers_cache_then_local_store(tmp_path):
+    from core.bible_api import get_passage
+    (tmp_path / "NIV.json").write_text(json.dumps({"Psalm 23:1": "The Lord is my shepherd, I lack nothing."}))
+    cache = PassageCache(ttl=60)
+
+    with patch('core.bible_api.local_stores', LocalStore(str(tmp_path))), \
+         patch('core.bible_api.passage_cache', cache), \
+         patch('core.bible_api.hedged_fetch_passage') as mock_fetch:
+        assert get_passage("Psalm 23:1", "NIV") == ("Psalm 23:1", "The Lord is my shepherd, I lack nothing.")
+        mock_fetch.return_value = ("Psalm 23:1", "The LORD is my shepherd; I shall not want.")
+        assert get_passage("Psalm 23:1", "KJV")[1] == "The LORD is my shepherd; I shall not want."
+        assert get_passage("Psalm 23:1", "KJV")[1] == "The LORD is my shepherd; I shall not want."
+
+    mock_fetch.assert_called_once_with("Psalm 23:1", "KJV")  # Second KJV lookup was cached
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+from main import app
+from core.drain import drain
+from core.models import VerseResult
+from core.websocket import A2AConnection
+
+def send_body(rpc_id, text):
+    return {
+        "jsonrpc": "2.0",
+        "id": rpc_id,
+        "method": "message/send",
+        "params": {"message": {"role": "user", "messageId": f"ws-{rpc_id}",
+                               "parts": [{"kind": "text", "text": text}]}},
+    }
+
+async def fake_verses(query):
+    if "slow" in query:
+        await asyncio.sleep(0.3)
+    return [VerseResult(topic="love", verse_reference="1 John 4:8", verse_text="God is love.",
+                        reflection="Love is God's nature.", timestamp=1735148400.0)]
+
+class ASGIWebSocket:
+    """A WebSocket client speaking ASGI to the app directly"""
+
+    def __init__(self, path, query=b""):
+        self.scope = {"type": "websocket", "asgi": {"version": "3.0"}, "scheme": "ws", "http_version": "1.1",
+                      "path": path, "raw_path": path.encode(), "query_string": query, "root_path": "",
+                      "headers": [(b"host", b"testserver")], "client": ("127.0.0.1", 50000),
+                      "server": ("testserver", 80), "subprotocols": []}
+        self.to_app = asyncio.Queue()
+        self.from_app = asyncio.Queue()
+
+    async def __aenter__(self):
+        self.to_app.put_nowait({"type": "websocket.connect"})
+        self.task = asyncio.create_task(app(self.scope, self.to_app.get, self.from_app.put))
+        self.handshake = await asyncio.wait_for(self.from_app.get(), timeout=5)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.to_app.put_nowait({"type": "websocket.disconnect", "code": 1000})
+        await asyncio.wait_for(self.task, timeout=5)
+
+    def send(self, text):
+        self.to_app.put_nowait({"type": "websocket.receive", "text": text})
+
+    async def receive_json(self):
+        return json.loads((await asyncio.wait_for(self.from_app.get(), timeout=5))["text"])
+
+@pytest.mark.asyncio
+async def test_websocket_runs_requests_concurrently_and_matches_replies_by_id():
+    with patch("core.ai_service.process_verse_requests", side_effect=fake_verses):
+        async with ASGIWebSocket("/a2a/ws") as ws:
+            assert ws.handshake["type"] == "websocket.accept"
+            ws.send(json.dumps(send_body("1", "a slow verse on love")))
+            ws.send(json.dumps(send_body("2", "a verse on love")))
+            frames = [await ws.receive_json() for _ in range(4)]
+
+    updates = {f["params"]["requestId"]: f["params"] for f in frames if f.get("method") == "tasks/status"}
+    replies = [f for f in frames if "id" in f]
+    assert [r["id"] for r in replies] == ["2", "1"]  # The fast request isn't held behind the slow one
+    for reply in replies:
+        assert updates[reply["id"]]["status"]["state"] == "working"
+        assert updates[reply["id"]]["taskId"] == reply["result"]["id"]
+        assert reply["result"]["status"]["state"] == "completed"
+
+@pytest.mark.asyncio
+async def test_websocket_without_status_updates_and_with_an_invalid_frame():
+    with patch("core.ai_service.process_verse_requests", side_effect=fake_verses):
+        async with ASGIWebSocket("/a2a/ws", b"statusUpdates=false") as ws:
+            ws.send("not json")
+            error = await ws.receive_json()
+            ws.send(json.dumps(send_body("7", "a verse on love")))
+            reply = await ws.receive_json()
+
+    assert error["id"] is None and "error" in error
+    assert reply["id"] == "7" and "result" in reply
+
+@pytest.mark.asyncio
+async def test_websocket_refused_while_draining():
+    with patch.object(drain, "accepting", return_value=False):
+        async with ASGIWebSocket("/a2a/ws") as ws:
+            assert ws.handshake == {"type": "websocket.close", "code": 1013, "reason": ""}
+
+class FakeWebSocket:
+    def __init__(self, frames, stall_sends=False):
+        self.scope = {"type": "websocket", "path": "/a2a/ws", "headers": [], "query_string": b"",
+                      "client": ("127.0.0.1", 5000)}
+        self.incoming = asyncio.Queue()
+        for frame in frames:
+            self.incoming.put_nowait({"type": "websocket.receive", "text": frame})
+        self.stall_sends = stall_sends
+        self.receives = 0
+        self.sent = []
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def receive(self):
+        self.receives += 1
+        return await self.incoming.get()
+
+    async def send_text(self, text):
+        if self.stall_sends:
+            await asyncio.sleep(3600)
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000):
+        self.close_code = code
+        self.incoming.put_nowait({"type": "websocket.disconnect"})
+
+@pytest.mark.asyncio
+async def test_connection_stops_reading_at_its_in_flight_limit():
+    from fastapi.responses import JSONResponse
+
+    release = asyncio.Event()
+    started = []
+
+    async def handler(request):
+        body = await request.json()
+        started.append(body["id"])
+        await release.wait()
+        return JSONResponse({"jsonrpc": "2.0", "id": body["id"], "result": {}})
+
+    websocket = FakeWebSocket([json.dumps({"id": str(i)}) for i in range(5)])
+    connection = A2AConnection(websocket, handler, max_in_flight=2)
+    run = asyncio.create_task(connection.run())
+    await asyncio.sleep(0.05)
+
+    assert started == ["0", "1"]
+    assert websocket.receives == 2  # The third frame is left unread
+
+    release.set()
+    await asyncio.sleep(0.05)
+    websocket.incoming.put_nowait({"type": "websocket.disconnect"})
+    await asyncio.wait_for(run, timeout=1)
+    assert sorted(reply["id"] for reply in websocket.sent) == ["0", "1", "2", "3", "4"]
+
+@pytest.mark.asyncio
+async def test_slow_reader_is_disconnected():
+    from fastapi.responses import JSONResponse
+
+    async def handler(request):
+        return JSONResponse({"jsonrpc": "2.0", "id": "1", "result": {}})
+
+    websocket = FakeWebSocket([json.dumps({"id": "1"})], stall_sends=True)
+    connection = A2AConnection(websocket, handler, send_timeout=0.05)
+
+    await asyncio.wait_for(connection.run(), timeout=1)
+
+    assert websocket.close_code == 1008
+    assert connection.closed